@@ -0,0 +1,216 @@
+"""
+Accessibility-tree benchmarks: dfs over synthetic trees and search
+result collection/classification, served by the simulator backend.
+"""
+
+from __future__ import annotations
+
+from harness import benchmark
+
+from wechat_mcp.add_contact_by_wechat_id_utils import _click_privacy_option
+from wechat_mcp.ax_backend import (
+    get_backend,
+    kAXButtonRole,
+    kAXChildrenAttribute,
+    kAXListRole,
+    kAXPositionAttribute,
+    kAXRoleAttribute,
+    kAXStaticTextRole,
+    kAXValueAttribute,
+    kAXWindowRole,
+    set_backend,
+)
+from wechat_mcp.spatial_index import index_tree
+from wechat_mcp.wechat_accessibility import (
+    _build_section_headers,
+    _classify_section,
+    _collect_search_entries,
+    _find_exact_match_in_entries,
+    ax_get,
+    axvalue_to_point,
+    dfs,
+)
+from wechat_mcp.wechat_simulator import SimElement, SimulatedWeChatBackend
+
+set_backend(SimulatedWeChatBackend(chats=0))
+
+# Per-call latency standing in for the cross-process round trip of a real
+# accessibility read, for benchmarks that compare how many calls a lookup
+# makes.
+AX_ROUND_TRIP = 0.0001
+
+
+def _with_round_trip(fn):
+    backend = get_backend()
+
+    def run():
+        backend.latency = AX_ROUND_TRIP
+        try:
+            return fn()
+        finally:
+            backend.latency = 0.0
+
+    return run
+
+
+def _tree(depth: int, width: int) -> SimElement:
+    root = SimElement("AXGroup", identifier="root")
+    if depth > 1:
+        for i in range(width):
+            root.add(_tree(depth - 1, width))
+    return root
+
+
+def _search_list(results: int) -> SimElement:
+    """
+    A search list with `results` rows split between Contacts and Group
+    Chats, followed by the Chat History and More sections.
+    """
+    search_list = SimElement(kAXListRole, identifier="search_list")
+    y = 0.0
+
+    def add(text: str) -> None:
+        nonlocal y
+        search_list.add(
+            SimElement(kAXStaticTextRole, title=text, value=text, frame=(0.0, y, 250.0, 40.0))
+        )
+        y += 40.0
+
+    half = results // 2
+    add("Contacts")
+    for i in range(half):
+        add(f"Contact {i}")
+    add("Group Chats")
+    for i in range(results - half):
+        add(f"Group {i}")
+    add("Chat History")
+    add("More")
+    add("Search WeChat ID: query")
+    return search_list
+
+
+@benchmark("dfs.full_walk[depth=4,width=8]", depth=4, width=8)
+@benchmark("dfs.full_walk[depth=6,width=4]", depth=6, width=4)
+@benchmark("dfs.full_walk[depth=2,width=5000]", depth=2, width=5000)
+def bench_dfs(depth: int, width: int):
+    root = _tree(depth, width)
+
+    def never(el, role, title, identifier):
+        return False
+
+    return lambda: dfs(root, never)
+
+
+@benchmark("search.collect_entries[1000]", results=1000)
+@benchmark("search.collect_entries[5000]", results=5000)
+def bench_collect_search_entries(results: int):
+    search_list = _search_list(results)
+    return lambda: _collect_search_entries(search_list)
+
+
+@benchmark("search.classify_sections[1000]", results=1000)
+@benchmark("search.classify_sections[5000]", results=5000)
+def bench_classify_sections(results: int):
+    entries = _collect_search_entries(_search_list(results))
+
+    def run():
+        headers = _build_section_headers(entries)
+        for entry in entries:
+            _classify_section(entry, headers)
+
+    return run
+
+
+@benchmark("search.find_exact_match[5000]", results=5000)
+def bench_find_exact_match(results: int):
+    entries = _collect_search_entries(_search_list(results))
+    target = f"Group {results - results // 2 - 1}"
+    return lambda: _find_exact_match_in_entries(entries, target)
+
+
+PRIVACY_LABEL = "Chats Only"
+
+
+def _form_window(nodes: int) -> SimElement:
+    """
+    A window of about `nodes` elements laid out as form rows (a group
+    holding a button and its label), with the "Chats Only" privacy row
+    near the bottom.
+    """
+    window = SimElement(kAXWindowRole, title="Send Friend Request", frame=(0.0, 0.0, 420.0, 10.0 * nodes))
+    rows = nodes // 3
+    for i in range(rows):
+        y = 30.0 * i
+        label = PRIVACY_LABEL if i == rows - 2 else f"Option {i}"
+        group = window.add(SimElement("AXGroup", frame=(0.0, y, 420.0, 30.0)))
+        group.add(SimElement(kAXButtonRole, frame=(20.0, y, 20.0, 20.0), on_click=lambda: None))
+        group.add(SimElement(kAXStaticTextRole, value=label, frame=(50.0, y, 250.0, 20.0)))
+    return window
+
+
+def _nearest_left_by_walk(window: SimElement, label: str):
+    """
+    Reference: find the label, then walk the whole window reading each
+    node's role and position, as _click_privacy_option did before the
+    spatial index.
+    """
+
+    def is_label(el, role, title, identifier):
+        return role == kAXStaticTextRole and ax_get(el, kAXValueAttribute) == label
+
+    label_x, label_y = axvalue_to_point(ax_get(dfs(window, is_label), kAXPositionAttribute))
+    best, best_dx = None, None
+
+    def walk(el):
+        nonlocal best, best_dx
+        if ax_get(el, kAXRoleAttribute) == kAXButtonRole:
+            point = axvalue_to_point(ax_get(el, kAXPositionAttribute))
+            if point is not None and abs(point[1] - label_y) <= 6.0 and point[0] < label_x:
+                if best_dx is None or label_x - point[0] < best_dx:
+                    best, best_dx = el, label_x - point[0]
+        for child in ax_get(el, kAXChildrenAttribute) or []:
+            walk(child)
+
+    walk(window)
+    return best
+
+
+@benchmark("privacy.walk_reference[nodes=5000]", nodes=5000)
+@benchmark("privacy.walk_reference[nodes=1000,rtt=100us]", nodes=1000, round_trip=True)
+def bench_privacy_walk_reference(nodes: int, round_trip: bool = False):
+    window = _form_window(nodes)
+
+    def run():
+        return _nearest_left_by_walk(window, PRIVACY_LABEL)
+
+    return _with_round_trip(run) if round_trip else run
+
+
+@benchmark("privacy.click_option[nodes=5000]", nodes=5000)
+@benchmark("privacy.click_option[nodes=1000,rtt=100us]", nodes=1000, round_trip=True)
+def bench_click_privacy_option(nodes: int, round_trip: bool = False):
+    window = _form_window(nodes)
+
+    def run():
+        return _click_privacy_option(window, PRIVACY_LABEL)
+
+    return _with_round_trip(run) if round_trip else run
+
+
+@benchmark("spatial.build[nodes=5000]", nodes=5000)
+def bench_spatial_build(nodes: int):
+    window = _form_window(nodes)
+    return lambda: index_tree(window)
+
+
+@benchmark("spatial.queries[nodes=5000]", nodes=5000)
+def bench_spatial_queries(nodes: int):
+    index = index_tree(_form_window(nodes))
+    label = index.find(lambda item: item.value == PRIVACY_LABEL)
+
+    def run():
+        index.nearest_left_of(label.frame, role=kAXButtonRole)
+        index.same_row(label.frame)
+        index.within((0.0, label.y - 60.0, 420.0, 120.0))
+
+    return run
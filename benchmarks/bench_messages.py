@@ -0,0 +1,91 @@
+"""
+Message benchmarks: pixel-based sender classification on generated
+bubble images and page merging over long histories.
+"""
+
+from __future__ import annotations
+
+from PIL import Image, ImageDraw
+
+from harness import benchmark
+
+from wechat_mcp.fetch_messages_by_chat_utils import (
+    ChatMessage,
+    classify_sender_for_message,
+    count_colored_pixels,
+    older_messages_in_page,
+)
+
+LIST_WIDTH = 680
+BACKGROUND = (17, 17, 17)
+BUBBLES = {"ME": (38, 160, 80), "OTHER": (44, 44, 44)}
+
+
+def _bubble_page(rows: int, row_height: int) -> tuple[Image.Image, list[tuple]]:
+    """
+    Render a dark-mode message list with alternating ME/OTHER bubbles and
+    return it with each row's (position, size).
+    """
+    image = Image.new("RGB", (LIST_WIDTH, rows * row_height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    frames = []
+    for i in range(rows):
+        top = i * row_height
+        sender = "ME" if i % 2 else "OTHER"
+        if sender == "ME":
+            box = (LIST_WIDTH - 400, top, LIST_WIDTH - 55, top + row_height - 6)
+        else:
+            box = (55, top, 400, top + row_height - 6)
+        draw.rectangle(box, fill=BUBBLES[sender])
+        frames.append(((0.0, float(top)), (float(LIST_WIDTH), float(row_height))))
+    return image, frames
+
+
+@benchmark("sender.count_colored_pixels[100x40]", width=100, height=40)
+@benchmark("sender.count_colored_pixels[400x200]", width=400, height=200)
+def bench_count_colored_pixels(width: int, height: int):
+    image, _ = _bubble_page(rows=max(1, height // 60 + 1), row_height=60)
+    return lambda: count_colored_pixels(image, 50, 0, 50 + width, height)
+
+
+@benchmark("sender.classify_page[rows=12,h=60]", rows=12, row_height=60)
+@benchmark("sender.classify_page[rows=6,h=120]", rows=6, row_height=120)
+def bench_classify_page(rows: int, row_height: int):
+    image, frames = _bubble_page(rows, row_height)
+
+    def run():
+        for position, size in frames:
+            classify_sender_for_message(image, (0.0, 0.0), position, size)
+
+    return run
+
+
+def _history(length: int) -> list[ChatMessage]:
+    return [
+        ChatMessage(sender="ME" if i % 3 else "OTHER", text=f"message {i}")
+        for i in range(length)
+    ]
+
+
+@benchmark("merge.pages[history=1000,page=12]", history=1000, page=12)
+@benchmark("merge.pages[history=10000,page=12]", history=10000, page=12)
+def bench_merge_pages(history: int, page: int):
+    """
+    Merge every page of a long history, newest first, with a two-message
+    overlap between consecutive pages as produced by scrolling up.
+    """
+    messages_all = _history(history)
+    step = page - 2
+    pages = [
+        messages_all[max(0, end - page) : end] for end in range(history, 0, -step)
+    ]
+
+    def run():
+        messages = pages[0]
+        for visible in pages[1:]:
+            new_older = older_messages_in_page(messages, visible)
+            if new_older:
+                messages = new_older + messages
+        return messages
+
+    return run
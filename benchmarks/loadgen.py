@@ -0,0 +1,279 @@
+"""
+Open-loop load generator for the WeChat MCP server.
+
+Starts `wechat-mcp --transport streamable-http --backend sim` (or targets
+an already running server with --url), then issues a Poisson stream of
+tool calls drawn from a weighted mix and reports throughput, client-side
+latency percentiles per tool, scheduler queue wait and error rate.
+
+Usage (from the repository root):
+
+    uv run python benchmarks/loadgen.py --rate 1 --duration 60 \\
+        --mix fetch=0.6,reply=0.3,add_contact=0.05,publish_moment=0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from wechat_mcp.wechat_simulator import default_chat_name
+
+OPERATIONS = ("fetch", "reply", "add_contact", "publish_moment")
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix: dict[str, float] = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                f"unknown operation {name!r}; expected one of {', '.join(OPERATIONS)}"
+            )
+        mix[name] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("mix needs at least one positive weight")
+    return mix
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _wait_for_port(host: str, port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start listening on {host}:{port}")
+
+
+def start_server(args: argparse.Namespace) -> subprocess.Popen:
+    env = dict(os.environ, FASTMCP_LOG_LEVEL="WARNING")
+    command = [
+        sys.executable,
+        "-m",
+        "wechat_mcp.mcp_server",
+        "--transport",
+        "streamable-http",
+        "--port",
+        str(args.port),
+        "--backend",
+        "sim",
+        "--sim-chats",
+        str(args.sim_chats),
+        "--sim-history",
+        str(args.sim_history),
+        "--sim-latency",
+        str(args.sim_latency),
+    ]
+    log = open(args.server_log, "w", encoding="utf-8") if args.server_log else subprocess.DEVNULL
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    _wait_for_port("127.0.0.1", args.port, timeout=30.0)
+    return process
+
+
+class LoadRun:
+    def __init__(self, session: ClientSession, args: argparse.Namespace) -> None:
+        self.session = session
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.issued = 0
+        self.in_flight = 0
+        self.dropped = 0
+
+    def _chat(self) -> str:
+        # Skewed towards a few hot chats, like real traffic.
+        index = min(int(self.rng.paretovariate(1.2)) - 1, self.args.hot_chats - 1)
+        return default_chat_name(index)
+
+    def _call(self, op: str, n: int) -> tuple[str, dict[str, Any]]:
+        if op == "fetch":
+            return "fetch_messages_by_chat", {"chat_name": self._chat(), "last_n": 20}
+        if op == "reply":
+            return "reply_to_messages_by_chat", {
+                "chat_name": self._chat(),
+                "reply_message": f"load test message {n}",
+            }
+        if op == "add_contact":
+            return "add_contact_by_wechat_id", {"wechat_id": f"wxid_load_{n}"}
+        return "publish_moment_without_media", {"content": f"load test moment {n}"}
+
+    async def _one(self, op: str, n: int) -> None:
+        tool, arguments = self._call(op, n)
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            result = await self.session.call_tool(tool, arguments)
+            failed = result.isError or any(
+                '"error"' in getattr(block, "text", "") for block in result.content
+            )
+        except Exception:  # noqa: BLE001
+            failed = True
+        finally:
+            self.in_flight -= 1
+        self.latencies[op].append(time.perf_counter() - start)
+        if failed:
+            self.errors[op] += 1
+
+    async def run(self) -> float:
+        ops = list(self.args.mix)
+        weights = [self.args.mix[op] for op in ops]
+        tasks: list[asyncio.Task] = []
+        start = time.perf_counter()
+        deadline = start + self.args.duration
+        while True:
+            await asyncio.sleep(self.rng.expovariate(self.args.rate))
+            if time.perf_counter() >= deadline:
+                break
+            if self.in_flight >= self.args.max_in_flight:
+                self.dropped += 1
+                continue
+            self.issued += 1
+            op = self.rng.choices(ops, weights)[0]
+            tasks.append(asyncio.create_task(self._one(op, self.issued)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    async def read_resource(self, uri: str) -> dict[str, Any]:
+        result = await self.session.read_resource(uri)
+        return json.loads(result.contents[0].text)
+
+
+def build_report(run: LoadRun, elapsed: float, scheduler: dict, stats: dict) -> dict:
+    per_op = {}
+    for op, samples in sorted(run.latencies.items()):
+        per_op[op] = {
+            "count": len(samples),
+            "errors": run.errors[op],
+            "p50_s": percentile(samples, 50),
+            "p95_s": percentile(samples, 95),
+            "p99_s": percentile(samples, 99),
+            "max_s": max(samples),
+        }
+    completed = sum(len(samples) for samples in run.latencies.values())
+    errors = sum(run.errors.values())
+    queue_wait = stats.get("queue_wait", {})
+    return {
+        "duration_s": elapsed,
+        "issued": run.issued,
+        "dropped": run.dropped,
+        "completed": completed,
+        "throughput_per_s": completed / elapsed if elapsed else 0.0,
+        "error_rate": errors / completed if completed else 0.0,
+        "operations": per_op,
+        "queue_wait_ms": {
+            key: queue_wait.get(key, 0.0) for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+        },
+        "scheduler": scheduler,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['completed']} completed / {report['issued']} issued "
+        f"({report['dropped']} dropped) in {report['duration_s']:.1f}s: "
+        f"{report['throughput_per_s']:.2f} req/s, error rate {report['error_rate']:.1%}"
+    )
+    print(f"{'operation':<16} {'count':>6} {'errors':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for op, row in report["operations"].items():
+        print(
+            f"{op:<16} {row['count']:>6} {row['errors']:>6} {row['p50_s']:>7.2f}s "
+            f"{row['p95_s']:>7.2f}s {row['p99_s']:>7.2f}s {row['max_s']:>7.2f}s"
+        )
+    wait = report["queue_wait_ms"]
+    print(
+        f"queue wait: p50 {wait['p50_ms']:.0f}ms  p95 {wait['p95_ms']:.0f}ms  "
+        f"p99 {wait['p99_ms']:.0f}ms  max {wait['max_ms']:.0f}ms"
+    )
+    scheduler = report["scheduler"]
+    print(
+        f"chat switches: {scheduler.get('chat_switches')}  "
+        f"avoided: {scheduler.get('switches_avoided')}"
+    )
+
+
+async def drive(args: argparse.Namespace) -> dict:
+    async with streamablehttp_client(args.url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            run = LoadRun(session, args)
+            elapsed = await run.run()
+            scheduler = await run.read_resource("wechat://scheduler")
+            stats = await run.read_resource("wechat://stats")
+    return build_report(run, elapsed, scheduler, stats)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test the WeChat MCP server")
+    parser.add_argument("--url", default=None, help="Use a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the started server")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to generate load")
+    parser.add_argument("--rate", type=float, default=0.5, help="Mean arrivals per second")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=parse_mix("fetch=0.6,reply=0.3,add_contact=0.05,publish_moment=0.05"),
+        help="Comma-separated operation weights (fetch, reply, add_contact, publish_moment)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=64,
+        help="Arrivals beyond this many outstanding requests are dropped and counted",
+    )
+    parser.add_argument("--hot-chats", type=int, default=20, help="Chats that receive traffic")
+    parser.add_argument("--sim-chats", type=int, default=200)
+    parser.add_argument("--sim-history", type=int, default=200)
+    parser.add_argument("--sim-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server-log", default=None, help="File for the started server's output")
+    parser.add_argument("--output", default=None, help="Write the report as JSON here")
+    args = parser.parse_args()
+    args.hot_chats = max(1, min(args.hot_chats, args.sim_chats))
+
+    process = None
+    if args.url is None:
+        process = start_server(args)
+        args.url = f"http://127.0.0.1:{args.port}/mcp"
+    try:
+        report = asyncio.run(drive(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report["config"] = {
+        key: value for key, value in vars(args).items() if key not in ("output", "server_log")
+    }
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Run the WeChat MCP micro-benchmarks.
+
+Usage (from the repository root):
+
+    uv run python benchmarks/run.py --output bench.json
+    uv run python benchmarks/run.py --compare bench.json --threshold 0.15
+
+No WeChat instance or display is needed: accessibility trees are served
+by the simulator backend and screenshots are generated images.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import logging
+import sys
+from pathlib import Path
+
+from harness import REGISTRY, compare, format_seconds, load_results, machine_metadata, measure
+
+BENCH_MODULES = ("bench_ax", "bench_messages")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run WeChat MCP benchmarks")
+    parser.add_argument(
+        "-k", "--filter", default=None, help="Only run benchmarks whose name contains this"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per benchmark")
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.1,
+        help="Minimum seconds per sample; the loop count is calibrated to it",
+    )
+    parser.add_argument("--output", default=None, help="Write results as JSON here")
+    parser.add_argument(
+        "--compare", default=None, help="Baseline results JSON to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Slowdown fraction over the baseline median that counts as a regression",
+    )
+    args = parser.parse_args()
+
+    for module in BENCH_MODULES:
+        importlib.import_module(module)
+    # The instrumented helpers log at INFO; keep benchmark output readable.
+    # Set after the imports, which configure the logger.
+    logging.getLogger("wechat_mcp").setLevel(logging.WARNING)
+
+    results = {}
+    for bench in REGISTRY:
+        if args.filter and args.filter not in bench.name:
+            continue
+        fn = bench.setup()
+        result = measure(fn, repeat=args.repeat, min_time=args.min_time)
+        result["params"] = bench.params
+        results[bench.name] = result
+        print(
+            f"{bench.name:<45} median {format_seconds(result['median_s']):>10}  "
+            f"min {format_seconds(result['min_s']):>10}  x{result['number']}"
+        )
+
+    report = {"meta": machine_metadata(), "results": results}
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote {len(results)} results to {args.output}")
+
+    if not args.compare:
+        return 0
+
+    baseline = load_results(args.compare)
+    rows = compare(report, baseline, args.threshold)
+    regressions = [row for row in rows if row["regression"]]
+    print()
+    print(f"Compared with {args.compare} (commit {baseline.get('meta', {}).get('git_commit')})")
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['name']:<45} {format_seconds(row['baseline_s']):>10} -> "
+            f"{format_seconds(row['current_s']):>10}  {row['ratio']:.2f}x  {flag}"
+        )
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Count the search-result scroll steps needed to open a chat whose name
+is shared by thousands of other results.
+
+Each scenario builds a simulator where the query matches `--results`
+contacts, with the exact match at a given row, and opens it through
+open_chat_for_contact: once cold (no search hint) and once warm (with the
+hint recorded by the cold run). A stale scenario moves the chat after the
+hint was recorded. Fixed waits are skipped, so only steps are compared.
+
+Usage (from the repository root):
+
+    uv run python benchmarks/search_steps.py --results 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+import wechat_mcp.metrics as metrics
+from wechat_mcp import wechat_accessibility
+from wechat_mcp.ax_backend import set_backend
+from wechat_mcp.search_hints import search_hints
+from wechat_mcp.wechat_simulator import SimulatedWeChatBackend
+
+TARGET = "Li"
+
+
+def _simulator(results: int, rank: int) -> SimulatedWeChatBackend:
+    sim = SimulatedWeChatBackend(chats=0, history=5)
+    for i in range(results):
+        if i == rank:
+            sim.add_chat(TARGET, session=False)
+        sim.add_chat(f"{TARGET} {i:05d}", session=False)
+    set_backend(sim)
+    # Module-level caches are keyed by pid, which every simulator shares.
+    wechat_accessibility._ax_app_by_pid.clear()
+    wechat_accessibility._wechat_pid = None
+    wechat_accessibility.current_chat_state.invalidate()
+    return sim
+
+
+def _skip_waits() -> None:
+    """
+    Replace the fixed `wait` of every loaded wechat_mcp module with a
+    no-op, leaving time.sleep itself alone.
+    """
+
+    def no_wait(seconds: float, reason: str) -> None:
+        pass
+
+    real_wait = metrics.wait
+    for name, module in list(sys.modules.items()):
+        if name.startswith("wechat_mcp") and getattr(module, "wait", None) is real_wait:
+            module.wait = no_wait
+
+
+def scroll_steps(results: int, rank: int) -> tuple[int, bool]:
+    sim = _simulator(results, rank)
+    wechat_accessibility.open_chat_for_contact(TARGET)
+    steps = sum(1 for event in sim.events if event["type"] == "scroll")
+    opened = sim.current_chat is not None and sim.current_chat.name == TARGET
+    return steps, opened
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Count search scroll steps")
+    parser.add_argument("--results", type=int, default=5000, help="Results matching the query")
+    parser.add_argument(
+        "--ranks",
+        default="2,100,1000,2500,4900",
+        help="Comma-separated rows of the exact match among the results",
+    )
+    args = parser.parse_args()
+
+    logging.getLogger("wechat_mcp").setLevel(logging.WARNING)
+    os.environ["WECHAT_MCP_STATE_DIR"] = tempfile.mkdtemp(prefix="search-steps-")
+    _skip_waits()
+
+    print(f"{'row':>6} {'cold':>6} {'warm':>6} {'stale':>6}  (scroll steps, {args.results} results)")
+    for rank in (int(part) for part in args.ranks.split(",")):
+        search_hints.forget(TARGET)
+        cold, cold_ok = scroll_steps(args.results, rank)
+        warm, warm_ok = scroll_steps(args.results, rank)
+        stale, stale_ok = scroll_steps(args.results, max(0, rank - args.results // 2))
+        flags = "" if cold_ok and warm_ok and stale_ok else "  (not opened)"
+        print(f"{rank:>6} {cold:>6} {warm:>6} {stale:>6}{flags}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Any
+
+from .ax_backend import (
+    get_backend,
+    kAXConfirmAction,
+    kAXPickAction,
+    kAXPositionAttribute,
+    kAXPressAction,
+    kAXRoleAttribute,
+    kAXSizeAttribute,
+)
+from .logging_config import logger
+from .metrics import span, wait
+
+METHOD_CLICK = "click"
+
+# AX actions tried, in order, before falling back to a synthesized click.
+# Menu items and table rows are selected with AXPick; AXConfirm is the
+# default action of sheets and dialogs.
+ROLE_ACTIONS: dict[str, tuple[str, ...]] = {
+    "AXMenuItem": (kAXPickAction, kAXPressAction),
+    "AXRow": (kAXPressAction, kAXPickAction),
+    "AXCell": (kAXPressAction, kAXPickAction),
+    "AXSheet": (kAXConfirmAction,),
+}
+DEFAULT_ACTIONS = (kAXPressAction,)
+
+# Method that last worked, per AX role: one of the actions above, or
+# METHOD_CLICK for roles whose elements expose none of them.
+_working_methods: dict[str, str] = {}
+
+
+def working_methods() -> dict[str, str]:
+    return dict(_working_methods)
+
+
+def click_element_center(element) -> None:
+    """
+    Synthesize a left mouse click at the visual center of the element.
+    """
+    backend = get_backend()
+    point = backend.point_value(backend.get_attribute(element, kAXPositionAttribute))
+    size = backend.size_value(backend.get_attribute(element, kAXSizeAttribute))
+    if point is None or size is None:
+        raise RuntimeError("Failed to get bounds for element to click")
+
+    x, y = point
+    w, h = size
+    cx = x + w / 2.0
+    cy = y + h / 2.0
+
+    backend.post_mouse(cx, cy, down=True)
+    backend.post_mouse(cx, cy, down=False)
+
+
+def press_element(element: Any, settle: float = 0.0, label: str = "after_click") -> str:
+    """
+    Activate an element and return the method that worked.
+
+    The AX actions for the element's role (ROLE_ACTIONS, else AXPress) are
+    performed first; they run synchronously in WeChat and work whether or
+    not it is frontmost. Only when the element supports none of them is a
+    mouse click synthesized at its center, followed by `settle` seconds
+    for WeChat to process the event. The method is recorded per role and
+    tried first next time; a role that needed a click skips the actions.
+    """
+    backend = get_backend()
+    role = backend.get_attribute(element, kAXRoleAttribute) or ""
+    preferred = _working_methods.get(role)
+
+    with span("press_element", role=role) as attrs:
+        if preferred != METHOD_CLICK:
+            actions = list(ROLE_ACTIONS.get(role, DEFAULT_ACTIONS))
+            if preferred in actions:
+                actions.remove(preferred)
+                actions.insert(0, preferred)
+            for action in actions:
+                err = backend.perform_action(element, action)
+                if err == 0:
+                    attrs["method"] = action
+                    if preferred != action:
+                        logger.info("Elements with role %r now use %s", role, action)
+                        _working_methods[role] = action
+                    return action
+                logger.debug("%s on %r failed with AX error %s", action, role, err)
+
+        attrs["method"] = METHOD_CLICK
+        click_element_center(element)
+        if preferred != METHOD_CLICK:
+            logger.info("Elements with role %r have no press action; clicking", role)
+            _working_methods[role] = METHOD_CLICK
+    if settle > 0:
+        wait(settle, label)
+    return METHOD_CLICK
@@ -1,84 +1,206 @@
 from __future__ import annotations
 
-import time
+import re
+from dataclasses import dataclass
 from typing import Any
 
-from ApplicationServices import (
-    AXUIElementSetAttributeValue,
+from .actions import press_element
+from .ax_backend import (
     kAXButtonRole,
     kAXCheckBoxRole,
-    kAXChildrenAttribute,
-    kAXPositionAttribute,
+    kAXCloseButtonAttribute,
     kAXRoleAttribute,
     kAXStaticTextRole,
     kAXTextAreaRole,
     kAXTextFieldRole,
     kAXValueAttribute,
 )
-
 from .logging_config import logger
+from .spatial_index import FrameIndex, index_tree
 from .wechat_accessibility import (
+    activate_wechat,
+    _find_window_by_title,
     _wait_for_window,
+    _wait_until,
     _collect_search_entries,
     ax_get,
-    axvalue_to_point,
-    click_element_center,
+    ax_set,
     dfs,
-    focus_and_type_search,
+    find_search_field,
     get_search_list,
-    get_wechat_ax_app,
+    type_search,
 )
 
+# How long to wait for each piece of UI to show up before giving up on
+# an ID.
+SEARCH_CARD_TIMEOUT = 5.0
+ADD_BUTTON_TIMEOUT = 5.0
+REQUEST_CLOSE_TIMEOUT = 2.0
+PROFILE_TIMEOUT = 5.0
 
-def _click_more_card_by_title(ax_app: Any, label: str) -> bool:
-    """
-    Click a card with the given label in the global search results list.
+# A profile's "WeChat ID: <id>" line, and what a WeChat ID looks like
+# (a letter, then letters, digits, "_" or "-").
+_WECHAT_ID_LABEL_RE = re.compile(r"^(?:WeChat ID|微信号)\s*[:：]\s*(\S+)$", re.IGNORECASE)
+_WECHAT_ID_RE = re.compile(r"^[A-Za-z][A-Za-z0-9_-]{5,19}$")
 
-    This reuses the same search-entry collection logic as
-    _select_contact_from_search_results but targets entries by their
-    visible text only (e.g. a card labeled "Search WeChat ID").
+# Windows opened by the flow, innermost first.
+FLOW_WINDOWS = ("Send Friend Request", "Add Contacts")
+
+
+@dataclass
+class AddContactSession:
     """
-    search_list = get_search_list(ax_app)
-    entries = _collect_search_entries(search_list)
+    Elements reused across consecutive friend requests: the activated
+    WeChat application, the sidebar search field and the search results
+    list. Each is looked up on first use and again only when it has gone
+    stale.
+    """
+
+    ax_app: Any
+    search_field: Any = None
+    search_list: Any = None
 
+    def type_search(self, text: str) -> None:
+        if self.search_field is None:
+            self.search_field = find_search_field(self.ax_app)
+        try:
+            type_search(self.ax_app, self.search_field, text)
+        except RuntimeError:
+            logger.info("Search field went stale; looking it up again")
+            self.search_field = find_search_field(self.ax_app)
+            type_search(self.ax_app, self.search_field, text)
+
+    def search_entries(self):
+        if self.search_list is None or ax_get(self.search_list, kAXRoleAttribute) is None:
+            self.search_list = get_search_list(self.ax_app)
+        return _collect_search_entries(self.search_list)
+
+
+def _find_more_card(entries, label: str, query: str | None = None):
+    """
+    Return the search entry for a card with the given label (e.g.
+    "Search WeChat ID"), or None. Cards that carry the query after the
+    label ("Search WeChat ID: <query>") must carry `query`, so results
+    left over from the previous search are not picked.
+    """
     target = label.strip()
     for entry in entries:
         text = entry.text
         if not text:
             continue
-        if text == target or text.startswith(f"{target}:"):
-            logger.info("Clicking %r entry in search results", text)
-            click_element_center(entry.element)
-            time.sleep(0.4)
-            return True
+        if text == target:
+            return entry
+        if text.startswith(f"{target}:"):
+            if query is None or text[len(target) + 1 :].strip() == query.strip():
+                return entry
+    return None
+
+
+def _click_more_card_by_title(
+    session: AddContactSession,
+    label: str,
+    query: str | None = None,
+    timeout: float = SEARCH_CARD_TIMEOUT,
+) -> bool:
+    """
+    Click a card with the given label in the global search results list,
+    waiting up to `timeout` seconds for the results to show it.
 
-    logger.warning("Did not find %r entry in search results", target)
-    return False
+    This reuses the same search-entry collection logic as
+    _select_contact_from_search_results but targets entries by their
+    visible text only (e.g. a card labeled "Search WeChat ID").
+    """
+    entry = _wait_until(
+        lambda: _find_more_card(session.search_entries(), label, query),
+        timeout,
+        "search_card",
+    )
+    if entry is None:
+        logger.warning("Did not find %r entry in search results", label)
+        return False
 
+    logger.info("Clicking %r entry in search results", entry.text)
+    press_element(entry.element, settle=0.4, label="after_card_click")
+    return True
 
-def _click_add_to_contacts_button(add_contacts_window) -> None:
-    """
-    Click the 'Add to Contacts' button inside the Add Contacts window.
-    """
 
-    def is_add_button(el, role, title, identifier):
-        if role != kAXButtonRole:
-            return False
-        if identifier == "add_friend_button":
-            return True
-        if isinstance(title, str) and title == "Add to Contacts":
-            return True
+def _is_add_button(el, role, title, identifier) -> bool:
+    if role != kAXButtonRole:
         return False
+    if identifier == "add_friend_button":
+        return True
+    if isinstance(title, str) and title == "Add to Contacts":
+        return True
+    return False
 
-    button = dfs(add_contacts_window, is_add_button)
+
+def _click_add_to_contacts_button(
+    add_contacts_window, timeout: float = ADD_BUTTON_TIMEOUT
+) -> None:
+    """
+    Click the 'Add to Contacts' button inside the Add Contacts window,
+    waiting up to `timeout` seconds for the profile to load it.
+    """
+    button = _wait_until(
+        lambda: dfs(add_contacts_window, _is_add_button), timeout, "add_contacts_button"
+    )
     if button is None:
         raise RuntimeError(
             "Could not find 'Add to Contacts' button in Add Contacts window"
         )
 
     logger.info("Clicking 'Add to Contacts' button")
-    click_element_center(button)
-    time.sleep(0.4)
+    press_element(button, settle=0.4, label="after_add_click")
+
+
+def _shows_wechat_id(window, wechat_id: str) -> bool | None:
+    """
+    Whether the profile in the Add Contacts window is the one for
+    `wechat_id`, compared case-insensitively: True when one of its texts
+    is the ID or ends with it ("WeChat ID: <id>"), False only when it
+    clearly shows a different WeChat ID, and None when it shows none
+    (yet), e.g. a profile that hides its ID. A search by phone number,
+    QQ number or email finds a profile with some other ID, so for a
+    query that is not shaped like a WeChat ID a different ID is None.
+    """
+    target = wechat_id.strip().lower()
+    shown: str | None = None
+    for item in index_tree(window).items:
+        if item.role != kAXStaticTextRole or not isinstance(item.value, str):
+            continue
+        text = item.value.strip()
+        if re.split(r"[\s:：]+", text)[-1].lower() == target:
+            return True
+        match = _WECHAT_ID_LABEL_RE.match(text)
+        if match:
+            shown = match.group(1)
+    if shown is None or not _WECHAT_ID_RE.match(wechat_id.strip()):
+        return None
+    return False
+
+
+def _close_flow_windows(ax_app) -> None:
+    """
+    Close any Send Friend Request / Add Contacts windows left open, so
+    the next ID does not reuse a window showing another profile.
+    """
+    for title in FLOW_WINDOWS:
+        window = _find_window_by_title(ax_app, title)
+        if window is None:
+            continue
+        close_button = ax_get(window, kAXCloseButtonAttribute)
+        if close_button is None:
+            logger.warning("Window %r has no close button; leaving it open", title)
+            continue
+        logger.info("Closing leftover %r window", title)
+        press_element(close_button, settle=0.2, label="after_close_click")
+        closed = _wait_until(
+            lambda: _find_window_by_title(ax_app, title) is None,
+            REQUEST_CLOSE_TIMEOUT,
+            "flow_window_closed",
+        )
+        if not closed:
+            logger.warning("Window %r still open after closing it", title)
 
 
 def _set_checkbox_state(checkbox, desired: bool) -> None:
@@ -87,93 +209,47 @@ def _set_checkbox_state(checkbox, desired: bool) -> None:
     if current_bool == desired:
         return
 
-    click_element_center(checkbox)
-    time.sleep(0.2)
+    press_element(checkbox, settle=0.2, label="after_checkbox_click")
 
 
-def _set_checkbox_by_title(window, title: str, desired: bool) -> None:
+def _set_checkbox_by_title(
+    window, title: str, desired: bool, index: FrameIndex | None = None
+) -> None:
     """
     Set an AXCheckBox with the given title to the desired checked state.
     """
-
-    def is_checkbox(el, role, checkbox_title, identifier):
-        return (
-            role == kAXCheckBoxRole
-            and isinstance(checkbox_title, str)
-            and checkbox_title == title
-        )
-
-    checkbox = dfs(window, is_checkbox)
+    index = index or index_tree(window)
+    checkbox = index.find(
+        lambda item: item.role == kAXCheckBoxRole and item.title == title
+    )
     if checkbox is None:
         logger.warning("Could not find checkbox with title %r", title)
         return
 
-    _set_checkbox_state(checkbox, desired)
+    _set_checkbox_state(checkbox.element, desired)
 
 
-def _click_privacy_option(window, label: str) -> None:
+def _click_privacy_option(window, label: str, index: FrameIndex | None = None) -> None:
     """
     Click the radio/button control associated with the given privacy
-    label ("Chats, Moments, WeRun, etc." or "Chats Only").
+    label ("Chats, Moments, WeRun, etc." or "Chats Only"): the closest
+    button to the left of the label on the same row.
     """
-
-    def is_label(el, role, title, identifier):
-        if role != kAXStaticTextRole:
-            return False
-        value = ax_get(el, kAXValueAttribute)
-        return isinstance(value, str) and value == label
-
-    label_el = dfs(window, is_label)
-    if label_el is None:
+    index = index or index_tree(window)
+    label_item = index.find(
+        lambda item: item.role == kAXStaticTextRole and item.value == label
+    )
+    if label_item is None:
         logger.warning("Could not find privacy label %r", label)
         return
 
-    pos_ref = ax_get(label_el, kAXPositionAttribute)
-    point = axvalue_to_point(pos_ref)
-    if point is None:
-        logger.warning("Could not get position for privacy label %r", label)
-        return
-
-    label_x, label_y = point
-
-    # Find the small button to the left of the label on the same row.
-    best_button = None
-    best_dx = None
-
-    def consider_button(el):
-        nonlocal best_button, best_dx
-        role = ax_get(el, kAXRoleAttribute)
-        if role != kAXButtonRole:
-            return
-        pos_ref_btn = ax_get(el, kAXPositionAttribute)
-        point_btn = axvalue_to_point(pos_ref_btn)
-        if point_btn is None:
-            return
-        btn_x, btn_y = point_btn
-        if abs(btn_y - label_y) > 6.0:
-            return
-        if btn_x >= label_x:
-            return
-        dx = label_x - btn_x
-        if best_dx is None or dx < best_dx:
-            best_dx = dx
-            best_button = el
-
-    def walk(el):
-        consider_button(el)
-        children = ax_get(el, kAXChildrenAttribute) or []
-        for child in children:
-            walk(child)
-
-    walk(window)
-
-    if best_button is None:
+    button = index.nearest_left_of(label_item.frame, tolerance=6.0, role=kAXButtonRole)
+    if button is None:
         logger.warning("Could not find button for privacy label %r", label)
         return
 
     logger.info("Clicking privacy option %r", label)
-    click_element_center(best_button)
-    time.sleep(0.2)
+    press_element(button.element, settle=0.2, label="after_privacy_click")
 
 
 def _configure_friend_request_window(
@@ -190,22 +266,20 @@ def _configure_friend_request_window(
 
     Returns the normalized privacy mode that was applied.
     """
+    # One walk of the window serves the lookups up to the privacy click.
+    index = index_tree(window)
+
     # Friending message
     if friending_msg is not None:
-
-        def is_message_area(el, role, title, identifier):
-            return (
-                role == kAXTextAreaRole
-                and isinstance(title, str)
-                and title == "Send Friend Request"
-            )
-
-        msg_area = dfs(window, is_message_area)
+        msg_area = index.find(
+            lambda item: item.role == kAXTextAreaRole
+            and item.title == "Send Friend Request"
+        )
         if msg_area is None:
             logger.warning("Could not find friending message text area")
         else:
-            err = AXUIElementSetAttributeValue(
-                msg_area, kAXValueAttribute, friending_msg
+            err = ax_set(
+                msg_area.element, kAXValueAttribute, friending_msg
             )
             if err != 0:
                 logger.warning("Failed to set friending message text, AX error %s", err)
@@ -214,19 +288,13 @@ def _configure_friend_request_window(
 
     # Remark
     if remark is not None:
-
-        def is_remark_field(el, role, title, identifier):
-            return (
-                role == kAXTextFieldRole
-                and isinstance(title, str)
-                and title == "ModifyRemark"
-            )
-
-        remark_field = dfs(window, is_remark_field)
+        remark_field = index.find(
+            lambda item: item.role == kAXTextFieldRole and item.title == "ModifyRemark"
+        )
         if remark_field is None:
             logger.warning("Could not find remark text field")
         else:
-            err = AXUIElementSetAttributeValue(remark_field, kAXValueAttribute, remark)
+            err = ax_set(remark_field.element, kAXValueAttribute, remark)
             if err != 0:
                 logger.warning("Failed to set remark text, AX error %s", err)
             else:
@@ -239,20 +307,205 @@ def _configure_friend_request_window(
     # Privacy + posts visibility
     privacy_mode = (privacy or "all").strip().lower()
     if privacy_mode in ("chats_only", "chats-only", "chats only"):
-        _click_privacy_option(window, "Chats Only")
+        _click_privacy_option(window, "Chats Only", index)
         logger.info("Privacy set to Chats Only")
     else:
         privacy_mode = "all"
-        _click_privacy_option(window, "Chats, Moments, WeRun, etc.")
+        _click_privacy_option(window, "Chats, Moments, WeRun, etc.", index)
         logger.info("Privacy set to Chats, Moments, WeRun, etc.")
 
         # Only apply hide flags when allowing Moments/Status visibility.
-        _set_checkbox_by_title(window, "Hide My Posts", hide_my_posts)
-        _set_checkbox_by_title(window, "Hide Their Posts", hide_their_posts)
+        # The click changes the layout (the hide options show up under the
+        # selected option), so the window is indexed again.
+        index = index_tree(window)
+        _set_checkbox_by_title(window, "Hide My Posts", hide_my_posts, index)
+        _set_checkbox_by_title(window, "Hide Their Posts", hide_their_posts, index)
 
     return privacy_mode
 
 
+def send_friend_request(
+    session: AddContactSession,
+    wechat_id: str,
+    friending_msg: str | None = None,
+    remark: str | None = None,
+    tags: str | None = None,
+    privacy: str | None = None,
+    hide_my_posts: bool = False,
+    hide_their_posts: bool = False,
+) -> dict[str, Any]:
+    """
+    Run the friend-request flow for one WeChat ID with the elements held
+    by `session` (see add_contact_by_wechat_id for the steps).
+
+    Every step waits for the UI it needs (the search card, the windows,
+    the "Add to Contacts" button) instead of sleeping for a fixed time.
+    Windows left open by an earlier failure are closed first, and the
+    ones this attempt opened are closed again if it fails. Returns the
+    request summary, or {"error", "wechat_id", "stage"} for the step that
+    failed.
+    """
+    _close_flow_windows(session.ax_app)
+    result = _run_friend_request_flow(
+        session,
+        wechat_id,
+        friending_msg=friending_msg,
+        remark=remark,
+        tags=tags,
+        privacy=privacy,
+        hide_my_posts=hide_my_posts,
+        hide_their_posts=hide_their_posts,
+    )
+    if "error" in result:
+        _close_flow_windows(session.ax_app)
+    return result
+
+
+def _run_friend_request_flow(
+    session: AddContactSession,
+    wechat_id: str,
+    friending_msg: str | None = None,
+    remark: str | None = None,
+    tags: str | None = None,
+    privacy: str | None = None,
+    hide_my_posts: bool = False,
+    hide_their_posts: bool = False,
+) -> dict[str, Any]:
+    ax_app = session.ax_app
+
+    # Step 1: global search
+    logger.info("Typing WeChat ID into global search")
+    session.type_search(wechat_id)
+
+    # Step 2: click "Search WeChat ID" card in More section
+    if not _click_more_card_by_title(session, "Search WeChat ID", wechat_id):
+        error_msg = (
+            "Could not find a 'Search WeChat ID' entry in the "
+            "More section of WeChat's global search results."
+        )
+        logger.warning(
+            "add_contact_by_wechat_id(%s) failed at Search WeChat ID step",
+            wechat_id,
+        )
+        return {
+            "error": error_msg,
+            "wechat_id": wechat_id,
+            "stage": "search_wechat_id",
+        }
+
+    # Step 3a: Add Contacts window
+    add_window = _wait_for_window(ax_app, "Add Contacts", timeout=5.0)
+    if add_window is None:
+        error_msg = (
+            "The 'Add Contacts' window did not appear after selecting "
+            "Search WeChat ID."
+        )
+        return {
+            "error": error_msg,
+            "wechat_id": wechat_id,
+            "stage": "add_contacts_window",
+        }
+
+    # Step 3b: Once the profile has loaded (its ID or the add button
+    # shows), make sure it is not another ID's profile before acting on it
+    _wait_until(
+        lambda: _shows_wechat_id(add_window, wechat_id) is not None
+        or dfs(add_window, _is_add_button) is not None,
+        PROFILE_TIMEOUT,
+        "add_contacts_profile",
+    )
+    if _shows_wechat_id(add_window, wechat_id) is False:
+        return {
+            "error": (
+                f"The 'Add Contacts' window shows a different WeChat ID than "
+                f"{wechat_id!r}."
+            ),
+            "wechat_id": wechat_id,
+            "stage": "verify_add_contacts_window",
+        }
+
+    # Step 3c: Click "Add to Contacts" button once the profile shows it
+    try:
+        _click_add_to_contacts_button(add_window)
+    except RuntimeError as e:
+        return {
+            "error": str(e),
+            "wechat_id": wechat_id,
+            "stage": "click_add_to_contacts_button",
+        }
+
+    # Step 4: Send Friend Request window
+    request_window = _wait_for_window(ax_app, "Send Friend Request", timeout=5.0)
+    if request_window is None:
+        error_msg = (
+            "The 'Send Friend Request' window did not appear after "
+            "clicking 'Add to Contacts'."
+        )
+        return {
+            "error": error_msg,
+            "wechat_id": wechat_id,
+            "stage": "send_friend_request_window",
+        }
+
+    applied_privacy = _configure_friend_request_window(
+        request_window,
+        friending_msg=friending_msg,
+        remark=remark,
+        tags=tags,
+        privacy=privacy,
+        hide_my_posts=hide_my_posts,
+        hide_their_posts=hide_their_posts,
+    )
+
+    # Final step: click OK
+
+    def is_ok_button(el, role, title, identifier):
+        return role == kAXButtonRole and isinstance(title, str) and title == "OK"
+
+    ok_button = dfs(request_window, is_ok_button)
+    if ok_button is None:
+        error_msg = "Could not find 'OK' button in Send Friend Request window."
+        logger.warning(error_msg)
+        return {
+            "error": error_msg,
+            "wechat_id": wechat_id,
+            "stage": "confirm_request",
+        }
+
+    logger.info("Clicking 'OK' to send friend request")
+    try:
+        press_element(ok_button, settle=0.4, label="after_ok_click")
+    except RuntimeError as e:
+        return {
+            "error": f"Failed to click OK button: {e}",
+            "wechat_id": wechat_id,
+            "stage": "click_ok_button",
+        }
+
+    # The request window closes once WeChat has sent the request.
+    closed = _wait_until(
+        lambda: _find_window_by_title(ax_app, "Send Friend Request") is None,
+        REQUEST_CLOSE_TIMEOUT,
+        "request_window_closed",
+    )
+    if not closed:
+        logger.warning("Send Friend Request window still open after clicking OK")
+
+    result: dict[str, Any] = {
+        "wechat_id": wechat_id,
+        "friending_msg": friending_msg,
+        "remark": remark,
+        "tags": tags,
+        "privacy": applied_privacy,
+    }
+    if applied_privacy == "all":
+        result["hide_my_posts"] = hide_my_posts
+        result["hide_their_posts"] = hide_their_posts
+
+    logger.info("Friend request flow completed for ID=%s", wechat_id)
+    return result
+
+
 def add_contact_by_wechat_id(
     wechat_id: str,
     friending_msg: str | None = None,
@@ -269,7 +522,8 @@ def add_contact_by_wechat_id(
     High-level flow:
     - Use the global search box to search for the given wechat_id.
     - In the search results, click the "Search WeChat ID" card.
-    - In the "Add Contacts" window, click the "Add to Contacts" button.
+    - Once the "Add Contacts" window shows the profile for wechat_id,
+      click the "Add to Contacts" button.
     - In the "Send Friend Request" window, optionally customize the
       friending message, remark and privacy options, then click "OK".
 
@@ -281,70 +535,9 @@ def add_contact_by_wechat_id(
     """
     logger.info("Starting add_contact_by_wechat_id for ID=%s", wechat_id)
     try:
-        ax_app = get_wechat_ax_app()
-
-        # Step 1: global search
-        logger.info("Typing WeChat ID into global search")
-        focus_and_type_search(ax_app, wechat_id)
-        time.sleep(0.4)
-
-        # Step 2: click "Search WeChat ID" card in More section
-        if not _click_more_card_by_title(ax_app, "Search WeChat ID"):
-            error_msg = (
-                "Could not find a 'Search WeChat ID' entry in the "
-                "More section of WeChat's global search results."
-            )
-            logger.warning(
-                "add_contact_by_wechat_id(%s) failed at Search WeChat ID step",
-                wechat_id,
-            )
-            return {
-                "error": error_msg,
-                "wechat_id": wechat_id,
-                "stage": "search_wechat_id",
-            }
-
-        # Step 3a: Add Contacts window
-        add_window = _wait_for_window(ax_app, "Add Contacts", timeout=5.0)
-        if add_window is None:
-            error_msg = (
-                "The 'Add Contacts' window did not appear after selecting "
-                "Search WeChat ID."
-            )
-            return {
-                "error": error_msg,
-                "wechat_id": wechat_id,
-                "stage": "add_contacts_window",
-            }
-
-        # Wait a moment for the button to appear
-        time.sleep(2)
-
-        # Step 3b: Click "Add to Contacts" button
-        try:
-            _click_add_to_contacts_button(add_window)
-        except RuntimeError as e:
-            return {
-                "error": str(e),
-                "wechat_id": wechat_id,
-                "stage": "click_add_to_contacts_button",
-            }
-
-        # Step 4: Send Friend Request window
-        request_window = _wait_for_window(ax_app, "Send Friend Request", timeout=5.0)
-        if request_window is None:
-            error_msg = (
-                "The 'Send Friend Request' window did not appear after "
-                "clicking 'Add to Contacts'."
-            )
-            return {
-                "error": error_msg,
-                "wechat_id": wechat_id,
-                "stage": "send_friend_request_window",
-            }
-
-        applied_privacy = _configure_friend_request_window(
-            request_window,
+        return send_friend_request(
+            AddContactSession(activate_wechat()),
+            wechat_id,
             friending_msg=friending_msg,
             remark=remark,
             tags=tags,
@@ -352,46 +545,6 @@ def add_contact_by_wechat_id(
             hide_my_posts=hide_my_posts,
             hide_their_posts=hide_their_posts,
         )
-
-        # Final step: click OK
-
-        def is_ok_button(el, role, title, identifier):
-            return role == kAXButtonRole and isinstance(title, str) and title == "OK"
-
-        ok_button = dfs(request_window, is_ok_button)
-        if ok_button is None:
-            error_msg = "Could not find 'OK' button in Send Friend Request window."
-            logger.warning(error_msg)
-            return {
-                "error": error_msg,
-                "wechat_id": wechat_id,
-                "stage": "confirm_request",
-            }
-
-        logger.info("Clicking 'OK' to send friend request")
-        try:
-            click_element_center(ok_button)
-            time.sleep(0.4)
-        except RuntimeError as e:
-            return {
-                "error": f"Failed to click OK button: {e}",
-                "wechat_id": wechat_id,
-                "stage": "click_ok_button",
-            }
-
-        result: dict[str, Any] = {
-            "wechat_id": wechat_id,
-            "friending_msg": friending_msg,
-            "remark": remark,
-            "tags": tags,
-            "privacy": applied_privacy,
-        }
-        if applied_privacy == "all":
-            result["hide_my_posts"] = hide_my_posts
-            result["hide_their_posts"] = hide_their_posts
-
-        logger.info("Friend request flow completed for ID=%s", wechat_id)
-        return result
     except Exception as exc:  # noqa: BLE001
         logger.exception(
             "Error while adding contact by WeChat ID %s: %s", wechat_id, exc
@@ -0,0 +1,871 @@
+from __future__ import annotations
+
+import base64
+import io
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from PIL import Image
+
+from .logging_config import logger
+
+# Accessibility attribute/role/action names. These are the literal values
+# of the ApplicationServices constants, so elements behave identically
+# whichever backend serves them.
+kAXChildrenAttribute = "AXChildren"
+kAXCloseButtonAttribute = "AXCloseButton"
+kAXDescriptionAttribute = "AXDescription"
+kAXIdentifierAttribute = "AXIdentifier"
+kAXNumberOfCharactersAttribute = "AXNumberOfCharacters"
+kAXParentAttribute = "AXParent"
+kAXPositionAttribute = "AXPosition"
+kAXRoleAttribute = "AXRole"
+kAXSelectedTextAttribute = "AXSelectedText"
+kAXSizeAttribute = "AXSize"
+kAXTitleAttribute = "AXTitle"
+kAXValueAttribute = "AXValue"
+kAXVerticalScrollBarAttribute = "AXVerticalScrollBar"
+
+kAXButtonRole = "AXButton"
+kAXCheckBoxRole = "AXCheckBox"
+kAXListRole = "AXList"
+kAXScrollAreaRole = "AXScrollArea"
+kAXSheetRole = "AXSheet"
+kAXStaticTextRole = "AXStaticText"
+kAXTextAreaRole = "AXTextArea"
+kAXTextFieldRole = "AXTextField"
+kAXWindowRole = "AXWindow"
+
+kAXConfirmAction = "AXConfirm"
+kAXPickAction = "AXPick"
+kAXPressAction = "AXPress"
+kAXRaiseAction = "AXRaise"
+kAXScrollToVisibleAction = "AXScrollToVisible"
+
+# Quartz modifier flag for the Command key (kCGEventFlagMaskCommand).
+kCGEventFlagMaskCommand = 1 << 20
+
+
+@dataclass(frozen=True)
+class AXPoint:
+    x: float
+    y: float
+
+
+@dataclass(frozen=True)
+class AXSize:
+    width: float
+    height: float
+
+
+class AXBackend:
+    """
+    Everything the WeChat automation needs from the operating system:
+    attribute reads and writes, actions, synthetic input, the pasteboard,
+    window enumeration and screen capture.
+
+    Elements and attribute values are opaque to callers; geometry values
+    must be converted with point_value()/size_value().
+    """
+
+    name = "abstract"
+
+    # Artificial delay per call: seconds for every call, or a mapping from
+    # method name (e.g. "get_attribute") to seconds with optional "default".
+    # Only honoured by backends that call _delay().
+    latency: float | dict[str, float] = 0.0
+
+    def _delay(self, method: str) -> None:
+        if isinstance(self.latency, dict):
+            seconds = self.latency.get(method, self.latency.get("default", 0.0))
+        else:
+            seconds = self.latency
+        if seconds > 0:
+            time.sleep(seconds)
+
+    # Application lookup
+    def find_app_pid(self, bundle_id: str) -> int | None:
+        raise NotImplementedError
+
+    def is_app_running(self, pid: int) -> bool:
+        raise NotImplementedError
+
+    def activate_app(self, pid: int) -> None:
+        raise NotImplementedError
+
+    def create_app_element(self, pid: int) -> Any:
+        raise NotImplementedError
+
+    # Accessibility
+    def get_attribute(self, element: Any, attribute: str) -> Any:
+        raise NotImplementedError
+
+    def get_attributes(self, element: Any, attributes: list[str]) -> list[Any]:
+        """
+        Read several attributes of one element, None for any that cannot
+        be read. Backends with a batched call override this.
+        """
+        return [self.get_attribute(element, attribute) for attribute in attributes]
+
+    def set_attribute(self, element: Any, attribute: str, value: Any) -> int:
+        raise NotImplementedError
+
+    def perform_action(self, element: Any, action: str) -> int:
+        raise NotImplementedError
+
+    def is_element(self, value: Any) -> bool:
+        raise NotImplementedError
+
+    def point_value(self, value: Any) -> tuple[float, float] | None:
+        raise NotImplementedError
+
+    def size_value(self, value: Any) -> tuple[float, float] | None:
+        raise NotImplementedError
+
+    # Synthetic input
+    def post_key(self, keycode: int, flags: int = 0) -> None:
+        raise NotImplementedError
+
+    def post_mouse(self, x: float, y: float, down: bool) -> None:
+        raise NotImplementedError
+
+    def post_scroll(self, x: float, y: float, delta_lines: int) -> None:
+        raise NotImplementedError
+
+    # Pasteboard
+    def save_pasteboard(self) -> Any:
+        raise NotImplementedError
+
+    def set_pasteboard_text(self, text: str) -> None:
+        raise NotImplementedError
+
+    def restore_pasteboard(self, saved: Any) -> None:
+        raise NotImplementedError
+
+    def pasteboard_change_count(self) -> int:
+        """
+        Counter bumped whenever anyone writes the pasteboard.
+        """
+        raise NotImplementedError
+
+    # Notifications
+    def observe(
+        self, element: Any, notifications: list[str], callback: Callable[[str], None]
+    ) -> Any:
+        """
+        Call `callback(notification)` whenever one of the AX
+        `notifications` is posted for `element` or its descendants, from
+        a backend thread. Returns a handle for unobserve(), or None if
+        the backend cannot deliver notifications (callers then poll).
+        """
+        return None
+
+    def unobserve(self, handle: Any) -> None:
+        return None
+
+    # Windows and screen capture
+    def list_windows(self) -> list[dict[str, Any]]:
+        """
+        Return on- and off-screen windows as dicts with keys "id", "pid",
+        "layer" and "bounds" (x, y, width, height).
+        """
+        raise NotImplementedError
+
+    def capture_screen(self, bbox: tuple[int, int, int, int]) -> Image.Image:
+        raise NotImplementedError
+
+    def capture_window(
+        self, window_id: int, rect: tuple[float, float, float, float]
+    ) -> Image.Image | None:
+        raise NotImplementedError
+
+
+class PyObjCBackend(AXBackend):
+    """
+    The real macOS backend built on PyObjC's AppKit, ApplicationServices
+    and Quartz bindings.
+    """
+
+    name = "pyobjc"
+
+    def __init__(self) -> None:
+        import AppKit
+        import ApplicationServices
+        import Quartz
+        from PIL import ImageGrab
+
+        self._appkit = AppKit
+        self._ax = ApplicationServices
+        self._quartz = Quartz
+        self._image_grab = ImageGrab
+        self._apps: dict[int, Any] = {}
+
+    def find_app_pid(self, bundle_id: str) -> int | None:
+        apps = self._appkit.NSRunningApplication.runningApplicationsWithBundleIdentifier_(
+            bundle_id
+        )
+        if not apps:
+            return None
+        app = apps[0]
+        pid = int(app.processIdentifier())
+        self._apps[pid] = app
+        return pid
+
+    def is_app_running(self, pid: int) -> bool:
+        app = self._apps.get(pid)
+        if app is None or app.isTerminated():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def activate_app(self, pid: int) -> None:
+        app = self._apps.get(pid)
+        if app is None:
+            app = self._appkit.NSRunningApplication.runningApplicationWithProcessIdentifier_(
+                pid
+            )
+        app.activateWithOptions_(self._appkit.NSApplicationActivateIgnoringOtherApps)
+
+    def create_app_element(self, pid: int) -> Any:
+        return self._ax.AXUIElementCreateApplication(pid)
+
+    def get_attribute(self, element: Any, attribute: str) -> Any:
+        err, value = self._ax.AXUIElementCopyAttributeValue(element, attribute, None)
+        if err != 0:
+            return None
+        return value
+
+    def get_attributes(self, element: Any, attributes: list[str]) -> list[Any]:
+        # One IPC round trip instead of one per attribute.
+        err, values = self._ax.AXUIElementCopyMultipleAttributeValues(
+            element, attributes, 0, None
+        )
+        if err != 0 or values is None:
+            return [None] * len(attributes)
+        results = []
+        for value in values:
+            try:
+                is_error = self._ax.AXValueGetType(value) == self._ax.kAXValueAXErrorType
+            except Exception:  # noqa: BLE001
+                is_error = False
+            results.append(None if is_error else value)
+        return results
+
+    def set_attribute(self, element: Any, attribute: str, value: Any) -> int:
+        return self._ax.AXUIElementSetAttributeValue(element, attribute, value)
+
+    def perform_action(self, element: Any, action: str) -> int:
+        return self._ax.AXUIElementPerformAction(element, action)
+
+    def is_element(self, value: Any) -> bool:
+        try:
+            return self._ax.CFGetTypeID(value) == self._ax.AXUIElementGetTypeID()
+        except Exception:  # noqa: BLE001
+            return False
+
+    def _ax_value(self, value: Any, value_type: int):
+        if value is None:
+            return None
+        try:
+            if self._ax.AXValueGetType(value) != value_type:
+                return None
+        except Exception:  # noqa: BLE001
+            return None
+        ok, struct = self._ax.AXValueGetValue(value, value_type, None)
+        return struct if ok else None
+
+    def point_value(self, value: Any) -> tuple[float, float] | None:
+        point = self._ax_value(value, self._ax.kAXValueCGPointType)
+        if point is None:
+            return None
+        return float(point.x), float(point.y)
+
+    def size_value(self, value: Any) -> tuple[float, float] | None:
+        size = self._ax_value(value, self._ax.kAXValueCGSizeType)
+        if size is None:
+            return None
+        return float(size.width), float(size.height)
+
+    def post_key(self, keycode: int, flags: int = 0) -> None:
+        q = self._quartz
+        event_down = q.CGEventCreateKeyboardEvent(None, keycode, True)
+        q.CGEventSetFlags(event_down, flags)
+        event_up = q.CGEventCreateKeyboardEvent(None, keycode, False)
+        q.CGEventSetFlags(event_up, flags)
+        q.CGEventPost(q.kCGHIDEventTap, event_down)
+        q.CGEventPost(q.kCGHIDEventTap, event_up)
+
+    def post_mouse(self, x: float, y: float, down: bool) -> None:
+        q = self._quartz
+        kind = q.kCGEventLeftMouseDown if down else q.kCGEventLeftMouseUp
+        event = q.CGEventCreateMouseEvent(None, kind, q.CGPoint(x, y), 0)
+        q.CGEventPost(q.kCGHIDEventTap, event)
+
+    def post_scroll(self, x: float, y: float, delta_lines: int) -> None:
+        q = self._quartz
+        event = q.CGEventCreateScrollWheelEvent(
+            None, q.kCGScrollEventUnitLine, 1, delta_lines
+        )
+        q.CGEventSetLocation(event, q.CGPoint(x, y))
+        q.CGEventPost(q.kCGHIDEventTap, event)
+
+    def save_pasteboard(self) -> Any:
+        # Copy the data out: the pasteboard's own items are invalidated by
+        # clearContents() and cannot be written back.
+        saved = []
+        for item in self._appkit.NSPasteboard.generalPasteboard().pasteboardItems() or []:
+            copy = self._appkit.NSPasteboardItem.alloc().init()
+            for pb_type in item.types():
+                data = item.dataForType_(pb_type)
+                if data is not None:
+                    copy.setData_forType_(data, pb_type)
+            saved.append(copy)
+        return saved
+
+    def set_pasteboard_text(self, text: str) -> None:
+        pb = self._appkit.NSPasteboard.generalPasteboard()
+        pb.clearContents()
+        pb.setString_forType_(text, self._appkit.NSPasteboardTypeString)
+
+    def restore_pasteboard(self, saved: Any) -> None:
+        pb = self._appkit.NSPasteboard.generalPasteboard()
+        pb.clearContents()
+        if saved:
+            pb.writeObjects_(saved)
+
+    def pasteboard_change_count(self) -> int:
+        return int(self._appkit.NSPasteboard.generalPasteboard().changeCount())
+
+    def observe(
+        self, element: Any, notifications: list[str], callback: Callable[[str], None]
+    ) -> Any:
+        import CoreFoundation
+
+        ax = self._ax
+        err, pid = ax.AXUIElementGetPid(element, None)
+        if err != 0:
+            return None
+
+        def on_notification(observer, target, notification, refcon):
+            try:
+                callback(str(notification))
+            except Exception:  # noqa: BLE001
+                logger.exception("AX notification callback failed")
+
+        err, observer = ax.AXObserverCreate(pid, on_notification, None)
+        if err != 0:
+            logger.warning("AXObserverCreate failed (err=%s); notifications disabled", err)
+            return None
+        added = [
+            name
+            for name in notifications
+            if ax.AXObserverAddNotification(observer, element, name, None) == 0
+        ]
+        if not added:
+            return None
+
+        # The observer delivers on the run loop it is attached to, so it
+        # gets a thread of its own.
+        handle: dict[str, Any] = {"observer": observer, "stop": threading.Event()}
+
+        def run() -> None:
+            CoreFoundation.CFRunLoopAddSource(
+                CoreFoundation.CFRunLoopGetCurrent(),
+                ax.AXObserverGetRunLoopSource(observer),
+                CoreFoundation.kCFRunLoopDefaultMode,
+            )
+            while not handle["stop"].is_set():
+                CoreFoundation.CFRunLoopRunInMode(
+                    CoreFoundation.kCFRunLoopDefaultMode, 0.5, False
+                )
+
+        threading.Thread(target=run, name="ax-observer", daemon=True).start()
+        logger.info("Observing AX notifications: %s", ", ".join(added))
+        return handle
+
+    def unobserve(self, handle: Any) -> None:
+        if handle is not None:
+            handle["stop"].set()
+
+    def list_windows(self) -> list[dict[str, Any]]:
+        q = self._quartz
+        infos = q.CGWindowListCopyWindowInfo(
+            q.kCGWindowListOptionAll | q.kCGWindowListExcludeDesktopElements,
+            q.kCGNullWindowID,
+        )
+        windows = []
+        for info in infos or []:
+            bounds = info.get(q.kCGWindowBounds) or {}
+            windows.append(
+                {
+                    "id": int(info[q.kCGWindowNumber]),
+                    "pid": int(info.get(q.kCGWindowOwnerPID, -1)),
+                    "layer": int(info.get(q.kCGWindowLayer, 0)),
+                    "bounds": (
+                        float(bounds.get("X", 0.0)),
+                        float(bounds.get("Y", 0.0)),
+                        float(bounds.get("Width", 0.0)),
+                        float(bounds.get("Height", 0.0)),
+                    ),
+                }
+            )
+        return windows
+
+    def capture_screen(self, bbox: tuple[int, int, int, int]) -> Image.Image:
+        return self._image_grab.grab(bbox=bbox)
+
+    def capture_window(
+        self, window_id: int, rect: tuple[float, float, float, float]
+    ) -> Image.Image | None:
+        q = self._quartz
+        x, y, w, h = rect
+        cg_image = q.CGWindowListCreateImage(
+            q.CGRectMake(x, y, w, h),
+            q.kCGWindowListOptionIncludingWindow,
+            window_id,
+            q.kCGWindowImageBoundsIgnoreFraming | q.kCGWindowImageNominalResolution,
+        )
+        if cg_image is None:
+            return None
+        width = q.CGImageGetWidth(cg_image)
+        height = q.CGImageGetHeight(cg_image)
+        bytes_per_row = q.CGImageGetBytesPerRow(cg_image)
+        data = q.CGDataProviderCopyData(q.CGImageGetDataProvider(cg_image))
+        image = Image.frombuffer(
+            "RGBA", (width, height), bytes(data), "raw", "BGRA", bytes_per_row, 1
+        ).convert("RGB")
+        if image.size != (int(w), int(h)):
+            image = image.resize((int(w), int(h)))
+        return image
+
+
+def _image_to_b64(image: Image.Image) -> str:
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def _image_from_b64(data: str) -> Image.Image:
+    return Image.open(io.BytesIO(base64.b64decode(data))).convert("RGB")
+
+
+class RecordingBackend(AXBackend):
+    """
+    Wrap another backend and record every response it gives, so that a
+    real session can later be served by ReplayBackend.
+
+    Elements are assigned stable integer IDs; attribute reads are stored
+    as per-(element, attribute) response sequences, and screen captures
+    are stored as PNGs.
+    """
+
+    name = "record"
+
+    def __init__(self, inner: AXBackend) -> None:
+        self.inner = inner
+        self._lock = threading.Lock()
+        self._ids: dict[Any, int] = {}
+        self._unhashable: list[tuple[Any, int]] = []
+        self.responses: dict[int, dict[str, list[Any]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        self.events: list[dict[str, Any]] = []
+        self.captures: list[dict[str, Any]] = []
+        self.windows: list[dict[str, Any]] = []
+        self.app: dict[str, Any] = {}
+        self.root: Any = None
+
+    def _element_id(self, element: Any) -> int:
+        try:
+            existing = self._ids.get(element)
+        except TypeError:
+            for candidate, element_id in self._unhashable:
+                if candidate == element:
+                    return element_id
+            element_id = len(self._ids) + len(self._unhashable)
+            self._unhashable.append((element, element_id))
+            return element_id
+        if existing is not None:
+            return existing
+        element_id = len(self._ids) + len(self._unhashable)
+        self._ids[element] = element_id
+        return element_id
+
+    def _encode(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, str):
+            return str(value)
+        if self.inner.is_element(value):
+            return {"$el": self._element_id(value)}
+        point = self.inner.point_value(value)
+        if point is not None:
+            return {"$point": list(point)}
+        size = self.inner.size_value(value)
+        if size is not None:
+            return {"$size": list(size)}
+        try:
+            return [self._encode(item) for item in value]
+        except TypeError:
+            return str(value)
+
+    def find_app_pid(self, bundle_id: str) -> int | None:
+        pid = self.inner.find_app_pid(bundle_id)
+        self.app.update({"bundle_id": bundle_id, "pid": pid})
+        return pid
+
+    def is_app_running(self, pid: int) -> bool:
+        return self.inner.is_app_running(pid)
+
+    def activate_app(self, pid: int) -> None:
+        self.events.append({"type": "activate", "pid": pid})
+        self.inner.activate_app(pid)
+
+    def create_app_element(self, pid: int) -> Any:
+        element = self.inner.create_app_element(pid)
+        with self._lock:
+            self.root = element
+            self.app["root"] = self._element_id(element)
+        return element
+
+    def get_attribute(self, element: Any, attribute: str) -> Any:
+        value = self.inner.get_attribute(element, attribute)
+        with self._lock:
+            self.responses[self._element_id(element)][attribute].append(
+                self._encode(value)
+            )
+        return value
+
+    def set_attribute(self, element: Any, attribute: str, value: Any) -> int:
+        err = self.inner.set_attribute(element, attribute, value)
+        with self._lock:
+            self.events.append(
+                {
+                    "type": "set",
+                    "element": self._element_id(element),
+                    "attribute": attribute,
+                    "value": self._encode(value),
+                    "err": err,
+                }
+            )
+        return err
+
+    def perform_action(self, element: Any, action: str) -> int:
+        err = self.inner.perform_action(element, action)
+        with self._lock:
+            self.events.append(
+                {
+                    "type": "action",
+                    "element": self._element_id(element),
+                    "action": action,
+                    "err": err,
+                }
+            )
+        return err
+
+    def is_element(self, value: Any) -> bool:
+        return self.inner.is_element(value)
+
+    def point_value(self, value: Any) -> tuple[float, float] | None:
+        return self.inner.point_value(value)
+
+    def size_value(self, value: Any) -> tuple[float, float] | None:
+        return self.inner.size_value(value)
+
+    def post_key(self, keycode: int, flags: int = 0) -> None:
+        self.events.append({"type": "key", "keycode": keycode, "flags": flags})
+        self.inner.post_key(keycode, flags)
+
+    def post_mouse(self, x: float, y: float, down: bool) -> None:
+        self.events.append({"type": "mouse", "x": x, "y": y, "down": down})
+        self.inner.post_mouse(x, y, down)
+
+    def post_scroll(self, x: float, y: float, delta_lines: int) -> None:
+        self.events.append({"type": "scroll", "x": x, "y": y, "delta": delta_lines})
+        self.inner.post_scroll(x, y, delta_lines)
+
+    def save_pasteboard(self) -> Any:
+        return self.inner.save_pasteboard()
+
+    def set_pasteboard_text(self, text: str) -> None:
+        self.events.append({"type": "pasteboard", "text": text})
+        self.inner.set_pasteboard_text(text)
+
+    def restore_pasteboard(self, saved: Any) -> None:
+        self.inner.restore_pasteboard(saved)
+
+    def pasteboard_change_count(self) -> int:
+        return self.inner.pasteboard_change_count()
+
+    def observe(
+        self, element: Any, notifications: list[str], callback: Callable[[str], None]
+    ) -> Any:
+        return self.inner.observe(element, notifications, callback)
+
+    def unobserve(self, handle: Any) -> None:
+        self.inner.unobserve(handle)
+
+    def list_windows(self) -> list[dict[str, Any]]:
+        windows = self.inner.list_windows()
+        self.windows = [dict(w, bounds=list(w["bounds"])) for w in windows]
+        return windows
+
+    def capture_screen(self, bbox: tuple[int, int, int, int]) -> Image.Image:
+        image = self.inner.capture_screen(bbox)
+        self.captures.append(
+            {"kind": "screen", "rect": list(bbox), "png": _image_to_b64(image)}
+        )
+        return image
+
+    def capture_window(
+        self, window_id: int, rect: tuple[float, float, float, float]
+    ) -> Image.Image | None:
+        image = self.inner.capture_window(window_id, rect)
+        if image is not None:
+            self.captures.append(
+                {
+                    "kind": "window",
+                    "window_id": window_id,
+                    "rect": list(rect),
+                    "png": _image_to_b64(image),
+                }
+            )
+        return image
+
+    def snapshot(self, root: Any, max_depth: int | None = None) -> None:
+        """
+        Walk the tree under `root`, reading the attributes the automation
+        uses, so the recording covers nodes the session did not touch.
+        """
+        attributes = (
+            kAXRoleAttribute,
+            kAXTitleAttribute,
+            kAXIdentifierAttribute,
+            kAXValueAttribute,
+            kAXPositionAttribute,
+            kAXSizeAttribute,
+        )
+
+        def walk(element, depth):
+            for attribute in attributes:
+                self.get_attribute(element, attribute)
+            if max_depth is not None and depth >= max_depth:
+                return
+            for child in self.get_attribute(element, kAXChildrenAttribute) or []:
+                walk(child, depth + 1)
+
+        walk(root, 0)
+
+    def save(self, path: str | Path, snapshot: bool = False) -> None:
+        """
+        Write the recording as JSON, optionally snapshotting the whole
+        application tree first.
+        """
+        if snapshot and self.root is not None:
+            self.snapshot(self.root)
+        with self._lock:
+            data = {
+                "version": 1,
+                "app": self.app,
+                "responses": {
+                    str(element_id): dict(attrs)
+                    for element_id, attrs in self.responses.items()
+                },
+                "events": self.events,
+                "captures": self.captures,
+                "windows": self.windows,
+            }
+        path = Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data), encoding="utf-8")
+        logger.info(
+            "Saved AX recording with %d elements and %d captures to %s",
+            len(data["responses"]),
+            len(self.captures),
+            path,
+        )
+
+
+@dataclass(frozen=True)
+class ReplayElement:
+    id: int
+
+
+class ReplayBackend(AXBackend):
+    """
+    Serve a RecordingBackend session deterministically, without macOS.
+
+    Each (element, attribute) pair returns its recorded responses in
+    order, repeating the last one once exhausted. Writes, actions and
+    synthetic input are logged in `events` and otherwise ignored.
+    `latency` adds an artificial delay per call: either one value in
+    seconds for every call, or a mapping from method name (e.g.
+    "get_attribute", "capture_screen") to seconds.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self, recording: str | Path | dict[str, Any], latency: float | dict[str, float] = 0.0
+    ) -> None:
+        if not isinstance(recording, dict):
+            recording = json.loads(Path(recording).expanduser().read_text("utf-8"))
+        self.recording = recording
+        self.latency = latency
+        self.app = recording.get("app", {})
+        self._responses: dict[int, dict[str, list[Any]]] = {
+            int(element_id): attrs
+            for element_id, attrs in recording.get("responses", {}).items()
+        }
+        self._cursor: dict[tuple[int, str], int] = defaultdict(int)
+        self._captures: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for capture in recording.get("captures", []):
+            self._captures[capture["kind"]].append(capture)
+        self._capture_cursor: dict[str, int] = defaultdict(int)
+        self.events: list[dict[str, Any]] = []
+
+    def _decode(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            if "$el" in value:
+                return ReplayElement(int(value["$el"]))
+            if "$point" in value:
+                return AXPoint(*value["$point"])
+            if "$size" in value:
+                return AXSize(*value["$size"])
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        return value
+
+    def find_app_pid(self, bundle_id: str) -> int | None:
+        self._delay("find_app_pid")
+        return self.app.get("pid")
+
+    def is_app_running(self, pid: int) -> bool:
+        return pid == self.app.get("pid")
+
+    def activate_app(self, pid: int) -> None:
+        self._delay("activate_app")
+        self.events.append({"type": "activate", "pid": pid})
+
+    def create_app_element(self, pid: int) -> Any:
+        return ReplayElement(int(self.app.get("root", 0)))
+
+    def get_attribute(self, element: Any, attribute: str) -> Any:
+        self._delay("get_attribute")
+        if not isinstance(element, ReplayElement):
+            return None
+        sequence = self._responses.get(element.id, {}).get(attribute)
+        if not sequence:
+            return None
+        key = (element.id, attribute)
+        index = min(self._cursor[key], len(sequence) - 1)
+        self._cursor[key] += 1
+        return self._decode(sequence[index])
+
+    def set_attribute(self, element: Any, attribute: str, value: Any) -> int:
+        self._delay("set_attribute")
+        self.events.append(
+            {"type": "set", "element": element, "attribute": attribute, "value": value}
+        )
+        return 0
+
+    def perform_action(self, element: Any, action: str) -> int:
+        self._delay("perform_action")
+        self.events.append({"type": "action", "element": element, "action": action})
+        return 0
+
+    def is_element(self, value: Any) -> bool:
+        return isinstance(value, ReplayElement)
+
+    def point_value(self, value: Any) -> tuple[float, float] | None:
+        if isinstance(value, AXPoint):
+            return value.x, value.y
+        return None
+
+    def size_value(self, value: Any) -> tuple[float, float] | None:
+        if isinstance(value, AXSize):
+            return value.width, value.height
+        return None
+
+    def post_key(self, keycode: int, flags: int = 0) -> None:
+        self._delay("post_key")
+        self.events.append({"type": "key", "keycode": keycode, "flags": flags})
+
+    def post_mouse(self, x: float, y: float, down: bool) -> None:
+        self._delay("post_mouse")
+        self.events.append({"type": "mouse", "x": x, "y": y, "down": down})
+
+    def post_scroll(self, x: float, y: float, delta_lines: int) -> None:
+        self._delay("post_scroll")
+        self.events.append({"type": "scroll", "x": x, "y": y, "delta": delta_lines})
+
+    def save_pasteboard(self) -> Any:
+        return None
+
+    def set_pasteboard_text(self, text: str) -> None:
+        self.events.append({"type": "pasteboard", "text": text})
+
+    def restore_pasteboard(self, saved: Any) -> None:
+        return None
+
+    def pasteboard_change_count(self) -> int:
+        return 0
+
+    def list_windows(self) -> list[dict[str, Any]]:
+        self._delay("list_windows")
+        return [
+            dict(w, bounds=tuple(w["bounds"])) for w in self.recording.get("windows", [])
+        ]
+
+    def _next_capture(self, kind: str, size: tuple[int, int]) -> Image.Image:
+        captures = self._captures.get(kind) or []
+        if not captures:
+            return Image.new("RGB", size, (255, 255, 255))
+        index = min(self._capture_cursor[kind], len(captures) - 1)
+        self._capture_cursor[kind] += 1
+        return _image_from_b64(captures[index]["png"])
+
+    def capture_screen(self, bbox: tuple[int, int, int, int]) -> Image.Image:
+        self._delay("capture_screen")
+        left, top, right, bottom = bbox
+        return self._next_capture("screen", (max(1, right - left), max(1, bottom - top)))
+
+    def capture_window(
+        self, window_id: int, rect: tuple[float, float, float, float]
+    ) -> Image.Image | None:
+        self._delay("capture_window")
+        _, _, w, h = rect
+        return self._next_capture("window", (max(1, int(w)), max(1, int(h))))
+
+
+_backend: AXBackend | None = None
+
+
+def get_backend() -> AXBackend:
+    """
+    Return the active backend, creating the PyObjC one on first use.
+    """
+    global _backend
+    if _backend is None:
+        _backend = PyObjCBackend()
+    return _backend
+
+
+def set_backend(backend: AXBackend) -> None:
+    """
+    Install a backend for all subsequent WeChat automation calls.
+    """
+    global _backend
+    _backend = backend
+    logger.info("Using %s accessibility backend", backend.name)
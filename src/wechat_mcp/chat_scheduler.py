@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .logging_config import logger
+from .metrics import stats as latency_stats
+
+
+@dataclass
+class _Job:
+    chat_name: str | None
+    fn: Callable[..., Any]
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+    future: Future
+    enqueued_at: float
+    seq: int
+
+
+class ChatScheduler:
+    """
+    Run WeChat UI operations one at a time on a dedicated worker thread,
+    reordering queued work so that chat switches are kept to a minimum.
+
+    Every job is tagged with the chat it targets (or None for work that
+    does not depend on the open chat, such as adding a contact). Pending
+    jobs are grouped per chat and picked as follows:
+    - If the oldest pending job has waited at least `max_wait` seconds,
+      or needs no chat switch (it targets the open chat or no chat), run
+      it next.
+    - Otherwise, run the oldest job for the currently open chat, since it
+      does not require a chat switch.
+    - Otherwise, run the oldest pending job overall.
+
+    Chat-independent jobs never jump the queue: they run in arrival order
+    behind older work for any chat.
+
+    Only the head of each chat's queue is ever considered, so jobs that
+    target the same chat (e.g. several sends) keep their arrival order.
+
+    `current_chat_fn`, if given, reports the chat that is actually open;
+    otherwise the chat of the last successful job is assumed to be open.
+    """
+
+    def __init__(
+        self,
+        max_wait: float = 5.0,
+        stats_window: float = 60.0,
+        current_chat_fn: Callable[[], str | None] | None = None,
+    ):
+        self.max_wait = max_wait
+        self.stats_window = stats_window
+        self._current_chat_fn = current_chat_fn
+
+        self._cond = threading.Condition()
+        self._queues: dict[str | None, deque[_Job]] = {}
+        self._seq = 0
+        self._worker: threading.Thread | None = None
+
+        self._last_chat: str | None = None
+        self._started_at = time.monotonic()
+        self._jobs_run = 0
+        self._switches = 0
+        self._switches_avoided = 0
+        self._avoided_at: deque[float] = deque()
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    @property
+    def current_chat(self) -> str | None:
+        if self._current_chat_fn is not None:
+            return self._current_chat_fn()
+        return self._last_chat
+
+    def submit(
+        self, chat_name: str | None, fn: Callable[..., Any], *args, **kwargs
+    ) -> Future:
+        """
+        Queue `fn(*args, **kwargs)` for execution against `chat_name` and
+        return a Future for its result.
+        """
+        future: Future = Future()
+        with self._cond:
+            self._seq += 1
+            job = _Job(
+                chat_name=chat_name,
+                fn=fn,
+                args=args,
+                kwargs=kwargs,
+                future=future,
+                enqueued_at=time.monotonic(),
+                seq=self._seq,
+            )
+            self._queues.setdefault(chat_name, deque()).append(job)
+            self._ensure_worker()
+            self._cond.notify()
+        return future
+
+    async def run(self, chat_name: str | None, fn: Callable[..., Any], *args, **kwargs):
+        """
+        Awaitable wrapper around submit() for use from async MCP tools.
+        """
+        return await asyncio.wrap_future(self.submit(chat_name, fn, *args, **kwargs))
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return scheduling counters, including switches avoided per minute.
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._prune_avoided(now)
+            elapsed_min = max((now - self._started_at) / 60.0, 1e-9)
+            return {
+                "current_chat": self.current_chat,
+                "pending": sum(len(queue) for queue in self._queues.values()),
+                "jobs_run": self._jobs_run,
+                "chat_switches": self._switches,
+                "switches_avoided": self._switches_avoided,
+                "switches_avoided_last_minute": len(self._avoided_at),
+                "switches_avoided_per_minute": self._switches_avoided / elapsed_min,
+                "avg_queue_wait_s": (
+                    self._total_wait / self._jobs_run if self._jobs_run else 0.0
+                ),
+                "max_queue_wait_s": self._max_wait_seen,
+            }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(
+            target=self._worker_loop, name="wechat-ui-scheduler", daemon=True
+        )
+        self._worker.start()
+
+    def _prune_avoided(self, now: float) -> None:
+        while self._avoided_at and now - self._avoided_at[0] > self.stats_window:
+            self._avoided_at.popleft()
+
+    def _next_job(self) -> _Job:
+        """
+        Pop the next job to run. Must be called with the lock held and at
+        least one job pending.
+        """
+        now = time.monotonic()
+        current_chat = self.current_chat
+        heads = [queue[0] for queue in self._queues.values() if queue]
+        oldest = min(heads, key=lambda job: job.seq)
+
+        if now - oldest.enqueued_at >= self.max_wait or oldest.chat_name in (
+            None,
+            current_chat,
+        ):
+            chosen = oldest
+        else:
+            affine = [
+                job
+                for job in heads
+                if job.chat_name is not None and job.chat_name == current_chat
+            ]
+            chosen = min(affine, key=lambda job: job.seq) if affine else oldest
+
+        if chosen is not oldest:
+            # Only a job for the open chat is ever picked over the oldest
+            # one, and only when the oldest needs a switch.
+            self._switches_avoided += 1
+            self._avoided_at.append(now)
+            self._prune_avoided(now)
+            logger.info(
+                "Scheduler kept chat %r open ahead of older job for %r "
+                "(%d switches avoided in the last minute)",
+                current_chat,
+                oldest.chat_name,
+                len(self._avoided_at),
+            )
+
+        queue = self._queues[chosen.chat_name]
+        queue.popleft()
+        if not queue:
+            del self._queues[chosen.chat_name]
+        return chosen
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+                job = self._next_job()
+                waited = time.monotonic() - job.enqueued_at
+                self._jobs_run += 1
+                self._total_wait += waited
+                self._max_wait_seen = max(self._max_wait_seen, waited)
+                if job.chat_name is not None and job.chat_name != self.current_chat:
+                    self._switches += 1
+            latency_stats.record("queue_wait", waited)
+
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            logger.debug(
+                "Scheduler running job #%d for chat=%r after %.3fs in queue",
+                job.seq,
+                job.chat_name,
+                waited,
+            )
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as exc:  # noqa: BLE001
+                job.future.set_exception(exc)
+            else:
+                if job.chat_name is not None:
+                    with self._cond:
+                        self._last_chat = job.chat_name
+                job.future.set_result(result)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from .logging_config import logger
+
+
+def state_dir() -> Path:
+    """
+    Directory for durable server state (checkpoints, queues).
+
+    Customizable via WECHAT_MCP_STATE_DIR, otherwise a "state" directory
+    relative to the current working directory is used.
+    """
+    path = Path(os.getenv("WECHAT_MCP_STATE_DIR", "state")).expanduser().resolve()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def checkpoint_key(*parts: Any) -> str:
+    """
+    Stable short key derived from JSON-serializable parts, so the same
+    request maps to the same checkpoint across restarts.
+    """
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class Checkpoint:
+    """
+    Per-item completion record for a long-running multi-item operation,
+    persisted as JSON under state_dir()/<kind>/<key>.json.
+
+    Each completed item is written immediately, so a rerun after a crash
+    or timeout can skip everything already done.
+    """
+
+    def __init__(self, kind: str, key: str) -> None:
+        self.kind = kind
+        self.key = key
+        self.path = state_dir() / kind / f"{key}.json"
+        self._lock = threading.Lock()
+        self.done: dict[str, Any] = {}
+        if self.path.exists():
+            try:
+                self.done = json.loads(self.path.read_text(encoding="utf-8"))["done"]
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("Ignoring unreadable checkpoint %s: %s", self.path, exc)
+
+    def is_done(self, item: str) -> bool:
+        return item in self.done
+
+    def mark_done(self, item: str, result: Any = True) -> None:
+        with self._lock:
+            self.done[item] = result
+            write_json_atomic(self.path, {"kind": self.kind, "key": self.key, "done": self.done})
+
+    def clear(self) -> None:
+        with self._lock:
+            self.done = {}
+            self.path.unlink(missing_ok=True)
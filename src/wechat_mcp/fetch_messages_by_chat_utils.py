@@ -1,24 +1,30 @@
 from __future__ import annotations
 
-import time
 from dataclasses import asdict, dataclass
 from typing import Any, Literal
 
-from ApplicationServices import (
+from .ax_backend import (
+    get_backend,
     kAXChildrenAttribute,
     kAXListRole,
+    kAXParentAttribute,
     kAXPositionAttribute,
+    kAXRoleAttribute,
+    kAXScrollAreaRole,
     kAXSizeAttribute,
     kAXTitleAttribute,
     kAXValueAttribute,
+    kAXVerticalScrollBarAttribute,
 )
-from PIL import ImageGrab
-
 from .logging_config import logger
+from .metrics import span, wait
 from .wechat_accessibility import (
+    activate_wechat,
     ax_get,
+    ax_set,
     axvalue_to_point,
     axvalue_to_size,
+    find_wechat_window_id,
     get_list_center,
     get_wechat_ax_app,
     post_scroll,
@@ -26,6 +32,16 @@ from .wechat_accessibility import (
 )
 
 
+# Scroll-wheel lines per foreground page.
+SCROLL_LINES = 50
+# Scroll-bar step probed first when the list does not report its content
+# height.
+AX_PROBE_STEP = 0.001
+# Retries with a halved step before giving up on reaching older pages
+# without skipping rows.
+MAX_BACKOFFS = 16
+
+
 def get_messages_list(ax_app: Any) -> Any:
     """
     Find the AX list that contains chat messages in the current WeChat window.
@@ -40,10 +56,13 @@ def get_messages_list(ax_app: Any) -> Any:
     return msg_list
 
 
-def capture_message_area(msg_list: Any):
+def capture_message_area(msg_list: Any, window_id: int | None = None):
     """
     Capture a screenshot of the visible message area for the given list and
     return the image together with the list origin and size.
+
+    When `window_id` is given, only that window's own pixels are captured,
+    so the result is correct even if other windows cover WeChat.
     """
     pos_ref = ax_get(msg_list, kAXPositionAttribute)
     size_ref = ax_get(msg_list, kAXSizeAttribute)
@@ -55,9 +74,16 @@ def capture_message_area(msg_list: Any):
     x, y = origin
     w, h = size
 
-    bbox = (int(x), int(y), int(x + w), int(y + h))
-    image = ImageGrab.grab(bbox=bbox)
-    return image, origin, size
+    with span("capture", background=window_id is not None):
+        if window_id is None:
+            bbox = (int(x), int(y), int(x + w), int(y + h))
+            image = get_backend().capture_screen(bbox)
+            return image, origin, size
+
+        image = get_backend().capture_window(window_id, (x, y, w, h))
+        if image is None:
+            raise RuntimeError(f"Failed to capture WeChat window {window_id}")
+        return image, origin, size
 
 
 def scroll_to_bottom(msg_list: Any, center: tuple[float, float]) -> None:
@@ -72,7 +98,7 @@ def scroll_to_bottom(msg_list: Any, center: tuple[float, float]) -> None:
     for _ in range(40):
         # Negative delta moves towards newer messages (bottom of history).
         post_scroll(center, -1000)
-        time.sleep(0.05)
+        wait(0.05, "scroll_to_bottom_step")
 
         children = ax_get(msg_list, kAXChildrenAttribute) or []
         texts: list[str] = []
@@ -92,16 +118,73 @@ def scroll_to_bottom(msg_list: Any, center: tuple[float, float]) -> None:
             last_text = new_last
             stable = 0
 
-    time.sleep(0.2)
+    wait(0.2, "scroll_to_bottom_settle")
+
+
+def scroll_up_small(center: tuple[float, float], lines: float = SCROLL_LINES) -> float:
+    """
+    Scroll upwards by `lines` scroll-wheel lines (negative to scroll back
+    down) to reveal older messages, and return the lines scrolled.
+    """
+    lines = float(int(round(lines)))
+    if lines:
+        # Positive delta scrolls towards older messages.
+        post_scroll(center, int(lines))
+    wait(0.1, "scroll_up_settle")
+    return lines
+
+
+def get_vertical_scroll_bar(msg_list: Any) -> Any | None:
+    """
+    Return the vertical scroll bar of the scroll area hosting the
+    messages list, if WeChat exposes one.
+    """
+    parent = ax_get(msg_list, kAXParentAttribute)
+    if parent is None or ax_get(parent, kAXRoleAttribute) != kAXScrollAreaRole:
+        return None
+    return ax_get(parent, kAXVerticalScrollBarAttribute)
+
+
+def scroll_to_bottom_via_ax(scroll_bar: Any) -> None:
+    """
+    Scroll the messages list to the newest messages by setting its
+    scroll bar value, without posting any input events.
+    """
+    with span("scroll_ax", value=1.0):
+        ax_set(scroll_bar, kAXValueAttribute, 1.0)
+    wait(0.2, "scroll_to_bottom_settle")
+
+
+def initial_ax_scroll_step(msg_list: Any) -> float:
+    """
+    Scroll-bar step for the first page of a background fetch: about half
+    a screen when the list reports a content height taller than its
+    viewport, otherwise a small probe that is calibrated from how far the
+    rows move (see fetch_recent_messages).
+    """
+    parent = ax_get(msg_list, kAXParentAttribute)
+    visible = axvalue_to_size(ax_get(parent, kAXSizeAttribute)) if parent else None
+    content = axvalue_to_size(ax_get(msg_list, kAXSizeAttribute))
+    if visible is not None and content is not None and content[1] > visible[1]:
+        return 0.5 * visible[1] / (content[1] - visible[1])
+    return AX_PROBE_STEP
 
 
-def scroll_up_small(center: tuple[float, float]) -> None:
+def scroll_by_via_ax(scroll_bar: Any, step: float) -> float:
     """
-    Scroll slightly upwards to reveal older messages.
+    Move the messages list by `step` scroll-bar units (positive towards
+    older messages) without posting any input events, and return the
+    distance actually moved, which is smaller at either end of the list.
     """
-    # Positive delta scrolls towards older messages.
-    post_scroll(center, 50)
-    time.sleep(0.1)
+    value = ax_get(scroll_bar, kAXValueAttribute)
+    if value is None:
+        return 0.0
+
+    new_value = min(1.0, max(0.0, float(value) - step))
+    with span("scroll_ax", value=new_value, delta=-step):
+        ax_set(scroll_bar, kAXValueAttribute, new_value)
+    wait(0.1, "scroll_up_settle")
+    return float(value) - new_value
 
 
 def count_colored_pixels(
@@ -184,6 +267,35 @@ def classify_sender_for_message(
     return "UNKNOWN"
 
 
+def classify_rows(msg_list: Any, rows: list[Any]) -> list[SenderLabel]:
+    """
+    Classify the sender of each of the given Messages list rows from one
+    capture of the WeChat window, which works whether or not it is
+    frontmost. Rows are "UNKNOWN" when the window cannot be captured.
+    """
+    if not rows:
+        return []
+    try:
+        window_id = find_wechat_window_id(get_list_center(msg_list))
+        if window_id is None:
+            raise RuntimeError("Could not find the WeChat window to capture")
+        image, list_origin, _ = capture_message_area(msg_list, window_id=window_id)
+    except RuntimeError as exc:
+        logger.debug("Cannot classify message senders: %s", exc)
+        return ["UNKNOWN"] * len(rows)
+
+    senders: list[SenderLabel] = []
+    for row in rows:
+        point = axvalue_to_point(ax_get(row, kAXPositionAttribute))
+        size = axvalue_to_size(ax_get(row, kAXSizeAttribute))
+        if point is None or size is None:
+            senders.append("UNKNOWN")
+            continue
+        with span("classify_sender"):
+            senders.append(classify_sender_for_message(image, list_origin, point, size))
+    return senders
+
+
 @dataclass
 class ChatMessage:
     sender: SenderLabel
@@ -193,8 +305,38 @@ class ChatMessage:
         return asdict(self)
 
 
+def older_messages_in_page(
+    messages: list[ChatMessage], visible: list[ChatMessage]
+) -> list[ChatMessage] | None:
+    """
+    Return the messages of a newly captured page that are older than
+    everything collected so far, or None if the page does not overlap
+    them and rows in between would be lost.
+
+    The page is aligned on the oldest known messages: the first position
+    where the known messages follow in order (as far as the page goes)
+    marks the boundary, so a repeated text does not misalign it.
+    """
+    start = _align_page(messages, visible)
+    return None if start is None else visible[:start]
+
+
+def _align_page(messages: list[ChatMessage], visible: list[ChatMessage]) -> int | None:
+    anchor_text = messages[0].text
+    for i, msg in enumerate(visible):
+        if msg.text != anchor_text:
+            continue
+        overlap = min(len(visible) - i, len(messages))
+        if all(visible[i + k].text == messages[k].text for k in range(overlap)):
+            return i
+    return None
+
+
 def fetch_recent_messages(
-    last_n: int = 100, max_scrolls: int | None = None
+    last_n: int = 100,
+    max_scrolls: int | None = None,
+    background: bool = False,
+    ax_app: Any = None,
 ) -> list[ChatMessage]:
     """
     Fetch the true last N messages from the currently open chat, even
@@ -209,21 +351,68 @@ def fetch_recent_messages(
       screenshot-based heuristic as before.
     - Merges newly revealed older messages at the front of the list by
       aligning on the oldest already-known message text.
+
+    With `background=True`, WeChat is not activated: screenshots are taken
+    from WeChat's own window by window ID and scrolling is done through
+    the list's AX scroll bar. If no scroll bar is exposed, only the
+    currently visible messages are returned.
+
+    A foreground fetch activates WeChat unless the caller passes the
+    `ax_app` of an activation it already did.
     """
-    ax_app = get_wechat_ax_app()
-    msg_list = get_messages_list(ax_app)
-    center = get_list_center(msg_list)
-    scroll_to_bottom(msg_list, center)
+    if background:
+        ax_app = get_wechat_ax_app()
+        msg_list = get_messages_list(ax_app)
+        window_id = find_wechat_window_id(get_list_center(msg_list))
+        if window_id is None:
+            raise RuntimeError("Could not find the WeChat window to capture")
+        scroll_bar = get_vertical_scroll_bar(msg_list)
+        if scroll_bar is None:
+            logger.warning(
+                "Messages list exposes no scroll bar; background fetch is "
+                "limited to visible messages"
+            )
+            max_scrolls = 0
+            step = 0.0
+        else:
+            scroll_to_bottom_via_ax(scroll_bar)
+            step = initial_ax_scroll_step(msg_list)
+
+        def capture():
+            return capture_message_area(msg_list, window_id=window_id)
+
+        def scroll_by(amount: float) -> float:
+            return scroll_by_via_ax(scroll_bar, amount)
+
+    else:
+        if ax_app is None:
+            ax_app = activate_wechat()
+        msg_list = get_messages_list(ax_app)
+        center = get_list_center(msg_list)
+        scroll_to_bottom(msg_list, center)
+        step = float(SCROLL_LINES)
+
+        def capture():
+            return capture_message_area(msg_list)
+
+        def scroll_by(amount: float) -> float:
+            return scroll_up_small(center, amount)
 
     messages: list[ChatMessage] = []
     scrolls = 0
     no_new_counter = 0
+    backoffs = 0
+    # Distance scrolled since the page that set `anchor_y`, the on-screen
+    # y of the oldest known message on that page.
+    moved = 0.0
+    anchor_y = 0.0
 
     while True:
-        image, list_origin, _ = capture_message_area(msg_list)
+        image, list_origin, list_size = capture()
 
         children = ax_get(msg_list, kAXChildrenAttribute) or []
         visible: list[ChatMessage] = []
+        tops: list[float] = []
 
         for child in children:
             text = ax_get(child, kAXValueAttribute) or ax_get(child, kAXTitleAttribute)
@@ -237,29 +426,51 @@ def fetch_recent_messages(
             if point is None or size is None:
                 sender: SenderLabel = "UNKNOWN"
             else:
-                sender = classify_sender_for_message(image, list_origin, point, size)
+                with span("classify_sender"):
+                    sender = classify_sender_for_message(
+                        image, list_origin, point, size
+                    )
 
             visible.append(ChatMessage(sender=sender, text=str(text)))
+            tops.append(point[1] if point is not None else 0.0)
 
         if not visible:
             break
 
         if not messages:
             messages = visible
+            anchor_y = tops[0]
         else:
-            # Align on the oldest already-known message using its text as anchor.
-            anchor_text = messages[0].text
-            idx: int | None = None
-            for i, msg in enumerate(visible):
-                if msg.text == anchor_text:
-                    idx = i
+            with span("merge_page"):
+                start = _align_page(messages, visible)
+
+            if start is None:
+                # Scrolled past the oldest known message: merging this page
+                # would leave a gap. Go back half way and use smaller steps.
+                if backoffs >= MAX_BACKOFFS or moved <= 0:
+                    logger.warning(
+                        "Could not page back without skipping messages; "
+                        "returning the %d contiguous messages found",
+                        len(messages),
+                    )
                     break
+                moved += scroll_by(-moved / 2.0)
+                step = moved
+                backoffs += 1
+                continue
 
-            if idx is None:
-                new_older = visible
+            backoffs = 0
+            # Size the next step from how far the known rows moved, so
+            # that consecutive pages overlap by about half a screen.
+            shift = tops[start] - anchor_y
+            if shift > 0 and moved > 0:
+                step = 0.5 * list_size[1] * moved / shift
             else:
-                new_older = visible[:idx]
+                # The step was too small to move a row; grow it.
+                step *= 2.0
+            anchor_y = tops[0]
 
+            new_older = visible[:start]
             if new_older:
                 messages = new_older + messages
                 no_new_counter = 0
@@ -271,18 +482,22 @@ def fetch_recent_messages(
         if len(messages) >= last_n:
             break
 
-        scroll_up_small(center)
+        if max_scrolls is not None and scrolls >= max_scrolls:
+            break
 
+        moved = scroll_by(step)
         scrolls += 1
-        if max_scrolls is not None and scrolls >= max_scrolls:
+        if moved <= 0 and background:
+            # Already at the top of the history.
             break
 
     if len(messages) > last_n:
         messages = messages[-last_n:]
 
     logger.info(
-        "Fetched %d messages from current chat (requested last_n=%d)",
+        "Fetched %d messages from current chat (requested last_n=%d, background=%s)",
         len(messages),
         last_n,
+        background,
     )
     return messages
@@ -1,28 +1,100 @@
 from __future__ import annotations
 
 import argparse
+import atexit
+import asyncio
 import logging
+import re
 from typing import Any
+from urllib.parse import quote, unquote
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from pydantic import AnyUrl, BaseModel
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 
 from .logging_config import logger
 from .add_contact_by_wechat_id_utils import (
+    AddContactSession,
     add_contact_by_wechat_id as ax_add_contact_by_wechat_id,
+    send_friend_request,
 )
+from .ax_backend import PyObjCBackend, RecordingBackend, ReplayBackend, set_backend
+from .chat_scheduler import ChatScheduler
+from .checkpoints import Checkpoint, checkpoint_key
 from .fetch_messages_by_chat_utils import ChatMessage, fetch_recent_messages
+from .message_watcher import MessageWatcher, ObservedMessage
+from .metrics import span, stats, traced_tool
+from .outbound_queue import OutboundQueue
 from .publish_moment_utils import publish_moment_without_media as ax_publish_moment
-from .reply_to_messages_by_chat_utils import send_message
-from .wechat_accessibility import get_current_chat_name, open_chat_for_contact
+from .reply_to_messages_by_chat_utils import (
+    send_message,
+    send_message_chunked,
+    send_messages,
+)
+from .tracing import tracer
+from .wechat_accessibility import (
+    activate_wechat,
+    collect_chat_elements,
+    current_chat_state,
+    get_current_chat_name,
+    get_wechat_ax_app,
+    open_chat_for_contact,
+    plan_chat_order,
+    read_session_list,
+)
 
 
 mcp = FastMCP("WeChat Helper MCP Server")
 
+# All WeChat UI work runs on the scheduler's worker thread, one job at a
+# time, ordered to avoid needless chat switches.
+scheduler = ChatScheduler(current_chat_fn=lambda: current_chat_state.name)
+
+# New-message watcher. Started by --watch, or lazily by the first
+# wait_for_new_messages call, read of or subscription to a chat's
+# messages resource.
+watcher = MessageWatcher(scheduler)
+
+# Upper bound for one wait_for_new_messages call, in seconds.
+MAX_WAIT_TIMEOUT = 300.0
+
+
+def _ensure_chat_open(
+    chat_name: str, ax_app: Any = None, snapshot: dict[str, Any] | None = None
+) -> dict[str, Any] | None:
+    """
+    Open `chat_name` unless it is already the current chat.
+
+    Returns None once the chat is open, or open_chat_for_contact's error
+    dict (with search candidates) if no exact match could be opened.
+    Multi-chat callers pass the `ax_app` and session-list `snapshot` they
+    planned with (see open_chat_for_contact).
+    """
+    with span("current_chat_name"):
+        current_chat = get_current_chat_name()
+    same_chat = current_chat == chat_name if current_chat is not None else False
+    logger.info(
+        "Current chat title=%r, target=%r, same_chat=%s",
+        current_chat,
+        chat_name,
+        same_chat,
+    )
+    if same_chat:
+        return None
+
+    with span("open_chat"):
+        open_result = open_chat_for_contact(chat_name, ax_app, snapshot)
+    if isinstance(open_result, dict) and open_result.get("error"):
+        return open_result
+    return None
+
 
 @mcp.tool()
-def fetch_messages_by_chat(
+async def fetch_messages_by_chat(
     chat_name: str,
     last_n: int = 50,
+    background: bool = False,
 ) -> list[dict[str, Any]]:
     """
     Fetch recent messages for a specific chat (contact or group).
@@ -32,31 +104,38 @@ def fetch_messages_by_chat(
     - If found, click it to open the chat
     - If not found, search for the chat via the search box
     - Once the chat is open, retrieve recent messages from that chat
+
+    If `background` is True, messages are read without bringing WeChat to
+    the front: the screenshot used for sender detection is taken from
+    WeChat's own window even if it is covered. Opening a chat that is not
+    already open still requires activating WeChat.
     """
+    return await scheduler.run(
+        chat_name, _fetch_messages_by_chat, chat_name, last_n, background
+    )
+
+
+@traced_tool("fetch_messages_by_chat")
+def _fetch_messages_by_chat(
+    chat_name: str, last_n: int, background: bool
+) -> list[dict[str, Any]]:
     try:
         logger.info("Tool fetch_messages_by_chat called for chat=%s", chat_name)
-        current_chat = get_current_chat_name()
-        same_chat = current_chat == chat_name if current_chat is not None else False
-        logger.info(
-            "Current chat title=%r, target=%r, same_chat=%s",
-            current_chat,
-            chat_name,
-            same_chat,
+        open_result = _ensure_chat_open(chat_name)
+        if open_result is not None:
+            # No exact match; surface candidates instead of forcing a chat.
+            logger.info(
+                "open_chat_for_contact returned candidates for chat=%s; "
+                "skipping message fetch",
+                chat_name,
+            )
+            enriched = dict(open_result)
+            enriched.setdefault("tool", "fetch_messages_by_chat")
+            return [enriched]
+
+        messages: list[ChatMessage] = fetch_recent_messages(
+            last_n=last_n, background=background
         )
-        if not same_chat:
-            open_result = open_chat_for_contact(chat_name)
-            if isinstance(open_result, dict) and open_result.get("error"):
-                # No exact match; surface candidates instead of forcing a chat.
-                logger.info(
-                    "open_chat_for_contact returned candidates for chat=%s; "
-                    "skipping message fetch",
-                    chat_name,
-                )
-                enriched = dict(open_result)
-                enriched.setdefault("tool", "fetch_messages_by_chat")
-                return [enriched]
-
-        messages: list[ChatMessage] = fetch_recent_messages(last_n=last_n)
         result = [msg.to_dict() for msg in messages]
         logger.info("Returning %d messages for chat=%s", len(result), chat_name)
         return result
@@ -74,10 +153,235 @@ def fetch_messages_by_chat(
         ]
 
 
+class BulkFetchItem(BaseModel):
+    chat_name: str
+    last_n: int = 50
+
+
 @mcp.tool()
-def reply_to_messages_by_chat(
+async def fetch_messages_bulk(
+    chats: list[BulkFetchItem],
+    ctx: Context | None = None,
+) -> dict[str, Any]:
+    """
+    Fetch recent messages from many chats (contacts or groups) in one call,
+    each with its own `last_n`.
+
+    WeChat is activated once and every chat is resolved against one
+    snapshot of the left session list. Chats are visited in the order that
+    needs the fewest global searches: the open chat, then chats visible in
+    the session list top to bottom, then the rest via search. Progress is
+    reported after every chat.
+
+    Returns {"chats": [...], "fetched": <count>, "failed": <count>} with
+    one entry per chat in visiting order: {"chat_name", "route",
+    "messages"} on success, or {"chat_name", "route", "error",
+    "candidates"?} for a chat that could not be opened or read. A failure
+    does not stop the remaining chats.
+    """
+    last_n: dict[str, int] = {}
+    for item in chats:
+        last_n[item.chat_name] = max(last_n.get(item.chat_name, 0), item.last_n)
+
+    try:
+        ax_app, snapshot, plan = await scheduler.run(
+            None, _prepare_chat_batch, "fetch_messages_bulk", list(last_n)
+        )
+    except Exception as exc:
+        logger.exception("Error preparing fetch_messages_bulk: %s", exc)
+        return {"error": str(exc), "stage": "prepare", "chats": [], "fetched": 0, "failed": 0}
+
+    results: list[dict[str, Any]] = []
+    for chat_name, route in plan:
+        result = await scheduler.run(
+            chat_name, _fetch_bulk_chat, ax_app, snapshot, chat_name, route, last_n[chat_name]
+        )
+        results.append(result)
+        if ctx is not None:
+            await ctx.report_progress(
+                len(results),
+                len(plan),
+                message=(
+                    f"Failed {chat_name}: {result['error']}"
+                    if "error" in result
+                    else f"Fetched {len(result['messages'])} messages from {chat_name}"
+                ),
+            )
+
+    failed = sum(1 for result in results if "error" in result)
+    return {"chats": results, "fetched": len(results) - failed, "failed": failed}
+
+
+@traced_tool("chat_batch.prepare")
+def _prepare_chat_batch(
+    tool: str, chat_names: list[str]
+) -> tuple[Any, dict[str, Any], list[tuple[str, str]]]:
+    """
+    Shared setup of the multi-chat tools: activate WeChat once, note the
+    open chat, snapshot the session list and plan the visiting order.
+    """
+    logger.info("Tool %s called for %d chats", tool, len(chat_names))
+    ax_app = activate_wechat()
+    with span("current_chat_name"):
+        get_current_chat_name()
+    snapshot = collect_chat_elements(ax_app)
+    return ax_app, snapshot, plan_chat_order(ax_app, chat_names, snapshot)
+
+
+@traced_tool("fetch_messages_bulk")
+def _fetch_bulk_chat(
+    ax_app: Any, snapshot: dict[str, Any], chat_name: str, route: str, last_n: int
+) -> dict[str, Any]:
+    try:
+        # Another request may have switched chats since planning; the
+        # recorded open chat is checked without reading the title again.
+        if current_chat_state.name != chat_name:
+            with span("open_chat"):
+                open_result = open_chat_for_contact(chat_name, ax_app, snapshot)
+            if open_result is not None:
+                return {
+                    "chat_name": chat_name,
+                    "route": route,
+                    "error": open_result.get("error"),
+                    "candidates": open_result.get("candidates", {}),
+                }
+
+        messages = fetch_recent_messages(last_n=last_n, ax_app=ax_app)
+        logger.info("Fetched %d messages for chat=%s", len(messages), chat_name)
+        return {
+            "chat_name": chat_name,
+            "route": route,
+            "messages": [msg.to_dict() for msg in messages],
+        }
+    except Exception as exc:
+        logger.exception("Error in fetch_messages_bulk for chat=%s: %s", chat_name, exc)
+        return {"chat_name": chat_name, "route": route, "error": str(exc)}
+
+
+@mcp.tool()
+async def list_unread_chats(include_read: bool = False) -> dict[str, Any]:
+    """
+    Summarize chats with unread messages from the left session list in a
+    single pass, without opening any chat or bringing WeChat to the front.
+
+    Returns the chats top to bottom (most recent first), each with its
+    unread count, last-message preview and timestamp as WeChat shows
+    them. Only rows WeChat currently exposes in the session list are
+    read, which covers the most recently active chats. With
+    include_read=True, chats without unread messages are listed too.
+    """
+    return await scheduler.run(None, _list_unread_chats, include_read)
+
+
+@traced_tool("list_unread_chats")
+def _list_unread_chats(include_read: bool) -> dict[str, Any]:
+    try:
+        summaries = read_session_list(get_wechat_ax_app())
+    except Exception as exc:
+        logger.exception("Error in list_unread_chats: %s", exc)
+        return {"error": str(exc), "stage": "read_session_list"}
+
+    chats = [s.to_dict() for s in summaries if include_read or s.unread > 0]
+    return {
+        "chats": chats,
+        "total_unread": sum(s.unread for s in summaries),
+        "rows_scanned": len(summaries),
+    }
+
+
+@mcp.tool()
+async def wait_for_new_messages(
+    chat_name: str,
+    after_cursor: int | None = None,
+    timeout: float = 30.0,
+    include_own: bool = False,
+) -> dict[str, Any]:
+    """
+    Wait until messages newer than `after_cursor` arrive in `chat_name`
+    and return only those, or an empty list after `timeout` seconds (at
+    most 300).
+
+    Pass the `cursor` from the previous result to continue where it left
+    off; with no cursor, only messages arriving after this call are
+    returned. New messages are noticed by the background watcher from the
+    last rows of the open chat, or, for a chat that is not open, from its
+    session-list preview and unread count. WeChat is never activated and
+    no chat is opened while waiting.
+
+    Messages sent from this account (including replies sent through this
+    server) are skipped, though the cursor still moves past them; set
+    `include_own` to return them too, marked with "sender": "ME".
+
+    Cursors are only meaningful to the server process that issued them. A
+    cursor ahead of the chat's latest one (e.g. from before a restart) is
+    treated as stale: the wait restarts from the current position and the
+    result has "cursor_reset": true.
+    """
+    with span("tool.wait_for_new_messages"):
+        return await _wait_for_new_messages(chat_name, after_cursor, timeout, include_own)
+
+
+async def _wait_for_new_messages(
+    chat_name: str, after_cursor: int | None, timeout: float, include_own: bool = False
+) -> dict[str, Any]:
+    logger.info(
+        "Tool wait_for_new_messages called for chat=%s after_cursor=%s timeout=%.1fs",
+        chat_name,
+        after_cursor,
+        timeout,
+    )
+    timeout = min(max(timeout, 0.0), MAX_WAIT_TIMEOUT)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    watcher.start()
+
+    reset = False
+    if after_cursor is None:
+        # Wait for a scan to record what is already on screen, so only
+        # messages arriving after this call are returned.
+        if not await watcher.scan_now(timeout):
+            logger.info("No watcher scan finished before the wait for chat=%s", chat_name)
+        after_cursor = watcher.cursor(chat_name)
+    else:
+        # Scan now rather than at the next fallback interval.
+        watcher.poke()
+        latest = watcher.cursor(chat_name)
+        if after_cursor > latest:
+            logger.info(
+                "Cursor %d for chat=%s is ahead of %d; treating it as stale",
+                after_cursor,
+                chat_name,
+                latest,
+            )
+            after_cursor, reset = latest, True
+
+    with span("wait_for_new_messages", chat=chat_name) as attrs:
+        seen = await watcher.wait_for(
+            chat_name, after_cursor, max(deadline - loop.time(), 0.0), include_own
+        )
+        messages = [m for m in seen if include_own or m.incoming]
+        attrs["new"] = len(messages)
+
+    result: dict[str, Any] = {
+        "chat_name": chat_name,
+        "cursor": seen[-1].seq if seen else max(after_cursor, 0),
+        "messages": [m.to_dict() for m in messages],
+        "timed_out": not messages,
+    }
+    if reset:
+        result["cursor_reset"] = True
+    if seen and seen[0].seq > after_cursor + 1:
+        # Older entries were dropped from the watcher's bounded history.
+        result["missed"] = seen[0].seq - after_cursor - 1
+    return result
+
+
+@mcp.tool()
+async def reply_to_messages_by_chat(
     chat_name: str,
     reply_message: str | None = None,
+    enqueue: bool = False,
+    chunk_size: int = 0,
 ) -> dict[str, Any]:
     """
     Optionally send a reply to a chat (contact or group).
@@ -89,40 +393,82 @@ def reply_to_messages_by_chat(
 
     If reply_message is None or empty, no message is sent; the tool still
     ensures the chat is open.
+
+    With enqueue=True the message is put on the durable outbound queue
+    and a ticket is returned immediately; a background sender delivers
+    queued messages in order per chat, subject to the server's send rate
+    limit. Check delivery with get_outbound_message_status.
+
+    Chunking is off by default. With chunk_size > 0 (for example 2000),
+    a reply longer than chunk_size characters is split at paragraph, line
+    or word boundaries and sent as consecutive messages; the result then
+    lists each chunk's length and send time.
     """
+    if enqueue:
+        if reply_message is None or not reply_message.strip():
+            return {
+                "error": "reply_message must be non-empty when enqueue is true",
+                "chat_name": chat_name,
+                "stage": "validate_input",
+            }
+        ticket = outbound.enqueue(chat_name, reply_message)
+        return {
+            "ticket_id": ticket.ticket_id,
+            "chat_name": chat_name,
+            "state": ticket.state,
+            "queued_ahead": outbound.position(ticket.ticket_id),
+        }
+
+    return await scheduler.run(
+        chat_name, _reply_to_messages_by_chat, chat_name, reply_message, chunk_size
+    )
+
+
+@traced_tool("reply_to_messages_by_chat")
+def _reply_to_messages_by_chat(
+    chat_name: str,
+    reply_message: str | None,
+    chunk_size: int = 0,
+    ax_app: Any = None,
+    snapshot: dict[str, Any] | None = None,
+) -> dict[str, Any]:
     logger.info(
         "Tool reply_to_messages_by_chat called for chat=%s (has_reply=%s)",
         chat_name,
         bool(reply_message),
     )
     try:
-        current_chat = get_current_chat_name()
-        same_chat = current_chat == chat_name if current_chat is not None else False
-        logger.info(
-            "Current chat title=%r, target=%r, same_chat=%s",
-            current_chat,
-            chat_name,
-            same_chat,
-        )
-        if not same_chat:
-            open_result = open_chat_for_contact(chat_name)
-            if isinstance(open_result, dict) and open_result.get("error"):
-                logger.info(
-                    "open_chat_for_contact returned candidates for chat=%s; "
-                    "skipping reply send",
-                    chat_name,
-                )
-                enriched: dict[str, Any] = {
-                    "error": open_result.get("error"),
-                    "chat_name": chat_name,
-                    "candidates": open_result.get("candidates", {}),
-                    "reply_message": reply_message,
-                    "sent": False,
-                    "tool": "reply_to_messages_by_chat",
-                }
-                return enriched
+        open_result = _ensure_chat_open(chat_name, ax_app, snapshot)
+        if open_result is not None:
+            logger.info(
+                "open_chat_for_contact returned candidates for chat=%s; "
+                "skipping reply send",
+                chat_name,
+            )
+            enriched: dict[str, Any] = {
+                "error": open_result.get("error"),
+                "chat_name": chat_name,
+                "candidates": open_result.get("candidates", {}),
+                "reply_message": reply_message,
+                "sent": False,
+                "tool": "reply_to_messages_by_chat",
+            }
+            return enriched
 
         sent = False
+        if reply_message is not None and len(reply_message.strip()) > chunk_size > 0:
+            chunks = send_message_chunked(reply_message, chunk_size)
+            failed = [chunk for chunk in chunks if "error" in chunk]
+            result: dict[str, Any] = {
+                "chat_name": chat_name,
+                "reply_message": reply_message,
+                "sent": not failed,
+                "chunks": chunks,
+            }
+            if failed:
+                result["error"] = failed[0]["error"]
+                result["stage"] = "send_chunk"
+            return result
         if reply_message is not None and reply_message.strip():
             send_message(reply_message)
             sent = True
@@ -149,8 +495,185 @@ def reply_to_messages_by_chat(
         }
 
 
+# Messages queued by reply_to_messages_by_chat(enqueue=True), sent in the
+# background through the scheduler.
+outbound = OutboundQueue(scheduler, _reply_to_messages_by_chat)
+
+
+@mcp.tool()
+async def get_outbound_message_status(
+    ticket_ids: list[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Report the state of queued outbound messages.
+
+    Returns the requested tickets (all retained tickets when ticket_ids is
+    omitted), each with state "queued", "sending", "sent" or "failed" and
+    an error for failed sends, plus counts per state and the configured
+    send rate limit.
+    """
+    return outbound.status(ticket_ids)
+
+
+class ReplyBatchItem(BaseModel):
+    chat_name: str
+    messages: list[str]
+
+
+@mcp.tool()
+async def reply_to_messages_batch(items: list[ReplyBatchItem]) -> list[dict[str, Any]]:
+    """
+    Send several replies across one or more chats in a single call.
+
+    Each item names a chat (contact or group) and the messages to send
+    there, in order. Items for the same chat are merged, each chat is
+    opened once and its input field is reused for all of its messages.
+    Chats are served in the order that avoids needless chat switches.
+
+    Returns one entry per chat with per-message results:
+    {"chat_name": ..., "sent": <count>, "results": [{"reply_message": ...,
+    "sent": true|false, "error"?: ...}, ...]}. A chat that cannot be
+    opened reports an "error" (and search "candidates") instead.
+    """
+    grouped: dict[str, list[str]] = {}
+    for item in items:
+        grouped.setdefault(item.chat_name, []).extend(item.messages)
+
+    return list(
+        await asyncio.gather(
+            *(
+                scheduler.run(chat_name, _reply_batch_for_chat, chat_name, messages)
+                for chat_name, messages in grouped.items()
+            )
+        )
+    )
+
+
+@traced_tool("reply_to_messages_batch")
+def _reply_batch_for_chat(chat_name: str, messages: list[str]) -> dict[str, Any]:
+    logger.info(
+        "Tool reply_to_messages_batch sending %d messages to chat=%s",
+        len(messages),
+        chat_name,
+    )
+    try:
+        open_result = _ensure_chat_open(chat_name)
+        if open_result is not None:
+            return {
+                "error": open_result.get("error"),
+                "chat_name": chat_name,
+                "candidates": open_result.get("candidates", {}),
+                "sent": 0,
+                "results": [
+                    {"reply_message": text, "sent": False} for text in messages
+                ],
+                "tool": "reply_to_messages_batch",
+            }
+
+        results = send_messages(messages)
+        return {
+            "chat_name": chat_name,
+            "sent": sum(1 for result in results if result["sent"]),
+            "results": results,
+        }
+    except Exception as exc:
+        logger.exception(
+            "Error in reply_to_messages_batch for chat=%s: %s",
+            chat_name,
+            exc,
+        )
+        return {
+            "error": str(exc),
+            "chat_name": chat_name,
+            "sent": 0,
+            "results": [{"reply_message": text, "sent": False} for text in messages],
+        }
+
+
+@mcp.tool()
+async def broadcast_message(
+    chat_names: list[str],
+    message: str,
+    broadcast_id: str | None = None,
+    ctx: Context | None = None,
+) -> dict[str, Any]:
+    """
+    Send the same message to many chats (contacts or groups).
+
+    Chats are visited in the order that needs the fewest global searches:
+    the open chat, then chats visible in the session list top to bottom,
+    then the rest via search. Progress is reported after every chat.
+
+    Every successful send is checkpointed under `broadcast_id` (derived
+    from the message and chat list when omitted), so calling the tool
+    again after a failure or timeout only sends to the chats that were
+    not reached yet. Once every chat has received the message the
+    checkpoint is cleared, so the same broadcast can be sent again later.
+
+    WeChat is activated once and every chat is opened against one
+    snapshot of the left session list.
+    """
+    if not isinstance(message, str) or not message.strip():
+        return {"error": "message must be a non-empty string", "stage": "validate_input"}
+
+    key = broadcast_id or checkpoint_key("broadcast", message, sorted(set(chat_names)))
+    checkpoint = Checkpoint("broadcasts", key)
+    skipped = [name for name in dict.fromkeys(chat_names) if checkpoint.is_done(name)]
+    pending = [name for name in dict.fromkeys(chat_names) if not checkpoint.is_done(name)]
+    total = len(skipped) + len(pending)
+    logger.info(
+        "Broadcast %s: %d chats pending, %d already sent", key, len(pending), len(skipped)
+    )
+
+    ax_app, snapshot, plan = (
+        await scheduler.run(None, _prepare_chat_batch, "broadcast_message", pending)
+        if pending
+        else (None, None, [])
+    )
+
+    sent: list[str] = []
+    failed: list[dict[str, Any]] = []
+    for chat_name, route in plan:
+        result = await scheduler.run(
+            chat_name,
+            _reply_to_messages_by_chat,
+            chat_name,
+            message,
+            ax_app=ax_app,
+            snapshot=snapshot,
+        )
+        if result.get("sent"):
+            checkpoint.mark_done(chat_name, {"route": route})
+            sent.append(chat_name)
+        else:
+            failure = {"chat_name": chat_name, "route": route, "error": result.get("error")}
+            if result.get("candidates"):
+                failure["candidates"] = result["candidates"]
+            failed.append(failure)
+        if ctx is not None:
+            await ctx.report_progress(
+                len(skipped) + len(sent) + len(failed),
+                total,
+                message=f"{'Sent to' if result.get('sent') else 'Failed'} {chat_name}",
+            )
+
+    if not failed:
+        # Complete: a later broadcast of the same message starts afresh.
+        checkpoint.clear()
+
+    return {
+        "broadcast_id": key,
+        "message": message,
+        "total": total,
+        "sent": sent,
+        "skipped_already_sent": skipped,
+        "failed": failed,
+        "completed": not failed,
+    }
+
+
 @mcp.tool()
-def add_contact_by_wechat_id(
+async def add_contact_by_wechat_id(
     wechat_id: str,
     friending_msg: str | None = None,
     remark: str | None = None,
@@ -175,6 +698,29 @@ def add_contact_by_wechat_id(
       the `hide_my_posts` / `hide_their_posts` flags.
     - "chats_only" selects "Chats Only" and ignores the hide flags.
     """
+    return await scheduler.run(
+        None,
+        _add_contact_by_wechat_id,
+        wechat_id,
+        friending_msg,
+        remark,
+        tags,
+        privacy,
+        hide_my_posts,
+        hide_their_posts,
+    )
+
+
+@traced_tool("add_contact_by_wechat_id")
+def _add_contact_by_wechat_id(
+    wechat_id: str,
+    friending_msg: str | None,
+    remark: str | None,
+    tags: str | None,
+    privacy: str | None,
+    hide_my_posts: bool,
+    hide_their_posts: bool,
+) -> dict[str, Any]:
     logger.info(
         "Tool add_contact_by_wechat_id called for ID=%s (privacy=%r, hide_my_posts=%s, hide_their_posts=%s)",
         wechat_id,
@@ -205,8 +751,132 @@ def add_contact_by_wechat_id(
         }
 
 
+class AddContactItem(BaseModel):
+    wechat_id: str
+    friending_msg: str | None = None
+    remark: str | None = None
+    tags: str | None = None
+    privacy: str | None = None
+    hide_my_posts: bool = False
+    hide_their_posts: bool = False
+
+
 @mcp.tool()
-def publish_moment_without_media(
+async def add_contacts_bulk(
+    contacts: list[AddContactItem],
+    batch_id: str | None = None,
+    ctx: Context | None = None,
+) -> dict[str, Any]:
+    """
+    Send friend requests to many WeChat IDs in one call, each with its own
+    friending message, remark and privacy settings (see
+    add_contact_by_wechat_id for their meaning).
+
+    WeChat is activated once and the search field and results list are
+    reused between IDs. Each step waits for the window or button it needs
+    instead of sleeping for a fixed time. Progress is reported after
+    every ID, and a failed ID does not stop the others.
+
+    Every sent request is checkpointed under `batch_id` (derived from the
+    IDs and their settings when omitted), so calling the tool again after
+    a crash or timeout only handles the IDs that were not sent yet. Once
+    every ID has been sent the checkpoint is cleared, so the same batch
+    can be sent again later.
+
+    Returns {"batch_id", "total", "results": [...], "sent": <count>,
+    "failed": <count>, "skipped_already_sent": [...], "completed"}, with
+    one result per handled ID in input order: the request summary with
+    "stage": "sent", or {"wechat_id", "error", "stage"} naming the step
+    that failed.
+    """
+    items: dict[str, AddContactItem] = {}
+    for item in contacts:
+        items.setdefault(item.wechat_id, item)
+
+    key = batch_id or checkpoint_key(
+        "add_contacts", [items[wechat_id].model_dump() for wechat_id in sorted(items)]
+    )
+    checkpoint = Checkpoint("add_contacts", key)
+    skipped = [wechat_id for wechat_id in items if checkpoint.is_done(wechat_id)]
+    pending = [item for wechat_id, item in items.items() if not checkpoint.is_done(wechat_id)]
+    logger.info(
+        "add_contacts_bulk %s: %d IDs pending, %d already sent", key, len(pending), len(skipped)
+    )
+
+    summary: dict[str, Any] = {
+        "batch_id": key,
+        "total": len(items),
+        "results": [],
+        "sent": 0,
+        "failed": 0,
+        "skipped_already_sent": skipped,
+        "completed": False,
+    }
+    if pending:
+        try:
+            session = await scheduler.run(None, _prepare_add_contacts, len(pending))
+        except Exception as exc:
+            logger.exception("Error preparing add_contacts_bulk: %s", exc)
+            return {**summary, "error": str(exc), "stage": "prepare"}
+
+    results = summary["results"]
+    for item in pending:
+        result = await scheduler.run(None, _add_contacts_bulk_item, session, item)
+        if "error" in result:
+            summary["failed"] += 1
+        else:
+            checkpoint.mark_done(item.wechat_id, result)
+            summary["sent"] += 1
+        results.append(result)
+        if ctx is not None:
+            await ctx.report_progress(
+                len(skipped) + len(results),
+                len(items),
+                message=(
+                    f"Failed {item.wechat_id} at {result['stage']}"
+                    if "error" in result
+                    else f"Sent friend request to {item.wechat_id}"
+                ),
+            )
+
+    summary["completed"] = not summary["failed"]
+    if summary["completed"]:
+        # Complete: sending the same batch again later starts afresh.
+        checkpoint.clear()
+    return summary
+
+
+@traced_tool("add_contacts_bulk.prepare")
+def _prepare_add_contacts(count: int) -> AddContactSession:
+    logger.info("Tool add_contacts_bulk called for %d IDs", count)
+    return AddContactSession(activate_wechat())
+
+
+@traced_tool("add_contacts_bulk")
+def _add_contacts_bulk_item(
+    session: AddContactSession, item: AddContactItem
+) -> dict[str, Any]:
+    try:
+        result = send_friend_request(
+            session,
+            item.wechat_id,
+            friending_msg=item.friending_msg,
+            remark=item.remark,
+            tags=item.tags,
+            privacy=item.privacy,
+            hide_my_posts=item.hide_my_posts,
+            hide_their_posts=item.hide_their_posts,
+        )
+    except Exception as exc:
+        logger.exception("Error in add_contacts_bulk for ID=%s: %s", item.wechat_id, exc)
+        return {"wechat_id": item.wechat_id, "error": str(exc), "stage": "unexpected_error"}
+    if "error" not in result:
+        result["stage"] = "sent"
+    return result
+
+
+@mcp.tool()
+async def publish_moment_without_media(
     content: str,
     publish: bool = True,
 ) -> dict[str, Any]:
@@ -222,6 +892,11 @@ def publish_moment_without_media(
       sheet to publish the moment; if False, leave the composer open
       without sending.
     """
+    return await scheduler.run(None, _publish_moment_without_media, content, publish)
+
+
+@traced_tool("publish_moment_without_media")
+def _publish_moment_without_media(content: str, publish: bool) -> dict[str, Any]:
     logger.info(
         "Tool publish_moment_without_media called (content_length=%d, publish=%s)",
         len(content) if isinstance(content, str) else -1,
@@ -238,6 +913,129 @@ def publish_moment_without_media(
         }
 
 
+@mcp.resource("wechat://scheduler", mime_type="application/json")
+def scheduler_stats() -> dict[str, Any]:
+    """
+    Chat-affinity scheduler counters, including chat switches avoided per
+    minute and queue wait times.
+    """
+    return scheduler.stats()
+
+
+@mcp.resource("wechat://stats", mime_type="application/json")
+def latency_stats() -> dict[str, Any]:
+    """
+    Per-stage latency percentiles (p50/p95/p99, in ms) and call counts
+    for app lookup, tree searches, scrolling, capture, classification,
+    merging, send verification and waits.
+    """
+    return stats.snapshot()
+
+
+_CHAT_MESSAGES_URI_RE = re.compile(r"^wechat://chats/([^/]+)/messages$")
+
+# Subscribed sessions per chat name, and the event loop they live on.
+_subscriptions: dict[str, set[Any]] = {}
+_subscription_loop: asyncio.AbstractEventLoop | None = None
+
+
+def chat_messages_uri(chat_name: str) -> str:
+    return f"wechat://chats/{quote(chat_name, safe='')}/messages"
+
+
+def _chat_name_from_uri(uri: Any) -> str | None:
+    match = _CHAT_MESSAGES_URI_RE.match(str(uri))
+    return unquote(match.group(1)) if match else None
+
+
+@mcp.resource("wechat://chats/{chat_name}/messages", mime_type="application/json")
+def chat_messages(chat_name: str) -> dict[str, Any]:
+    """
+    Messages the watcher has seen arrive in `chat_name` (URL-encoded),
+    oldest first, each with a per-chat sequence number. Subscribe to be
+    notified when new ones are recorded.
+    """
+    chat_name = unquote(chat_name)
+    watcher.start()
+    return {
+        "chat_name": chat_name,
+        "cursor": watcher.cursor(chat_name),
+        "messages": [m.to_dict() for m in watcher.messages(chat_name)],
+    }
+
+
+@mcp.resource("wechat://watcher", mime_type="application/json")
+def watcher_stats() -> dict[str, Any]:
+    """
+    Watcher state: whether AX notifications are delivered, scans run, and
+    the latest sequence number per chat.
+    """
+    return watcher.stats()
+
+
+@mcp._mcp_server.subscribe_resource()
+async def _subscribe(uri: AnyUrl) -> None:
+    global _subscription_loop
+    chat_name = _chat_name_from_uri(uri)
+    if chat_name is None:
+        raise ValueError(f"Subscriptions are only supported for {chat_messages_uri('<chat>')}")
+    _subscription_loop = asyncio.get_running_loop()
+    _subscriptions.setdefault(chat_name, set()).add(mcp._mcp_server.request_context.session)
+    logger.info("Subscribed to new messages in chat=%s", chat_name)
+    watcher.start()
+
+
+@mcp._mcp_server.unsubscribe_resource()
+async def _unsubscribe(uri: AnyUrl) -> None:
+    chat_name = _chat_name_from_uri(uri)
+    sessions = _subscriptions.get(chat_name or "")
+    if sessions is not None:
+        sessions.discard(mcp._mcp_server.request_context.session)
+        if not sessions:
+            del _subscriptions[chat_name]
+
+
+def _notify_subscribers(chat_name: str, messages: list[ObservedMessage]) -> None:
+    """
+    Watcher listener: send resources/updated to every session subscribed
+    to the chat. Runs on the watcher thread.
+    """
+    sessions = list(_subscriptions.get(chat_name, ()))
+    if not sessions or _subscription_loop is None:
+        return
+    uri = AnyUrl(chat_messages_uri(chat_name))
+    for session in sessions:
+        future = asyncio.run_coroutine_threadsafe(
+            session.send_resource_updated(uri), _subscription_loop
+        )
+        try:
+            future.result(timeout=5.0)
+        except Exception as exc:  # noqa: BLE001
+            logger.info("Dropping subscriber for chat=%s: %s", chat_name, exc)
+            _subscriptions.get(chat_name, set()).discard(session)
+
+
+watcher.add_listener(_notify_subscribers)
+
+_get_capabilities = mcp._mcp_server.get_capabilities
+
+
+def _get_capabilities_with_subscribe(*args: Any, **kwargs: Any) -> Any:
+    # The low-level server always advertises subscribe=False; we do
+    # handle resources/subscribe.
+    capabilities = _get_capabilities(*args, **kwargs)
+    if capabilities.resources is not None:
+        capabilities.resources.subscribe = True
+    return capabilities
+
+
+mcp._mcp_server.get_capabilities = _get_capabilities_with_subscribe
+
+
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(stats.prometheus_text())
+
+
 def main() -> None:
     """
     Entry point for the WeChat MCP server.
@@ -254,8 +1052,150 @@ def main() -> None:
         default="stdio",
         help="Transport protocol to use (default: stdio)",
     )
+    parser.add_argument(
+        "--host",
+        default=mcp.settings.host,
+        help=f"Bind address for HTTP transports (default: {mcp.settings.host})",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=mcp.settings.port,
+        help=f"Port for HTTP transports (default: {mcp.settings.port})",
+    )
+    parser.add_argument(
+        "--max-queue-wait",
+        type=float,
+        default=scheduler.max_wait,
+        help=(
+            "Seconds a queued request may be deferred in favour of work for "
+            "the currently open chat (default: %(default)s)"
+        ),
+    )
+
+    parser.add_argument(
+        "--prometheus",
+        action="store_true",
+        help=(
+            "Serve per-stage latency in Prometheus text format at /metrics "
+            "(streamable-http and sse transports only)"
+        ),
+    )
+
+    parser.add_argument(
+        "--trace-dir",
+        default=None,
+        help=(
+            "Write one JSON-lines trace per tool call into this directory "
+            "(analyse with wechat-mcp-traces)"
+        ),
+    )
+
+    parser.add_argument(
+        "--send-rate",
+        type=float,
+        default=outbound.bucket.rate,
+        help="Average queued messages sent per second (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--send-burst",
+        type=int,
+        default=outbound.bucket.burst,
+        help="Queued messages that may be sent back to back (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Start the new-message watcher at startup instead of on first use",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=watcher.interval,
+        help=(
+            "Seconds between fallback scans when no AX notification arrives "
+            "(default: %(default)s)"
+        ),
+    )
+
+    parser.add_argument(
+        "--backend",
+        choices=["pyobjc", "replay", "sim"],
+        default="pyobjc",
+        help=(
+            "Accessibility backend: the real macOS one (default), a replay "
+            "of a recorded session (requires --replay), or an in-process "
+            "WeChat simulator"
+        ),
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        help="Recording file served by --backend replay",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        default=0.0,
+        help="Artificial delay in seconds added to every replayed backend call",
+    )
+    parser.add_argument(
+        "--sim-chats",
+        type=int,
+        default=50,
+        help="Number of chats in the simulator's session list (--backend sim)",
+    )
+    parser.add_argument(
+        "--sim-contacts",
+        type=int,
+        default=0,
+        help="Extra simulator contacts reachable only via search (--backend sim)",
+    )
+    parser.add_argument(
+        "--sim-history",
+        type=int,
+        default=200,
+        help="Messages per simulated chat history (--backend sim)",
+    )
+    parser.add_argument(
+        "--sim-latency",
+        type=float,
+        default=0.0,
+        help="Artificial delay in seconds added to every simulator backend call",
+    )
+    parser.add_argument(
+        "--record",
+        default=None,
+        help="Record every backend response of this session to the given file",
+    )
 
     args = parser.parse_args()
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    scheduler.max_wait = args.max_queue_wait
+    tracer.configure(args.trace_dir)
+
+    if args.backend == "replay":
+        if not args.replay:
+            parser.error("--backend replay requires --replay FILE")
+        backend = ReplayBackend(args.replay, latency=args.replay_latency)
+    elif args.backend == "sim":
+        # Imported only here so a normal server start does not load it.
+        from .wechat_simulator import SimulatedWeChatBackend
+
+        backend = SimulatedWeChatBackend(
+            chats=args.sim_chats,
+            history=args.sim_history,
+            contacts=args.sim_contacts,
+            latency=args.sim_latency,
+        )
+    else:
+        backend = PyObjCBackend()
+    if args.record:
+        backend = RecordingBackend(backend)
+        atexit.register(backend.save, args.record, snapshot=True)
+    set_backend(backend)
 
     if args.mcp_debug:
         logging.getLogger("mcp").setLevel(logging.DEBUG)
@@ -273,6 +1213,25 @@ def main() -> None:
     logger.info("Starting WeChat Helper MCP Server")
     logger.info("Transport: %s", args.transport)
     logger.info("MCP Debug mode: %s", args.mcp_debug)
+    logger.info("Accessibility backend: %s", backend.name)
+    logger.info("Scheduler max queue wait: %.1fs", scheduler.max_wait)
+
+    outbound.configure(args.send_rate, args.send_burst)
+    outbound.load()
+    logger.info(
+        "Outbound queue: %.2f msg/s, burst %d", outbound.bucket.rate, outbound.bucket.burst
+    )
+
+    watcher.interval = args.watch_interval
+    if args.watch:
+        watcher.start()
+
+    if args.prometheus:
+        if args.transport == "stdio":
+            logger.warning("--prometheus has no effect with the stdio transport")
+        else:
+            mcp.custom_route("/metrics", methods=["GET"])(prometheus_metrics)
+            logger.info("Serving Prometheus metrics at /metrics")
 
     if args.transport == "stdio":
         mcp.run()
@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+from .ax_backend import get_backend, kAXListRole, kAXRoleAttribute, kAXValueAttribute
+from .chat_scheduler import ChatScheduler
+from .fetch_messages_by_chat_utils import classify_rows, get_vertical_scroll_bar
+from .logging_config import logger
+from .metrics import span
+from .reply_to_messages_by_chat_utils import find_message_list, read_message_tail
+from .wechat_accessibility import (
+    SessionSummary,
+    ax_get,
+    current_chat_state,
+    find_session_list,
+    get_wechat_ax_app,
+    read_session_list,
+)
+
+# AX notifications that indicate new rows or changed row contents.
+WATCH_NOTIFICATIONS = ["AXCreated", "AXValueChanged", "AXRowCountChanged"]
+
+# Visible rows of the open Messages list compared between scans.
+TAIL_WINDOW = 12
+
+# Rows of the previous scan that must be found again to align two scans.
+OVERLAP_ROWS = 3
+
+
+@dataclass
+class ObservedMessage:
+    """
+    A message noticed by the watcher.
+
+    `source` is "messages_list" for a row read from the open chat, or
+    "session_list" for a chat that is not open, where only the preview of
+    the latest message and the unread count are known. `sender` is the
+    classification of a messages_list row ("ME", "OTHER" or "UNKNOWN");
+    session_list entries have none.
+    """
+
+    seq: int
+    chat_name: str
+    text: str
+    source: str
+    observed_at: float
+    unread: int | None = None
+    sender: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        data = {
+            "seq": self.seq,
+            "chat_name": self.chat_name,
+            "text": self.text,
+            "source": self.source,
+            "observed_at": self.observed_at,
+        }
+        if self.unread is not None:
+            data["unread"] = self.unread
+        if self.sender is not None:
+            data["sender"] = self.sender
+        return data
+
+    @property
+    def incoming(self) -> bool:
+        return self.sender != "ME"
+
+
+def new_tail_rows(previous: list[str], current: list[str]) -> list[str]:
+    """
+    Rows of `current` that follow the rows seen in the previous scan.
+
+    Rows only arrive at the bottom, so `current` is the previous rows
+    with some dropped from the top and new ones added below. The smallest
+    such shift whose overlap (at least OVERLAP_ROWS rows, or all of
+    `previous` if shorter) matches row for row is taken, so a repeated
+    text is counted as many times as it occurs. If none matches, more
+    rows arrived than fit on screen and all of `current` is returned.
+    """
+    if not previous:
+        return list(current)
+    minimum = min(OVERLAP_ROWS, len(previous))
+    for shift in range(len(previous)):
+        overlap = len(previous) - shift
+        if overlap < minimum:
+            break
+        if overlap <= len(current) and current[:overlap] == previous[shift:]:
+            return current[overlap:]
+    return list(current)
+
+
+async def _wait_event(event: asyncio.Event, timeout: float) -> None:
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+class MessageWatcher:
+    """
+    Watch the session list and the open chat's Messages list for new
+    messages and keep a per-chat log of them with increasing sequence
+    numbers (cursors).
+
+    Scans are triggered by AX notifications when the backend delivers
+    them, and otherwise every `interval` seconds. Each scan runs on the
+    scheduler as chat-independent work, so it never reads the UI while a
+    tool is scrolling or typing. A scan only reads the accessibility tree: it
+    never activates WeChat or opens a chat.
+
+    Rows of the open chat are recorded with their classified sender, so
+    messages sent from this account (by this process or anyone else) are
+    logged as "ME" and can be told apart. Listeners registered with
+    add_listener() are called from the watcher thread with (chat_name,
+    new_messages) after every scan that found incoming messages; "ME"
+    rows are not passed to them.
+    """
+
+    def __init__(
+        self,
+        scheduler: ChatScheduler,
+        interval: float = 5.0,
+        debounce: float = 0.2,
+        history: int = 200,
+    ) -> None:
+        self.scheduler = scheduler
+        self.interval = interval
+        self.debounce = debounce
+        self.history = history
+
+        self._cond = threading.Condition()
+        self._logs: dict[str, deque[ObservedMessage]] = {}
+        self._seqs: dict[str, int] = {}
+        self._listeners: list[Callable[[str, list[ObservedMessage]], None]] = []
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._observer: Any = None
+        self._sessions: dict[str, SessionSummary] | None = None
+        self._session_list: Any = None
+        self._tail_chat: str | None = None
+        self._tail: list[str] = []
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._scans_started = 0
+        self.scans = 0
+        self.notifications = 0
+
+    # --- lifecycle ----------------------------------------------------
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="wechat-watcher", daemon=True
+            )
+            self._thread.start()
+        logger.info("Message watcher started (fallback interval %.1fs)", self.interval)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def poke(self, notification: str = "") -> None:
+        """
+        Request a scan soon; used as the AX notification callback.
+        """
+        self.notifications += 1
+        self._wake.set()
+
+    def add_listener(self, listener: Callable[[str, list[ObservedMessage]], None]) -> None:
+        self._listeners.append(listener)
+
+    # --- store --------------------------------------------------------
+
+    def cursor(self, chat_name: str) -> int:
+        with self._cond:
+            return self._seqs.get(chat_name, 0)
+
+    def messages(self, chat_name: str, after: int = 0) -> list[ObservedMessage]:
+        with self._cond:
+            return [m for m in self._logs.get(chat_name, ()) if m.seq > after]
+
+    @contextmanager
+    def _waiter(self) -> Iterator[asyncio.Event]:
+        """
+        Register an event of the running loop that is set, thread-safely,
+        on the next append or finished scan.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            self._waiters.add(waiter)
+        try:
+            yield waiter[1]
+        finally:
+            with self._cond:
+                self._waiters.discard(waiter)
+
+    def _wake_waiters(self) -> None:
+        # Called with self._cond held, from the scheduler thread.
+        for loop, event in list(self._waiters):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop has been closed.
+                self._waiters.discard((loop, event))
+
+    async def wait_for(
+        self, chat_name: str, after: int, timeout: float, include_own: bool = False
+    ) -> list[ObservedMessage]:
+        """
+        Wait until `chat_name` has messages with seq > `after` and return
+        them, or return what is there after `timeout` seconds. Unless
+        `include_own` is set, only incoming messages end the wait; the
+        account's own ("ME") messages are still returned so callers can
+        move their cursor past them.
+
+        Waiting holds no thread: the caller's event loop is woken by
+        _append, so any number of waits can be pending at once.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            with self._waiter() as event:
+                messages = self.messages(chat_name, after)
+                remaining = deadline - loop.time()
+                if remaining <= 0 or any(include_own or m.incoming for m in messages):
+                    return messages
+                await _wait_event(event, remaining)
+
+    async def scan_now(self, timeout: float) -> bool:
+        """
+        Request a scan and wait until one that started after this call has
+        finished, so the log reflects what is on screen now. Returns False
+        if none finished within `timeout` seconds (e.g. the scheduler is
+        busy with a long tool call).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        with self._cond:
+            target = self._scans_started + 1
+        self.poke()
+        while True:
+            with self._waiter() as event:
+                remaining = deadline - loop.time()
+                if self.scans >= target:
+                    return True
+                if remaining <= 0:
+                    return False
+                await _wait_event(event, remaining)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "running": self.running,
+                "ax_notifications": self.observing,
+                "notifications_received": self.notifications,
+                "scans": self.scans,
+                "chats": {name: seq for name, seq in self._seqs.items()},
+            }
+
+    @property
+    def observing(self) -> bool:
+        return self._observer is not None
+
+    def _append(
+        self,
+        chat_name: str,
+        text: str,
+        source: str,
+        unread: int | None = None,
+        sender: str | None = None,
+    ) -> ObservedMessage:
+        with self._cond:
+            seq = self._seqs.get(chat_name, 0) + 1
+            self._seqs[chat_name] = seq
+            message = ObservedMessage(
+                seq, chat_name, text, source, time.time(), unread, sender
+            )
+            self._logs.setdefault(chat_name, deque(maxlen=self.history)).append(message)
+            self._wake_waiters()
+            return message
+
+    # --- scanning -----------------------------------------------------
+
+    def _run(self) -> None:
+        try:
+            self._observer = get_backend().observe(
+                get_wechat_ax_app(), WATCH_NOTIFICATIONS, self.poke
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("AX notifications unavailable, polling only: %s", exc)
+        first = True
+        while True:
+            if not first and self._wake.wait(self.interval):
+                # Let a burst of notifications settle into one scan.
+                time.sleep(self.debounce)
+            first = False
+            self._wake.clear()
+            try:
+                found = self.scheduler.submit(None, self.scan).result()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Watcher scan failed: %s", exc)
+                continue
+            for chat_name, messages in found.items():
+                messages = [m for m in messages if m.incoming]
+                if not messages:
+                    continue
+                for listener in self._listeners:
+                    try:
+                        listener(chat_name, messages)
+                    except Exception:  # noqa: BLE001
+                        logger.exception("Watcher listener failed")
+
+    def scan(self) -> dict[str, list[ObservedMessage]]:
+        """
+        Diff the session list and the open chat's visible rows against the
+        previous scan and record new messages. The first scan (and the
+        first scan after switching chats) only records a baseline.
+        """
+        with self._cond:
+            self._scans_started += 1
+        try:
+            with span("watcher_scan") as attrs:
+                ax_app = get_wechat_ax_app()
+                found: dict[str, list[ObservedMessage]] = {}
+                open_chat = current_chat_state.name
+                self._scan_open_chat(ax_app, open_chat, found)
+                self._scan_sessions(ax_app, open_chat, found)
+                attrs["new"] = sum(len(messages) for messages in found.values())
+        finally:
+            with self._cond:
+                self.scans += 1
+                self._wake_waiters()
+        return found
+
+    def _scan_open_chat(
+        self, ax_app: Any, open_chat: str | None, found: dict[str, list[ObservedMessage]]
+    ) -> None:
+        if open_chat is None:
+            return
+        try:
+            msg_list = find_message_list(ax_app)
+        except RuntimeError:
+            return
+        scroll_bar = get_vertical_scroll_bar(msg_list)
+        position = ax_get(scroll_bar, kAXValueAttribute) if scroll_bar is not None else None
+        if isinstance(position, (int, float)) and position < 0.99:
+            # Scrolled into the history; new rows would not be visible.
+            return
+
+        tail = [(row, text) for row, text in read_message_tail(msg_list, TAIL_WINDOW) if text]
+        texts = [text for _, text in tail]
+        if open_chat != self._tail_chat:
+            self._tail_chat, self._tail = open_chat, texts
+            return
+        new_count = len(new_tail_rows(self._tail, texts))
+        self._tail = texts
+        if not new_count:
+            return
+        new_rows = tail[len(tail) - new_count :]
+        senders = classify_rows(msg_list, [row for row, _ in new_rows])
+        for (_, text), sender in zip(new_rows, senders):
+            found.setdefault(open_chat, []).append(
+                self._append(open_chat, text, "messages_list", sender=sender)
+            )
+
+    def _resolve_session_list(self, ax_app: Any) -> Any:
+        """
+        The session list element, cached across scans so each scan walks
+        only its rows. Re-resolved once the cached element stops reporting
+        its role (WeChat rebuilt the sidebar); None falls back to a walk
+        from the app root.
+        """
+        cached = self._session_list
+        if cached is not None and ax_get(cached, kAXRoleAttribute) == kAXListRole:
+            return cached
+        self._session_list = find_session_list(ax_app)
+        return self._session_list
+
+    def _scan_sessions(
+        self, ax_app: Any, open_chat: str | None, found: dict[str, list[ObservedMessage]]
+    ) -> None:
+        summaries = {
+            s.name: s for s in read_session_list(ax_app, self._resolve_session_list(ax_app))
+        }
+        previous, self._sessions = self._sessions, summaries
+        if previous is None:
+            return
+        for name, summary in summaries.items():
+            before = previous.get(name)
+            if name == open_chat or not summary.unread or not summary.preview:
+                continue
+            if before is not None and summary.unread <= before.unread and (
+                summary.preview == before.preview
+            ):
+                continue
+            found.setdefault(name, []).append(
+                self._append(name, summary.preview, "session_list", summary.unread)
+            )
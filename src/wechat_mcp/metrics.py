@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from .tracing import tracer
+
+# Histogram bucket upper bounds in seconds: 50us .. ~10min, ~12% apart.
+_BUCKET_GROWTH = 1.12
+_BUCKET_BOUNDS: list[float] = [
+    5e-5 * _BUCKET_GROWTH**i
+    for i in range(int(math.log(600 / 5e-5, _BUCKET_GROWTH)) + 2)
+]
+
+
+class LatencyHistogram:
+    """
+    Fixed-size log-bucketed latency histogram.
+
+    Memory use is constant regardless of the number of samples, and
+    percentiles are accurate to within one bucket (~12%).
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        seconds = max(0.0, seconds)
+        self.counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """
+        Return the approximate q-th percentile (0 < q <= 100) in seconds.
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        cumulative = 0
+        for idx, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = _BUCKET_BOUNDS[idx - 1] if idx > 0 else 0.0
+                upper = _BUCKET_BOUNDS[idx] if idx < len(_BUCKET_BOUNDS) else self.max
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max)
+            cumulative += bucket_count
+        return self.max
+
+
+class StatsStore:
+    """
+    Thread-safe, in-memory latency histograms keyed by stage name.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        """
+        Return call counts and p50/p95/p99/max latency (ms) per stage.
+        """
+        with self._lock:
+            return {
+                name: {
+                    "count": hist.count,
+                    "total_ms": hist.total * 1000.0,
+                    "p50_ms": hist.percentile(50) * 1000.0,
+                    "p95_ms": hist.percentile(95) * 1000.0,
+                    "p99_ms": hist.percentile(99) * 1000.0,
+                    "max_ms": hist.max * 1000.0,
+                }
+                for name, hist in sorted(self._histograms.items())
+            }
+
+    def prometheus_text(self) -> str:
+        """
+        Render all stages as a Prometheus summary in text exposition format.
+        """
+        metric = "wechat_mcp_stage_latency_seconds"
+        lines = [
+            f"# HELP {metric} Latency of WeChat automation stages.",
+            f"# TYPE {metric} summary",
+        ]
+        with self._lock:
+            for name, hist in sorted(self._histograms.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(
+                        f'{metric}{{stage="{label}",quantile="{q}"}} '
+                        f"{hist.percentile(q * 100):.6f}"
+                    )
+                lines.append(f'{metric}_sum{{stage="{label}"}} {hist.total:.6f}')
+                lines.append(f'{metric}_count{{stage="{label}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+
+stats = StatsStore()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+    """
+    Time the enclosed block and record it under `name`.
+
+    Yields a dict of attributes that the block may extend (e.g. node
+    counts); attributes are written to traces and do not affect stats.
+    """
+    record = tracer.start_span(name, attrs)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        duration = time.perf_counter() - start
+        stats.record(name, duration)
+        tracer.finish_span(record, duration)
+
+
+def traced_tool(tool: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator for the synchronous body of an MCP tool: records stage
+    "tool.<tool>" and, when tracing is enabled, writes a trace of the call.
+    """
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.trace_call(tool), span(f"tool.{tool}"):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def wait(seconds: float, reason: str) -> None:
+    """
+    Sleep for `seconds`, recording the pause as stage "wait.<reason>".
+    """
+    with span(f"wait.{reason}", seconds=seconds):
+        time.sleep(seconds)
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from .chat_scheduler import ChatScheduler
+from .checkpoints import state_dir, write_json_atomic
+from .logging_config import logger
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+@dataclass
+class OutboundTicket:
+    ticket_id: str
+    chat_name: str
+    message: str
+    state: str = QUEUED
+    created_at: float = 0.0
+    updated_at: float = 0.0
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class TokenBucket:
+    """
+    Allow `rate` events per second on average and up to `burst` at once.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """
+        Seconds until a token is available (0 if one is available now).
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if self._tokens >= 1.0 or self.rate <= 0:
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+    def take(self) -> None:
+        self._refill(time.monotonic())
+        self._tokens -= 1.0
+
+
+class OutboundQueue:
+    """
+    Durable queue of messages waiting to be sent, drained by a background
+    sender thread.
+
+    Tickets are persisted under state_dir()/outbound/queue.json on every
+    state change, so queued messages survive a restart. Messages to the
+    same chat are sent in FIFO order; across chats the sender prefers the
+    chat that is already open and otherwise takes the oldest ticket. Each
+    send is submitted to the ChatScheduler, so queued sends interleave
+    with interactive tool calls, and the sender never starts more than
+    `rate` sends per second on average (`burst` at most back to back).
+
+    A ticket found in the "sending" state on load was interrupted mid-send;
+    it is marked failed rather than retried, since the message may already
+    have gone out.
+    """
+
+    def __init__(
+        self,
+        scheduler: ChatScheduler,
+        send_fn: Callable[[str, str], dict[str, Any]],
+        rate: float = 1.0,
+        burst: int = 5,
+        max_finished: int = 500,
+    ) -> None:
+        self.scheduler = scheduler
+        self.send_fn = send_fn
+        self.bucket = TokenBucket(rate, burst)
+        self.max_finished = max_finished
+
+        self._cond = threading.Condition()
+        self._tickets: dict[str, OutboundTicket] = {}
+        self._path: Path | None = None
+        self._worker: threading.Thread | None = None
+
+    def configure(self, rate: float, burst: int) -> None:
+        with self._cond:
+            self.bucket = TokenBucket(rate, max(1, burst))
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = state_dir() / "outbound" / "queue.json"
+        return self._path
+
+    def load(self) -> None:
+        """
+        Restore persisted tickets and resume sending any that are queued.
+        """
+        with self._cond:
+            if self.path.exists():
+                try:
+                    raw = json.loads(self.path.read_text(encoding="utf-8"))
+                    self._tickets = {
+                        item["ticket_id"]: OutboundTicket(**item) for item in raw["tickets"]
+                    }
+                except (OSError, ValueError, KeyError, TypeError) as exc:
+                    logger.warning("Ignoring unreadable outbound queue %s: %s", self.path, exc)
+            for ticket in self._tickets.values():
+                if ticket.state == SENDING:
+                    ticket.state = FAILED
+                    ticket.error = "Interrupted while sending; not retried to avoid a duplicate"
+                    ticket.updated_at = time.time()
+            queued = sum(1 for t in self._tickets.values() if t.state == QUEUED)
+            self._save()
+            if queued:
+                logger.info("Resuming %d queued outbound messages", queued)
+                self._ensure_worker()
+
+    def enqueue(self, chat_name: str, message: str) -> OutboundTicket:
+        now = time.time()
+        ticket = OutboundTicket(
+            ticket_id=uuid.uuid4().hex[:12],
+            chat_name=chat_name,
+            message=message,
+            created_at=now,
+            updated_at=now,
+        )
+        with self._cond:
+            if self._path is None:
+                self.load()
+            self._tickets[ticket.ticket_id] = ticket
+            self._save()
+            self._ensure_worker()
+            self._cond.notify()
+        logger.info("Queued outbound message %s for chat=%s", ticket.ticket_id, chat_name)
+        return ticket
+
+    def position(self, ticket_id: str) -> int:
+        """
+        Number of tickets queued ahead of `ticket_id` for the same chat.
+        """
+        with self._cond:
+            ticket = self._tickets[ticket_id]
+            return sum(
+                1
+                for other in self._tickets.values()
+                if other.chat_name == ticket.chat_name
+                and other.state in (QUEUED, SENDING)
+                and other.created_at < ticket.created_at
+            )
+
+    def status(self, ticket_ids: list[str] | None = None) -> dict[str, Any]:
+        with self._cond:
+            if self._path is None:
+                self.load()
+            if ticket_ids is None:
+                tickets = [t.to_dict() for t in self._tickets.values()]
+                unknown: list[str] = []
+            else:
+                tickets = [self._tickets[i].to_dict() for i in ticket_ids if i in self._tickets]
+                unknown = [i for i in ticket_ids if i not in self._tickets]
+            counts = {state: 0 for state in (QUEUED, SENDING, SENT, FAILED)}
+            for ticket in self._tickets.values():
+                counts[ticket.state] += 1
+            result: dict[str, Any] = {
+                "tickets": tickets,
+                "counts": counts,
+                "rate_per_s": self.bucket.rate,
+                "burst": self.bucket.burst,
+            }
+            if unknown:
+                result["unknown_ticket_ids"] = unknown
+            return result
+
+    # --- sender -------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run, name="wechat-outbound", daemon=True
+            )
+            self._worker.start()
+
+    def _next_ticket(self) -> OutboundTicket | None:
+        heads: dict[str, OutboundTicket] = {}
+        for ticket in sorted(self._tickets.values(), key=lambda t: t.created_at):
+            if ticket.state == QUEUED and ticket.chat_name not in heads:
+                heads[ticket.chat_name] = ticket
+        if not heads:
+            return None
+        current = self.scheduler.current_chat
+        if current in heads:
+            return heads[current]
+        return min(heads.values(), key=lambda t: t.created_at)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                ticket = self._next_ticket()
+                while ticket is None:
+                    self._cond.wait()
+                    ticket = self._next_ticket()
+                delay = self.bucket.delay()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                self.bucket.take()
+                self._update(ticket, SENDING)
+
+            try:
+                result = self.scheduler.submit(
+                    ticket.chat_name, self.send_fn, ticket.chat_name, ticket.message
+                ).result()
+            except Exception as exc:  # noqa: BLE001
+                result = {"error": str(exc)}
+
+            with self._cond:
+                if result.get("sent"):
+                    self._update(ticket, SENT)
+                else:
+                    self._update(ticket, FAILED, result.get("error") or "Message was not sent")
+                    logger.warning(
+                        "Outbound message %s to chat=%s failed: %s",
+                        ticket.ticket_id,
+                        ticket.chat_name,
+                        ticket.error,
+                    )
+
+    def _update(self, ticket: OutboundTicket, state: str, error: str | None = None) -> None:
+        ticket.state = state
+        ticket.error = error
+        ticket.updated_at = time.time()
+        self._prune()
+        self._save()
+
+    def _prune(self) -> None:
+        finished = [t for t in self._tickets.values() if t.state in (SENT, FAILED)]
+        excess = len(finished) - self.max_finished
+        if excess > 0:
+            for ticket in sorted(finished, key=lambda t: t.updated_at)[:excess]:
+                del self._tickets[ticket.ticket_id]
+
+    def _save(self) -> None:
+        write_json_atomic(
+            self.path, {"tickets": [t.to_dict() for t in self._tickets.values()]}
+        )
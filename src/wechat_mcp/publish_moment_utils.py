@@ -3,23 +3,23 @@ from __future__ import annotations
 import time
 from typing import Any
 
-from ApplicationServices import (
-    AXUIElementPerformAction,
-    AXUIElementSetAttributeValue,
+from .actions import press_element
+from .ax_backend import (
     kAXButtonRole,
     kAXRaiseAction,
     kAXSheetRole,
     kAXTextAreaRole,
     kAXValueAttribute,
 )
-
 from .logging_config import logger
+from .metrics import span, wait
 from .wechat_accessibility import (
+    activate_wechat,
     _find_window_by_title,
     _wait_for_window,
-    click_element_center,
+    ax_perform,
+    ax_set,
     dfs,
-    get_wechat_ax_app,
     long_press_element_center,
 )
 
@@ -42,8 +42,7 @@ def _open_moments_window(ax_app: Any, timeout: float = 5.0) -> Any:
         raise RuntimeError("Could not find 'Moments' button in WeChat main window")
 
     logger.info("Clicking 'Moments' button in main window")
-    click_element_center(button)
-    time.sleep(0.4)
+    press_element(button, settle=0.4, label="after_moments_click")
 
     moments_window = _wait_for_window(ax_app, "Moments", timeout=timeout)
     if moments_window is None:
@@ -67,7 +66,7 @@ def _open_moment_composer(moments_window: Any) -> None:
 
     logger.info("Long-pressing 'Post' button to open composer sheet")
     long_press_element_center(button, hold_seconds=1.4)
-    time.sleep(0.3)
+    wait(0.3, "after_post_long_press")
 
 
 def _find_moments_sheet(moments_window: Any, timeout: float = 5.0) -> Any | None:
@@ -79,13 +78,14 @@ def _find_moments_sheet(moments_window: Any, timeout: float = 5.0) -> Any | None
     def is_sheet(el, role, title, identifier):
         return role == kAXSheetRole
 
-    end = time.time() + timeout
-    while time.time() < end:
-        sheet = dfs(moments_window, is_sheet)
-        if sheet is not None:
-            logger.info("Found Moments composer sheet")
-            return sheet
-        time.sleep(0.1)
+    with span("wait_for_sheet"):
+        end = time.time() + timeout
+        while time.time() < end:
+            sheet = dfs(moments_window, is_sheet)
+            if sheet is not None:
+                logger.info("Found Moments composer sheet")
+                return sheet
+            time.sleep(0.1)
 
     logger.warning("Timed out waiting for Moments composer sheet")
     return None
@@ -162,7 +162,7 @@ def publish_moment_without_media(content: str, publish: bool = True) -> dict[str
     )
 
     try:
-        ax_app = get_wechat_ax_app()
+        ax_app = activate_wechat()
         moments_window = _open_moments_window(ax_app)
         _open_moment_composer(moments_window)
 
@@ -186,8 +186,8 @@ def publish_moment_without_media(content: str, publish: bool = True) -> dict[str
                 "stage": "text_area",
             }
 
-        AXUIElementPerformAction(text_area, kAXRaiseAction)
-        err = AXUIElementSetAttributeValue(text_area, kAXValueAttribute, content)
+        ax_perform(text_area, kAXRaiseAction)
+        err = ax_set(text_area, kAXValueAttribute, content)
         if err != 0:
             error_msg = f"Failed to set composer text, AX error {err}"
             logger.warning(error_msg)
@@ -217,8 +217,7 @@ def publish_moment_without_media(content: str, publish: bool = True) -> dict[str
                 "stage": "post_button",
             }
 
-        click_element_center(post_button)
-        time.sleep(0.5)
+        press_element(post_button, settle=0.5, label="after_post_click")
 
         logger.info("Moments post submitted successfully")
         return {
@@ -3,53 +3,65 @@ from __future__ import annotations
 import time
 from typing import Any
 
-import AppKit
-from ApplicationServices import (
-    AXUIElementCopyAttributeValue,
-    AXUIElementPerformAction,
-    AXUIElementSetAttributeValue,
+from .ax_backend import (
+    get_backend,
+    kAXChildrenAttribute,
+    kAXIdentifierAttribute,
     kAXRaiseAction,
     kAXTextAreaRole,
+    kAXTitleAttribute,
     kAXValueAttribute,
 )
-from Quartz import (
-    CGEventCreateKeyboardEvent,
-    CGEventPost,
-    CGEventSetFlags,
-    kCGEventFlagMaskCommand,
-    kCGHIDEventTap,
-)
-
+from .fetch_messages_by_chat_utils import get_messages_list
 from .logging_config import logger
+from .metrics import span, wait
+from .text_entry import enter_text
 from .wechat_accessibility import (
+    activate_wechat,
     ax_get,
+    ax_perform,
     dfs,
     get_wechat_ax_app,
-    send_key_with_modifiers,
 )
 
 # ANSI keyboard keycodes (US layout)
-KEYCODE_ANSI_A = 0
-KEYCODE_ANSI_V = 9
 KEYCODE_RETURN = 36
 
+# Rows read from the end of the Messages list to confirm a send.
+TAIL_ROWS = 3
+
+# Messages longer than this are sent as several chunks.
+MAX_CHUNK_CHARS = 2000
+
+# Preferred break points, tried in order: paragraphs, lines, words.
+_CHUNK_SEPARATORS = ("\n\n", "\n", " ")
+
 
 def press_return() -> None:
     """
     Synthesize a Return key press.
     """
-    event_down = CGEventCreateKeyboardEvent(None, KEYCODE_RETURN, True)
-    CGEventSetFlags(event_down, 0)
-    event_up = CGEventCreateKeyboardEvent(None, KEYCODE_RETURN, False)
-    CGEventSetFlags(event_up, 0)
-    CGEventPost(kCGHIDEventTap, event_down)
-    CGEventPost(kCGHIDEventTap, event_up)
+    get_backend().post_key(KEYCODE_RETURN, 0)
+
+
+_input_field_cache: Any = None
 
 
 def find_input_field(ax_app: Any):
     """
     Locate the chat input text area in the current WeChat window.
+
+    WeChat keeps the same input element across chat switches, so the last
+    one found is reused as long as it still identifies itself as the chat
+    input; otherwise the tree is searched again.
     """
+    global _input_field_cache
+    cached = _input_field_cache
+    if cached is not None:
+        if ax_get(cached, kAXIdentifierAttribute) == "chat_input_field":
+            return cached
+        logger.debug("Cached chat input field is stale; locating it again")
+        _input_field_cache = None
 
     def is_input(el, role, title, identifier):
         return role == kAXTextAreaRole and identifier == "chat_input_field"
@@ -59,121 +71,238 @@ def find_input_field(ax_app: Any):
         raise RuntimeError(
             "Could not find WeChat chat input field via Accessibility API"
         )
+    _input_field_cache = input_field
     return input_field
 
 
-def send_message(text: str) -> None:
+_message_list_cache: Any = None
+
+
+def find_message_list(ax_app: Any):
     """
-    Send a message in the currently open chat by focusing the input
-    field, setting its value, and pressing Return.
+    Locate the `Messages` list of the open chat, reusing the last one found
+    while it still answers with its title.
+    """
+    global _message_list_cache
+    cached = _message_list_cache
+    if cached is not None and ax_get(cached, kAXTitleAttribute) == "Messages":
+        return cached
+    _message_list_cache = get_messages_list(ax_app)
+    return _message_list_cache
 
-    Uses two methods with fallback:
-    1. Try to set value directly via Accessibility API
-    2. If that fails, use keyboard simulation via pasteboard (Cmd+V)
+
+def read_message_tail(
+    msg_list: Any, rows: int = TAIL_ROWS
+) -> tuple[tuple[Any, str], ...]:
     """
-    logger.info("Sending message of length %d characters", len(text))
-    ax_app = get_wechat_ax_app()
-    input_field = find_input_field(ax_app)
+    (element, text) of the last `rows` rows of the Messages list, oldest
+    first.
+
+    Only the tail rows' values are read, so this stays cheap however many
+    rows the list currently exposes.
+    """
+    children = ax_get(msg_list, kAXChildrenAttribute) or []
+    tail = []
+    for child in children[-rows:]:
+        text = ax_get(child, kAXValueAttribute) or ax_get(child, kAXTitleAttribute)
+        tail.append((child, text.strip() if isinstance(text, str) else ""))
+    return tuple(tail)
+
+
+def _wait_for_sent_row(
+    msg_list: Any, text: str, before: tuple[tuple[Any, str], ...], timeout: float
+) -> bool:
+    """
+    Poll the Messages tail until a new last row with `text` appears.
+
+    A row counts as new if the tail texts changed or, when a tall row
+    leaves only identical texts visible, the last row is another element.
+    """
+    expected = text.strip()
+    before_texts = [row_text for _, row_text in before]
+    before_last = before[-1][0] if before else None
+    deadline = time.monotonic() + timeout
+    while True:
+        tail = read_message_tail(msg_list)
+        if tail and tail[-1][1] == expected:
+            if [row_text for _, row_text in tail] != before_texts or tail[-1][0] != before_last:
+                return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+
+
+def split_message(text: str, limit: int = MAX_CHUNK_CHARS, _level: int = 0) -> list[str]:
+    """
+    Split `text` into chunks of at most `limit` characters.
+
+    Chunks break between paragraphs where possible, then between lines,
+    then between words; only a single unbroken run longer than `limit` is
+    cut mid-word. Each chunk is stripped, like WeChat strips a message.
+    """
+    text = text.strip()
+    if len(text) <= limit:
+        return [text] if text else []
+    if _level == len(_CHUNK_SEPARATORS):
+        return [text[i : i + limit] for i in range(0, len(text), limit)]
+
+    sep = _CHUNK_SEPARATORS[_level]
+    chunks: list[str] = []
+    current = ""
+    for part in text.split(sep):
+        if not part.strip():
+            continue
+        candidate = f"{current}{sep}{part}" if current else part
+        if len(candidate.strip()) <= limit:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        pieces = split_message(part, limit, _level + 1)
+        chunks.extend(pieces[:-1])
+        current = pieces[-1]
+    if current:
+        chunks.append(current)
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
 
-    # Focus the input field
-    AXUIElementPerformAction(input_field, kAXRaiseAction)
-    time.sleep(0.1)
 
-    # Method 1: Try to set value directly via Accessibility API
-    err = AXUIElementSetAttributeValue(input_field, kAXValueAttribute, text)
+def send_message(
+    text: str, input_field: Any | None = None, verify: str = "full"
+) -> None:
+    """
+    Send a message in the currently open chat by focusing the input
+    field, entering the text and pressing Return.
 
-    # Verify the text was actually set by reading it back
-    time.sleep(0.05)
-    actual_value = ax_get(input_field, kAXValueAttribute)
+    The text is entered with text_entry.enter_text, which tries the AX
+    value, selected-text insertion and a pasteboard paste in turn and
+    remembers which one works for the input field.
 
-    if err == 0 and actual_value == text:
-        logger.debug("Successfully set message text via Accessibility API")
+    Pass `input_field` to reuse an input field already located in the
+    open chat; WeChat must then already be in the foreground. `verify` is
+    passed to enter_text ("length" only compares the character count).
+
+    Delivery is confirmed by the message appearing as a new last row of
+    the Messages list. Return is only pressed again while no such row has
+    appeared and the input still holds the text, so a slow send is never
+    sent twice.
+    """
+    logger.info("Sending message of length %d characters", len(text))
+    if input_field is None:
+        ax_app = activate_wechat()
+        input_field = find_input_field(ax_app)
     else:
-        # Method 2: Fallback to keyboard simulation via pasteboard
-        logger.warning(
-            "Accessibility API failed to set text (err=%s, actual=%r vs expected=%r), "
-            "falling back to keyboard simulation",
-            err,
-            actual_value,
-            text,
-        )
+        ax_app = get_wechat_ax_app()
+    msg_list = find_message_list(ax_app)
+    before = read_message_tail(msg_list)
 
-        # Clear the field first (Cmd+A to select all)
-        send_key_with_modifiers(KEYCODE_ANSI_A, kCGEventFlagMaskCommand)
-        time.sleep(0.05)
+    with span("send_enter_text"):
+        enter_text(input_field, text, key="chat_input_field", verify=verify)
 
-        # Copy text to pasteboard, while preserving user's clipboard
-        pb = AppKit.NSPasteboard.generalPasteboard()
-        saved_items = pb.pasteboardItems()
-        try:
-            pb.clearContents()
-            pb.setString_forType_(text, AppKit.NSPasteboardTypeString)
-            time.sleep(0.05)
-
-            # Paste (Cmd+V)
-            send_key_with_modifiers(KEYCODE_ANSI_V, kCGEventFlagMaskCommand)
-            time.sleep(0.1)
-
-            # Verify again
-            actual_value = ax_get(input_field, kAXValueAttribute)
-            if actual_value != text:
-                logger.error(
-                    "Failed to set message text even with keyboard simulation. "
-                    "Expected %r, got %r",
-                    text,
-                    actual_value,
-                )
-                raise RuntimeError(
-                    f"Failed to set input text. Expected {text!r}, got {actual_value!r}"
-                )
-
-            logger.info("Successfully set message text via keyboard simulation")
-        finally:
-            # Restore original pasteboard content
-            pb.clearContents()
-            if saved_items:
-                pb.writeObjects_(saved_items)
-
-    # Send the message with retry logic to handle concurrent user interaction
-    max_retries = 5
-    for attempt in range(max_retries):
-        # Re-focus the input field before each attempt to ensure it has focus
-        AXUIElementPerformAction(input_field, kAXRaiseAction)
-        time.sleep(0.15)
-
-        # Press Return to send
+    # Press Return until the message shows up at the end of the Messages
+    # list. Retries are gated on that confirmation and on the input still
+    # holding the text, so a late-arriving send is never repeated.
+    max_attempts = 3
+    final_value = None
+    for attempt in range(max_attempts):
+        ax_perform(input_field, kAXRaiseAction)
+        wait(0.05, "input_refocus")
         press_return()
 
-        # Wait for input field to clear, with a timeout (polling approach)
-        timeout = time.time() + 1.0  # 1 second timeout
-        final_value = None
-        while time.time() < timeout:
-            final_value = ax_get(input_field, kAXValueAttribute)
-            if not final_value or not final_value.strip():
+        with span("send_confirm_tail", attempt=attempt + 1):
+            if _wait_for_sent_row(msg_list, text, before, timeout=1.5):
                 logger.info("Message sent successfully")
                 return
-            time.sleep(0.1)
 
-        # Message not sent yet, log and retry
+        final_value = ax_get(input_field, kAXValueAttribute)
+        if not final_value or not final_value.strip():
+            # Return was accepted but the new row is not visible (e.g. the
+            # list was scrolled away from the bottom); pressing Return
+            # again could only send an empty input, so stop here.
+            logger.warning(
+                "Input cleared but no new row seen at the end of the Messages "
+                "list; assuming the message was sent"
+            )
+            return
+
         logger.warning(
-            "Attempt %d/%d: Input field still contains text after pressing Return: %r. "
-            "Retrying...",
+            "Attempt %d/%d: message not in Messages list and input still "
+            "contains %r. Retrying...",
             attempt + 1,
-            max_retries,
+            max_attempts,
             final_value,
         )
 
-        # If this wasn't the last attempt, wait a bit before retrying
-        if attempt < max_retries - 1:
-            time.sleep(0.2)
-
-    # All retries failed
     logger.error(
         "Failed to send message after %d attempts. Input field still contains: %r",
-        max_retries,
+        max_attempts,
         final_value,
     )
     raise RuntimeError(
-        f"Message may not have been sent after {max_retries} attempts. "
+        f"Message was not sent after {max_attempts} attempts. "
         f"Input field still contains: {final_value!r}"
     )
+
+
+def send_message_chunked(
+    text: str, chunk_size: int = MAX_CHUNK_CHARS
+) -> list[dict[str, Any]]:
+    """
+    Send a long message in the open chat as consecutive chunks from
+    split_message, activating WeChat and locating the input field once.
+
+    Each chunk's entry is verified by its character count rather than by
+    reading the whole value back, and confirmed in the Messages list like
+    any other send. Returns one record per chunk with its index, length
+    and send time; sending stops at the first failed chunk, whose record
+    carries the error, so later chunks never arrive out of order.
+    """
+    chunks = split_message(text, chunk_size)
+    logger.info(
+        "Sending message of length %d characters as %d chunks", len(text), len(chunks)
+    )
+    ax_app = activate_wechat()
+    input_field = find_input_field(ax_app)
+
+    records: list[dict[str, Any]] = []
+    for index, chunk in enumerate(chunks):
+        start = time.perf_counter()
+        record: dict[str, Any] = {"index": index, "chars": len(chunk)}
+        try:
+            with span("send_chunk", index=index, chars=len(chunk)):
+                send_message(chunk, input_field=input_field, verify="length")
+        except Exception as exc:  # noqa: BLE001
+            record["error"] = str(exc)
+        record["elapsed_ms"] = round((time.perf_counter() - start) * 1000.0, 1)
+        records.append(record)
+        if "error" in record:
+            logger.warning("Chunk %d/%d failed: %s", index + 1, len(chunks), record["error"])
+            break
+    return records
+
+
+def send_messages(texts: list[str]) -> list[dict[str, Any]]:
+    """
+    Send several messages in the currently open chat, activating WeChat
+    and locating the input field once for all of them.
+
+    Returns one result per text, in order. A failed send is reported in
+    its result and does not stop the remaining messages.
+    """
+    ax_app = activate_wechat()
+    input_field = find_input_field(ax_app)
+
+    results: list[dict[str, Any]] = []
+    for text in texts:
+        if not isinstance(text, str) or not text.strip():
+            results.append(
+                {"reply_message": text, "sent": False, "error": "empty message"}
+            )
+            continue
+        try:
+            send_message(text, input_field=input_field)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Batch send of message failed: %s", exc)
+            results.append({"reply_message": text, "sent": False, "error": str(exc)})
+        else:
+            results.append({"reply_message": text, "sent": True})
+    return results
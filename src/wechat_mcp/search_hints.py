@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .checkpoints import state_dir, write_json_atomic
+from .logging_config import logger
+
+
+class SearchHints:
+    """
+    Where past global searches found each chat, persisted as JSON under
+    state_dir()/search_hints.json.
+
+    A hint records the row (`rank`, counted from the top of the expanded
+    results) at which the exact match was found and the number of results
+    WeChat reported at the time; the query is always the chat name. The
+    next search for the same chat jumps close to that row instead of
+    scanning every page from the top. Only the `max_entries` most recently used
+    chats are kept.
+    """
+
+    def __init__(self, max_entries: int = 1000) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hints: dict[str, dict[str, Any]] | None = None
+        self._path: Path | None = None
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = state_dir() / "search_hints.json"
+        return self._path
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._hints is None:
+            self._hints = {}
+            if self.path.exists():
+                try:
+                    self._hints = json.loads(self.path.read_text(encoding="utf-8"))["hints"]
+                except (OSError, ValueError, KeyError) as exc:
+                    logger.warning("Ignoring unreadable search hints %s: %s", self.path, exc)
+        return self._hints
+
+    def get(self, chat_name: str) -> dict[str, Any] | None:
+        with self._lock:
+            return self._load().get(chat_name)
+
+    def record(self, chat_name: str, rank: int, total: int | None) -> None:
+        with self._lock:
+            hints = self._load()
+            hints.pop(chat_name, None)
+            hints[chat_name] = {
+                "rank": rank,
+                "total": total,
+                "updated_at": time.time(),
+            }
+            while len(hints) > self.max_entries:
+                del hints[next(iter(hints))]
+            write_json_atomic(self.path, {"hints": hints})
+
+    def forget(self, chat_name: str) -> None:
+        with self._lock:
+            if self._load().pop(chat_name, None) is not None:
+                write_json_atomic(self.path, {"hints": self._hints})
+
+
+search_hints = SearchHints()
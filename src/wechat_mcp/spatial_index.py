@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import bisect
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from .ax_backend import (
+    get_backend,
+    kAXChildrenAttribute,
+    kAXIdentifierAttribute,
+    kAXPositionAttribute,
+    kAXRoleAttribute,
+    kAXSizeAttribute,
+    kAXTitleAttribute,
+    kAXValueAttribute,
+)
+from .metrics import span
+
+# (x, y, width, height) in screen coordinates.
+Frame = tuple[float, float, float, float]
+
+# Side of a grid cell in points; about one control or list row.
+DEFAULT_CELL_SIZE = 64.0
+
+_NODE_ATTRIBUTES = [
+    kAXRoleAttribute,
+    kAXTitleAttribute,
+    kAXValueAttribute,
+    kAXIdentifierAttribute,
+    kAXPositionAttribute,
+    kAXSizeAttribute,
+    kAXChildrenAttribute,
+]
+
+
+@dataclass
+class IndexedElement:
+    """
+    An element with the attributes read while building the index. Only
+    the frame and identity are meant to be relied on; values that change
+    (checkbox states, text) should be read again from `element`.
+    """
+
+    element: Any
+    role: Any
+    title: Any
+    value: Any
+    identifier: Any
+    frame: Frame
+
+    @property
+    def x(self) -> float:
+        return self.frame[0]
+
+    @property
+    def y(self) -> float:
+        return self.frame[1]
+
+
+class FrameIndex:
+    """
+    Spatial index over element frames, built once per snapshot of a
+    window or list.
+
+    The elements' top edges are kept sorted for row queries, and a uniform
+    grid of `cell_size` cells, built on the first rectangle query, answers
+    those, so lookups touch only the elements near the query instead of
+    every node in the tree.
+    """
+
+    def __init__(
+        self, items: Iterable[IndexedElement], cell_size: float = DEFAULT_CELL_SIZE
+    ) -> None:
+        self.items = list(items)
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], list[int]] | None = None
+        order = sorted(range(len(self.items)), key=lambda i: self.items[i].y)
+        self._by_top = order
+        self._tops = [self.items[i].y for i in order]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _cells_for(self, frame: Frame):
+        x, y, w, h = frame
+        size = self.cell_size
+        for col in range(math.floor(x / size), math.floor((x + max(w, 0.0)) / size) + 1):
+            for row in range(math.floor(y / size), math.floor((y + max(h, 0.0)) / size) + 1):
+                yield col, row
+
+    def find(
+        self, predicate: Callable[[IndexedElement], bool]
+    ) -> IndexedElement | None:
+        """
+        First element (in tree order) matching `predicate`; no AX reads.
+        """
+        return next((item for item in self.items if predicate(item)), None)
+
+    def within(self, rect: Frame, role: Any = None) -> list[IndexedElement]:
+        """
+        Elements whose frame lies entirely inside `rect`, in tree order.
+        """
+        if self._cells is None:
+            # Only rectangle queries need the grid; build it on first use.
+            self._cells = {}
+            for i, item in enumerate(self.items):
+                for cell in self._cells_for(item.frame):
+                    self._cells.setdefault(cell, []).append(i)
+        rx, ry, rw, rh = rect
+        seen: set[int] = set()
+        for cell in self._cells_for(rect):
+            seen.update(self._cells.get(cell, ()))
+        found = []
+        for i in sorted(seen):
+            item = self.items[i]
+            x, y, w, h = item.frame
+            if role is not None and item.role != role:
+                continue
+            if rx <= x and ry <= y and x + w <= rx + rw and y + h <= ry + rh:
+                found.append(item)
+        return found
+
+    def same_row(
+        self, frame: Frame, tolerance: float = 6.0, role: Any = None
+    ) -> list[IndexedElement]:
+        """
+        Elements whose top edge is within `tolerance` of the top edge of
+        `frame`, left to right, excluding an element with that exact
+        frame.
+        """
+        top = frame[1]
+        lo = bisect.bisect_left(self._tops, top - tolerance)
+        hi = bisect.bisect_right(self._tops, top + tolerance)
+        row = [
+            self.items[i]
+            for i in self._by_top[lo:hi]
+            if (role is None or self.items[i].role == role) and self.items[i].frame != frame
+        ]
+        row.sort(key=lambda item: item.x)
+        return row
+
+    def nearest_left_of(
+        self, frame: Frame, tolerance: float = 6.0, role: Any = None
+    ) -> IndexedElement | None:
+        """
+        The closest element on the same row (see same_row) that starts to
+        the left of `frame`.
+        """
+        left = [item for item in self.same_row(frame, tolerance, role) if item.x < frame[0]]
+        return left[-1] if left else None
+
+
+def index_tree(root: Any, cell_size: float = DEFAULT_CELL_SIZE) -> FrameIndex:
+    """
+    Walk the tree under `root` once, reading each element's role, title,
+    value, identifier, frame and children in one batched call, and index
+    every element that has a position.
+    """
+    backend = get_backend()
+    items: list[IndexedElement] = []
+
+    def walk(element):
+        role, title, value, identifier, position, size, children = backend.get_attributes(
+            element, _NODE_ATTRIBUTES
+        )
+        point = backend.point_value(position) if position is not None else None
+        if point is not None:
+            extent = backend.size_value(size) if size is not None else None
+            w, h = extent if extent is not None else (0.0, 0.0)
+            items.append(
+                IndexedElement(element, role, title, value, identifier, (point[0], point[1], w, h))
+            )
+        for child in children or []:
+            walk(child)
+
+    with span("index_tree") as attrs:
+        walk(root)
+        attrs["nodes"] = len(items)
+        return FrameIndex(items, cell_size)
+
+
+class BandIndex:
+    """
+    Horizontal bands, each starting at a labelled y coordinate and running
+    to the next one, for example the sections of the search results list.
+    label_at() is a binary search.
+    """
+
+    def __init__(self, starts: dict[str, float]) -> None:
+        # Among labels starting at the same y, the first one wins.
+        ordered = sorted(enumerate(starts.items()), key=lambda e: (e[1][1], -e[0]))
+        self._ys = [y for _, (_, y) in ordered]
+        self._labels = [label for _, (label, _) in ordered]
+
+    def label_at(self, y: float) -> str | None:
+        i = bisect.bisect_right(self._ys, y)
+        return self._labels[i - 1] if i else None
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from .ax_backend import (
+    get_backend,
+    kAXIdentifierAttribute,
+    kAXNumberOfCharactersAttribute,
+    kAXRaiseAction,
+    kAXRoleAttribute,
+    kAXSelectedTextAttribute,
+    kAXTitleAttribute,
+    kAXValueAttribute,
+    kCGEventFlagMaskCommand,
+)
+from .logging_config import logger
+from .metrics import span, wait
+
+# ANSI keyboard keycodes (US layout)
+KEYCODE_ANSI_A = 0
+KEYCODE_ANSI_V = 9
+
+PATH_AX_VALUE = "ax_value"
+PATH_SELECTED_TEXT = "selected_text"
+PATH_PASTE = "paste"
+
+# Preferred order: no synthetic input, then keyboard selection only, then
+# the pasteboard.
+ENTRY_PATHS = (PATH_AX_VALUE, PATH_SELECTED_TEXT, PATH_PASTE)
+
+# Last path that worked, per field key. Fields whose AX value is writable
+# never touch the keyboard or the pasteboard after the first call.
+_working_paths: dict[str, str] = {}
+
+
+def field_key(field: Any) -> str:
+    """
+    Key identifying a text field across lookups: its AX identifier, or its
+    role and title when it has none.
+    """
+    backend = get_backend()
+    identifier = backend.get_attribute(field, kAXIdentifierAttribute)
+    if isinstance(identifier, str) and identifier:
+        return identifier
+    role = backend.get_attribute(field, kAXRoleAttribute)
+    title = backend.get_attribute(field, kAXTitleAttribute)
+    return f"{role}:{title or ''}"
+
+
+def working_paths() -> dict[str, str]:
+    return dict(_working_paths)
+
+
+def utf16_length(text: str) -> int:
+    """
+    Length as AppKit counts it (UTF-16 code units).
+    """
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _value_matches(field: Any, text: str, verify: str) -> bool:
+    """
+    Check the field now holds `text`. With verify="length", only the
+    field's character count is read, which avoids copying a long value
+    back over the accessibility API; fields that do not report a count
+    fall back to the full comparison.
+    """
+    backend = get_backend()
+    with span("send_verify_text", verify=verify):
+        if verify == "length":
+            count = backend.get_attribute(field, kAXNumberOfCharactersAttribute)
+            if isinstance(count, int):
+                return count == utf16_length(text)
+        return backend.get_attribute(field, kAXValueAttribute) == text
+
+
+def _select_all() -> None:
+    get_backend().post_key(KEYCODE_ANSI_A, kCGEventFlagMaskCommand)
+    wait(0.05, "select_all")
+
+
+def _enter_via_ax_value(field: Any, text: str, verify: str) -> bool:
+    err = get_backend().set_attribute(field, kAXValueAttribute, text)
+    if err != 0:
+        return False
+    wait(0.05, "input_value_settle")
+    return _value_matches(field, text, verify)
+
+
+def _enter_via_selected_text(field: Any, text: str, verify: str) -> bool:
+    backend = get_backend()
+    _select_all()
+    err = backend.set_attribute(field, kAXSelectedTextAttribute, text)
+    if err != 0:
+        return False
+    wait(0.05, "input_value_settle")
+    return _value_matches(field, text, verify)
+
+
+def _enter_via_paste(field: Any, text: str, verify: str) -> bool:
+    """
+    Select all and paste `text`. Cmd+V only reads the general pasteboard,
+    so the user's contents are saved first and put back afterwards, unless
+    something else has written the pasteboard in between.
+    """
+    backend = get_backend()
+    _select_all()
+    saved = backend.save_pasteboard()
+    backend.set_pasteboard_text(text)
+    ours = backend.pasteboard_change_count()
+    try:
+        wait(0.05, "pasteboard_ready")
+        backend.post_key(KEYCODE_ANSI_V, kCGEventFlagMaskCommand)
+        wait(0.1, "paste_settle")
+        return _value_matches(field, text, verify)
+    finally:
+        if backend.pasteboard_change_count() == ours:
+            backend.restore_pasteboard(saved)
+        else:
+            logger.info("Pasteboard changed during paste; not restoring the saved contents")
+
+
+_ENTRY_FUNCTIONS: dict[str, Callable[[Any, str, str], bool]] = {
+    PATH_AX_VALUE: _enter_via_ax_value,
+    PATH_SELECTED_TEXT: _enter_via_selected_text,
+    PATH_PASTE: _enter_via_paste,
+}
+
+
+def enter_text(
+    field: Any,
+    text: str,
+    key: str | None = None,
+    verify: str = "full",
+    accept: Callable[[], bool] | None = None,
+) -> str:
+    """
+    Replace the contents of a text field with `text` and return the entry
+    path that worked.
+
+    Paths are tried in ENTRY_PATHS order (AX value set, select-all plus
+    AXSelectedText insertion, then select-all plus Cmd+V paste), each
+    verified by reading the value back ("full") or, with verify="length",
+    only the field's character count. For fields whose owner reacts to
+    input, `accept` is called after the value reads back and the path only
+    counts when it returns True (a value set through AX does not start
+    WeChat's search, for example). The path that worked is recorded for
+    the field's key and tried first next time. Synthetic keyboard paths
+    require WeChat to be frontmost.
+    """
+    key = key or field_key(field)
+    preferred = _working_paths.get(key)
+    order = list(ENTRY_PATHS)
+    if preferred is not None:
+        order.remove(preferred)
+        order.insert(0, preferred)
+
+    get_backend().perform_action(field, kAXRaiseAction)
+    wait(0.1, "input_focus")
+
+    for path in order:
+        with span(f"text_entry.{path}") as attrs:
+            ok = _ENTRY_FUNCTIONS[path](field, text, verify)
+            if ok and accept is not None:
+                ok = attrs["accepted"] = accept()
+            attrs["ok"] = ok
+        if ok:
+            if preferred != path:
+                logger.info("Text entry for field %r now uses the %s path", key, path)
+                _working_paths[key] = path
+            return path
+        logger.warning("Text entry via %s did not take effect for field %r", path, key)
+
+    _working_paths.pop(key, None)
+    actual = get_backend().get_attribute(field, kAXValueAttribute)
+    if accept is not None and actual == text:
+        raise RuntimeError(f"Text entered into {key!r} did not take effect: {text!r}")
+    raise RuntimeError(
+        f"Failed to enter text into {key!r}. Expected {text!r}, got {actual!r}"
+    )
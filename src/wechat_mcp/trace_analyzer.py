@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import argparse
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Iterable
+
+
+def iter_trace_files(paths: Iterable[str]) -> Iterable[Path]:
+    for raw in paths:
+        path = Path(raw).expanduser()
+        if path.is_dir():
+            yield from sorted(path.glob("*.jsonl"))
+        elif path.is_file():
+            yield path
+
+
+def load_trace(path: Path) -> list[dict[str, Any]]:
+    spans: list[dict[str, Any]] = []
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def summarize(
+    traces: Iterable[list[dict[str, Any]]], tool: str | None = None
+) -> tuple[int, dict[str, dict[str, float]]]:
+    """
+    Sum span durations by name across traces.
+
+    For each span name this reports the call count, total time, self time
+    (total minus time spent in child spans) and mean time, in ms. Only
+    traces whose tool matches `tool` are included when it is given.
+    """
+    totals: dict[str, dict[str, float]] = defaultdict(
+        lambda: {"count": 0, "total_ms": 0.0, "self_ms": 0.0}
+    )
+    trace_count = 0
+
+    for spans in traces:
+        if not spans:
+            continue
+        if tool is not None and spans[0].get("tool") != tool:
+            continue
+        trace_count += 1
+
+        child_ms: dict[int, float] = defaultdict(float)
+        for record in spans:
+            parent = record.get("parent_id")
+            if parent is not None:
+                child_ms[parent] += float(record.get("duration_ms", 0.0))
+
+        for record in spans:
+            duration = float(record.get("duration_ms", 0.0))
+            entry = totals[record["name"]]
+            entry["count"] += 1
+            entry["total_ms"] += duration
+            entry["self_ms"] += max(0.0, duration - child_ms[record["span_id"]])
+
+    for entry in totals.values():
+        entry["mean_ms"] = entry["total_ms"] / entry["count"] if entry["count"] else 0.0
+    return trace_count, dict(totals)
+
+
+def format_table(summary: dict[str, dict[str, float]], sort_key: str) -> str:
+    rows = sorted(summary.items(), key=lambda item: item[1][sort_key], reverse=True)
+    width = max([len("span")] + [len(name) for name, _ in rows])
+    lines = [
+        f"{'span':<{width}}  {'count':>7}  {'total_ms':>12}  {'self_ms':>12}  {'mean_ms':>10}"
+    ]
+    for name, entry in rows:
+        lines.append(
+            f"{name:<{width}}  {int(entry['count']):>7}  {entry['total_ms']:>12.1f}  "
+            f"{entry['self_ms']:>12.1f}  {entry['mean_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """
+    Entry point for the trace analyser: sum time by span name across
+    traces written with `wechat-mcp --trace-dir`.
+    """
+    parser = argparse.ArgumentParser(
+        description="Summarize WeChat MCP per-call traces by span name"
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="Trace files or directories containing *.jsonl"
+    )
+    parser.add_argument(
+        "--tool", default=None, help="Only include traces of this tool"
+    )
+    parser.add_argument(
+        "--sort",
+        choices=["total_ms", "self_ms", "count", "mean_ms"],
+        default="self_ms",
+        help="Column to sort by (default: self_ms)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON instead")
+    args = parser.parse_args()
+
+    traces = (load_trace(path) for path in iter_trace_files(args.paths))
+    trace_count, summary = summarize(traces, tool=args.tool)
+
+    if args.json:
+        print(json.dumps({"traces": trace_count, "spans": summary}, indent=2))
+        return
+
+    print(f"{trace_count} traces")
+    print(format_table(summary, args.sort))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+from .logging_config import logger
+
+
+@dataclass
+class SpanRecord:
+    trace_id: str
+    span_id: int
+    parent_id: int | None
+    tool: str
+    name: str
+    start_ms: float
+    duration_ms: float = 0.0
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+class _Trace:
+    def __init__(self, tool: str) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.tool = tool
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.records: list[SpanRecord] = []
+        self.stack: list[SpanRecord] = []
+        self.next_id = 0
+
+
+class Tracer:
+    """
+    Optional per-tool-call tracer writing one JSON-lines file per call.
+
+    Tracing is off until configure() is given a directory. While a tool
+    call is being traced, every metrics span opened on the same thread
+    becomes a nested span in that call's trace.
+    """
+
+    def __init__(self) -> None:
+        self.trace_dir: Path | None = None
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self.trace_dir is not None
+
+    def configure(self, trace_dir: str | Path | None) -> None:
+        if trace_dir is None:
+            self.trace_dir = None
+            return
+        path = Path(trace_dir).expanduser().resolve()
+        path.mkdir(parents=True, exist_ok=True)
+        self.trace_dir = path
+        logger.info("Writing per-call traces to %s", path)
+
+    def _current(self) -> _Trace | None:
+        return getattr(self._local, "trace", None)
+
+    @contextmanager
+    def trace_call(self, tool: str, **attrs: Any) -> Iterator[None]:
+        """
+        Trace one tool call. Nested calls join the enclosing trace.
+        """
+        if not self.enabled or self._current() is not None:
+            yield
+            return
+
+        trace = _Trace(tool)
+        self._local.trace = trace
+        try:
+            yield
+        finally:
+            self._local.trace = None
+            self._write(trace)
+
+    def start_span(self, name: str, attrs: dict[str, Any]) -> SpanRecord | None:
+        trace = self._current()
+        if trace is None:
+            return None
+        parent = trace.stack[-1].span_id if trace.stack else None
+        record = SpanRecord(
+            trace_id=trace.trace_id,
+            span_id=trace.next_id,
+            parent_id=parent,
+            tool=trace.tool,
+            name=name,
+            start_ms=(time.perf_counter() - trace.origin) * 1000.0,
+            attrs=attrs,
+        )
+        trace.next_id += 1
+        trace.stack.append(record)
+        return record
+
+    def finish_span(self, record: SpanRecord | None, duration: float) -> None:
+        if record is None:
+            return
+        trace = self._current()
+        if trace is None:
+            return
+        record.duration_ms = duration * 1000.0
+        if trace.stack and trace.stack[-1] is record:
+            trace.stack.pop()
+        trace.records.append(record)
+
+    def _write(self, trace: _Trace) -> None:
+        if self.trace_dir is None:
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(trace.started_at))
+        path = self.trace_dir / f"{stamp}-{trace.tool}-{trace.trace_id[:8]}.jsonl"
+        try:
+            with path.open("w", encoding="utf-8") as fh:
+                for record in sorted(trace.records, key=lambda r: r.span_id):
+                    fh.write(json.dumps(asdict(record), default=str) + "\n")
+        except OSError as exc:
+            logger.warning("Failed to write trace %s: %s", path, exc)
+            return
+        logger.debug("Wrote %d spans to %s", len(trace.records), path)
+
+
+tracer = Tracer()
@@ -1,62 +1,70 @@
 from __future__ import annotations
 
+import math
 import re
 import time
 from dataclasses import dataclass
 from typing import Any, Callable
 
-import AppKit
-from ApplicationServices import (
-    AXUIElementCreateApplication,
-    AXUIElementCopyAttributeValue,
-    AXUIElementPerformAction,
-    AXUIElementSetAttributeValue,
-    AXValueGetType,
-    AXValueGetValue,
+from .actions import press_element
+from .ax_backend import (
+    get_backend,
     kAXChildrenAttribute,
+    kAXDescriptionAttribute,
     kAXIdentifierAttribute,
     kAXListRole,
+    kAXParentAttribute,
     kAXPositionAttribute,
-    kAXRaiseAction,
     kAXRoleAttribute,
+    kAXScrollToVisibleAction,
     kAXSizeAttribute,
     kAXStaticTextRole,
     kAXTextAreaRole,
     kAXTitleAttribute,
     kAXValueAttribute,
-    kAXValueCGPointType,
-    kAXValueCGSizeType,
     kAXWindowRole,
 )
-from Quartz import (
-    CGEventCreateKeyboardEvent,
-    CGEventCreateMouseEvent,
-    CGEventCreateScrollWheelEvent,
-    CGEventPost,
-    CGEventSetFlags,
-    CGEventSetLocation,
-    CGPoint,
-    kCGEventFlagMaskCommand,
-    kCGEventLeftMouseDown,
-    kCGEventLeftMouseUp,
-    kCGHIDEventTap,
-    kCGScrollEventUnitLine,
-)
-
 from .logging_config import logger
+from .metrics import span, wait
+from .search_hints import search_hints
+from .spatial_index import BandIndex
+from .text_entry import enter_text
 
 
 def ax_get(element, attribute):
-    err, value = AXUIElementCopyAttributeValue(element, attribute, None)
-    if err != 0:
-        return None
-    return value
+    return get_backend().get_attribute(element, attribute)
+
+
+def ax_set(element, attribute, value) -> int:
+    """
+    Set an accessibility attribute, returning the AX error code (0 on
+    success).
+    """
+    return get_backend().set_attribute(element, attribute, value)
+
+
+def ax_perform(element, action) -> int:
+    """
+    Perform an accessibility action, returning the AX error code (0 on
+    success).
+    """
+    return get_backend().perform_action(element, action)
 
 
 def dfs(element, predicate: Callable[[Any, Any, Any, Any], bool]):
+    with span("dfs") as attrs:
+        visited = [0]
+        found = _dfs(element, predicate, visited)
+        attrs["nodes"] = visited[0]
+        attrs["found"] = found is not None
+        return found
+
+
+def _dfs(element, predicate: Callable[[Any, Any, Any, Any], bool], visited):
     if element is None:
         return None
 
+    visited[0] += 1
     role = ax_get(element, kAXRoleAttribute)
     title = ax_get(element, kAXTitleAttribute)
     identifier = ax_get(element, kAXIdentifierAttribute)
@@ -66,36 +74,115 @@ def dfs(element, predicate: Callable[[Any, Any, Any, Any], bool]):
 
     children = ax_get(element, kAXChildrenAttribute) or []
     for child in children:
-        found = dfs(child, predicate)
+        found = _dfs(child, predicate, visited)
         if found is not None:
             return found
     return None
 
 
-def get_wechat_ax_app() -> Any:
+WECHAT_BUNDLE_ID = "com.tencent.xinWeChat"
+
+_wechat_pid: int | None = None
+_ax_app_by_pid: dict[int, Any] = {}
+
+
+def _get_wechat_pid() -> int:
     """
-    Get the AX UI element representing the WeChat application and bring
-    it to the foreground.
+    Return WeChat's PID, re-querying it only when the previously seen
+    instance has terminated.
     """
-    bundle_id = "com.tencent.xinWeChat"
-    apps = AppKit.NSRunningApplication.runningApplicationsWithBundleIdentifier_(
-        bundle_id
-    )
-    if not apps:
+    global _wechat_pid
+    backend = get_backend()
+    if _wechat_pid is not None:
+        if backend.is_app_running(_wechat_pid):
+            return _wechat_pid
+        logger.info(
+            "WeChat (pid=%s) terminated; dropping cached AX handles", _wechat_pid
+        )
+        _ax_app_by_pid.pop(_wechat_pid, None)
+        current_chat_state.invalidate()
+        _wechat_pid = None
+
+    pid = backend.find_app_pid(WECHAT_BUNDLE_ID)
+    if pid is None:
         raise RuntimeError("WeChat is not running")
 
-    app = apps[0]
-    app.activateWithOptions_(AppKit.NSApplicationActivateIgnoringOtherApps)
-    logger.info(
-        "Activated WeChat (bundle_id=%s, pid=%s)", bundle_id, app.processIdentifier()
-    )
-    return AXUIElementCreateApplication(app.processIdentifier())
+    _wechat_pid = pid
+    return pid
+
+
+def get_wechat_ax_app() -> Any:
+    """
+    Get the AX UI element representing the WeChat application.
+
+    The element is cached per PID and reused until WeChat terminates.
+    This does not bring WeChat to the foreground, so read-only
+    operations do not steal focus; callers that synthesize mouse or
+    keyboard input must use activate_wechat() instead.
+    """
+    with span("app_lookup"):
+        pid = _get_wechat_pid()
+        ax_app = _ax_app_by_pid.get(pid)
+        if ax_app is None:
+            ax_app = get_backend().create_app_element(pid)
+            _ax_app_by_pid[pid] = ax_app
+            logger.info("Created AX element for WeChat (pid=%s)", pid)
+        return ax_app
+
+
+def find_wechat_window_id(point: tuple[float, float]) -> int | None:
+    """
+    Return the Quartz window ID of the WeChat window containing the
+    given screen point, whether or not it is covered by other windows.
+    """
+    pid = _get_wechat_pid()
+    with span("window_lookup"):
+        windows = get_backend().list_windows()
+    px, py = point
+    for window in windows:
+        if window["pid"] != pid or window["layer"] != 0:
+            continue
+        x, y, w, h = window["bounds"]
+        if x <= px <= x + w and y <= py <= y + h:
+            return window["id"]
+    return None
+
+
+def activate_wechat() -> Any:
+    """
+    Bring WeChat to the foreground and return its AX application element.
+
+    Required before posting synthetic mouse, keyboard or scroll events,
+    or capturing the screen, since those act on whatever is in front.
+    """
+    pid = _get_wechat_pid()
+    with span("activate"):
+        get_backend().activate_app(pid)
+    logger.info("Activated WeChat (bundle_id=%s, pid=%s)", WECHAT_BUNDLE_ID, pid)
+    return get_wechat_ax_app()
 
 
 def _find_window_by_title(ax_app: Any, title: str):
     """
     Locate a top-level WeChat window with the given title.
+
+    Windows are normally direct children of the application element, so
+    only those are checked; the whole tree is searched only when the
+    application exposes no window children at all.
     """
+    backend = get_backend()
+    windows = 0
+    for child in ax_get(ax_app, kAXChildrenAttribute) or []:
+        role, current_title = backend.get_attributes(
+            child, [kAXRoleAttribute, kAXTitleAttribute]
+        )
+        if role != kAXWindowRole:
+            continue
+        windows += 1
+        if current_title == title:
+            return child
+    if windows:
+        return None
 
     def is_window(el, role, current_title, identifier):
         return (
@@ -112,17 +199,34 @@ def _wait_for_window(ax_app: Any, title: str, timeout: float = 5.0):
     Wait for a window with the given title to appear, returning the AX
     element or None if the timeout expires.
     """
-    end = time.time() + timeout
-    while time.time() < end:
-        window = _find_window_by_title(ax_app, title)
-        if window is not None:
-            logger.info("Found window %r", title)
-            return window
-        time.sleep(0.1)
+    with span("wait_for_window", title=title):
+        end = time.time() + timeout
+        while time.time() < end:
+            window = _find_window_by_title(ax_app, title)
+            if window is not None:
+                logger.info("Found window %r", title)
+                return window
+            time.sleep(0.1)
     logger.warning("Timed out waiting for window %r", title)
     return None
 
 
+def _wait_until(condition: Callable[[], Any], timeout: float, label: str, interval: float = 0.05):
+    """
+    Poll `condition` until it returns a truthy value and return that
+    value, or return None once `timeout` seconds have passed. Used instead
+    of fixed sleeps where the UI state being waited for can be observed.
+    """
+    with span(f"wait_until.{label}") as attrs:
+        end = time.time() + timeout
+        while True:
+            value = condition()
+            if value or time.time() >= end:
+                attrs["ok"] = bool(value)
+                return value or None
+            time.sleep(interval)
+
+
 def _normalize_chat_title(name: str) -> str:
     """
     Normalize a WeChat chat title.
@@ -137,20 +241,33 @@ def _normalize_chat_title(name: str) -> str:
     return name
 
 
-def get_current_chat_name() -> str | None:
+class CurrentChatState:
     """
-    Return the display name of the currently open chat, if available.
+    Process-wide record of the chat that is open in WeChat.
+
+    `name` is updated whenever this process opens a chat and whenever the
+    title is read back. The title element itself is cached so that later
+    checks cost a single attribute read instead of a walk of the whole
+    accessibility tree; the walk is only repeated if the cached element
+    stops answering (e.g. the main window was recreated).
     """
-    ax_app = get_wechat_ax_app()
 
-    def is_chat_title(el, role, title, identifier):
-        return role == kAXStaticTextRole and identifier == "big_title_line_h_view"
+    def __init__(self) -> None:
+        self.name: str | None = None
+        self.title_element: Any = None
+
+    def note_opened(self, chat_name: str) -> None:
+        self.name = chat_name
+
+    def invalidate(self) -> None:
+        self.name = None
+        self.title_element = None
+
+
+current_chat_state = CurrentChatState()
 
-    title_el = dfs(ax_app, is_chat_title)
-    if title_el is None:
-        logger.warning("Could not locate current chat title element via AX")
-        return None
 
+def _read_chat_title(title_el) -> str | None:
     value = ax_get(title_el, kAXValueAttribute)
     if isinstance(value, str) and value.strip():
         return _normalize_chat_title(value)
@@ -162,6 +279,38 @@ def get_current_chat_name() -> str | None:
     return None
 
 
+def get_current_chat_name() -> str | None:
+    """
+    Return the display name of the currently open chat, if available.
+
+    Reads the cached chat title element when one is known, falling back
+    to locating it via a DFS of the WeChat accessibility tree.
+    """
+    title_el = current_chat_state.title_element
+    if title_el is not None:
+        name = _read_chat_title(title_el)
+        if name is not None:
+            current_chat_state.name = name
+            return name
+        logger.debug("Cached chat title element is stale; locating it again")
+        current_chat_state.title_element = None
+
+    ax_app = get_wechat_ax_app()
+
+    def is_chat_title(el, role, title, identifier):
+        return role == kAXStaticTextRole and identifier == "big_title_line_h_view"
+
+    title_el = dfs(ax_app, is_chat_title)
+    if title_el is None:
+        logger.warning("Could not locate current chat title element via AX")
+        current_chat_state.invalidate()
+        return None
+
+    current_chat_state.title_element = title_el
+    current_chat_state.name = _read_chat_title(title_el)
+    return current_chat_state.name
+
+
 def collect_chat_elements(ax_app) -> dict[str, Any]:
     """
     Collect chat elements from the left session list keyed by display name.
@@ -181,58 +330,402 @@ def collect_chat_elements(ax_app) -> dict[str, Any]:
         for child in children:
             walk(child)
 
-    walk(ax_app)
+    with span("collect_chat_elements") as attrs:
+        walk(ax_app)
+        attrs["chats"] = len(results)
     logger.info("Collected %d chat elements from session list", len(results))
     return results
 
 
-def find_chat_element_by_name(ax_app, chat_name: str):
+@dataclass
+class SessionSummary:
     """
-    Find a chat element whose name matches the given chat name exactly
-    (case-sensitive and case-insensitive match are both attempted).
+    What the session list shows for one chat, read without opening it.
     """
-    chat_elements = collect_chat_elements(ax_app)
+
+    name: str
+    unread: int
+    preview: str | None
+    timestamp: str | None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "chat_name": self.name,
+            "unread": self.unread,
+            "preview": self.preview,
+            "timestamp": self.timestamp,
+        }
+
+
+_SESSION_TIME_RE = re.compile(
+    r"^(\d{1,2}:\d{2}|yesterday|昨天|前天|星期[一二三四五六日天]"
+    r"|(mon|tues|wednes|thurs|fri|satur|sun)day"
+    r"|\d{2,4}[/.-]\d{1,2}([/.-]\d{1,2})?|\d{1,2}月\d{1,2}日)$",
+    re.IGNORECASE,
+)
+_SESSION_BADGE_RE = re.compile(r"^(\d{1,3})\+?$")
+# Muted chats show no badge but prefix the preview with "[N条]"/"[N messages]".
+_SESSION_MUTED_UNREAD_RE = re.compile(r"^\[(\d+)(?:条| messages?)?\]\s*", re.IGNORECASE)
+
+_SESSION_ROW_ATTRIBUTES = [
+    kAXValueAttribute,
+    kAXTitleAttribute,
+    kAXDescriptionAttribute,
+    kAXChildrenAttribute,
+    kAXPositionAttribute,
+]
+_SESSION_PART_ATTRIBUTES = [
+    kAXValueAttribute,
+    kAXTitleAttribute,
+    kAXDescriptionAttribute,
+    kAXChildrenAttribute,
+]
+
+
+def parse_session_row(chat_name: str, texts: list[str]) -> SessionSummary:
+    """
+    Classify the texts of one session row into unread badge, timestamp
+    and last-message preview. The chat name itself (with or without a
+    group's member count) is ignored.
+    """
+    unread = 0
+    timestamp = None
+    previews: list[str] = []
+    for raw in texts:
+        for line in raw.splitlines():
+            line = line.strip()
+            if not line or _normalize_chat_title(line) == chat_name:
+                continue
+            badge = _SESSION_BADGE_RE.match(line)
+            if badge and not unread:
+                unread = int(badge.group(1))
+            elif _SESSION_TIME_RE.match(line):
+                timestamp = line
+            else:
+                previews.append(line)
+
+    preview = previews[0] if previews else None
+    if preview is not None:
+        muted = _SESSION_MUTED_UNREAD_RE.match(preview)
+        if muted:
+            unread = unread or int(muted.group(1))
+            preview = preview[muted.end() :] or None
+    return SessionSummary(chat_name, unread, preview, timestamp)
+
+
+def _session_row_texts(values: list[Any], depth: int = 0) -> list[str]:
+    texts = [v for v in values[:3] if isinstance(v, str) and v.strip()]
+    if depth < 2:
+        backend = get_backend()
+        for child in values[3] or []:
+            texts.extend(
+                _session_row_texts(
+                    backend.get_attributes(child, _SESSION_PART_ATTRIBUTES), depth + 1
+                )
+            )
+    return texts
+
+
+def read_session_list(ax_app, session_list: Any = None) -> list[SessionSummary]:
+    """
+    Summarize every `session_item_*` row currently exposed in the left
+    session list, top to bottom, without opening any chat or activating
+    WeChat. Each element's attributes are fetched with one batched read.
+
+    Pass `session_list` (from find_session_list()) to walk only that
+    list instead of the whole window tree.
+    """
+    backend = get_backend()
+    rows: list[tuple[float, SessionSummary]] = []
+
+    def walk(element):
+        role, identifier, children = backend.get_attributes(
+            element, [kAXRoleAttribute, kAXIdentifierAttribute, kAXChildrenAttribute]
+        )
+        if (
+            role == kAXStaticTextRole
+            and isinstance(identifier, str)
+            and identifier.startswith("session_item_")
+        ):
+            chat_name = identifier[len("session_item_") :]
+            if chat_name:
+                values = backend.get_attributes(element, _SESSION_ROW_ATTRIBUTES)
+                point = axvalue_to_point(values[4])
+                summary = parse_session_row(chat_name, _session_row_texts(values))
+                rows.append((point[1] if point else float("inf"), summary))
+            return
+        for child in children or []:
+            walk(child)
+
+    with span("read_session_list") as attrs:
+        walk(session_list if session_list is not None else ax_app)
+        attrs["rows"] = len(rows)
+    rows.sort(key=lambda item: item[0])
+    return [summary for _, summary in rows]
+
+
+def _match_chat_element(chat_elements: dict[str, Any], chat_name: str):
     if chat_name in chat_elements:
         return chat_elements[chat_name]
-
     lowered = {name.lower(): el for name, el in chat_elements.items()}
-    match = lowered.get(chat_name.lower())
-    if match is not None:
-        return match
+    return lowered.get(chat_name.lower())
+
+
+def find_chat_element_by_name(
+    ax_app, chat_name: str, snapshot: dict[str, Any] | None = None
+):
+    """
+    Find a chat element whose name matches the given chat name exactly
+    (case-sensitive and case-insensitive match are both attempted).
+
+    `snapshot` is an earlier collect_chat_elements() result. A chat
+    missing from it is reported as not found without walking the list
+    again; a row found in it is used if it still identifies as that chat
+    (rows are reused when the list changes), otherwise the session list
+    is walked again.
+    """
+    if snapshot is not None:
+        element = _match_chat_element(snapshot, chat_name)
+        if element is None:
+            return None
+        identifier = ax_get(element, kAXIdentifierAttribute)
+        if isinstance(identifier, str) and (
+            identifier[len("session_item_") :].lower() == chat_name.lower()
+        ):
+            return element
+        logger.info("Session row for %s moved since the snapshot", chat_name)
+
+    return _match_chat_element(collect_chat_elements(ax_app), chat_name)
+
+
+# Search results rows reporting a section's size, e.g. "View All(42)".
+_VIEW_ALL_RE = re.compile(r"View All\s*\((\d+)\)")
+
+# Lines scrolled by the first, measuring step of a search-results scan.
+SEARCH_PROBE_LINES = 3
+
+# Upper bound on search-results scroll steps, whatever "View All(N)" says.
+MAX_SEARCH_SCROLL_STEPS = 400
+
+# Pages of the session list scrolled through looking for a chat before
+# falling back to global search.
+SESSION_SCROLL_PAGES = 6
+
+# Lines scrolled by the first, measuring step of a session-list scroll.
+SESSION_PROBE_LINES = 3
+
+# Seconds to wait for search results after entering a query before the
+# next text-entry path is tried.
+SEARCH_START_TIMEOUT = 1.0
+
+
+def _element_frame(element) -> tuple[float, float, float, float] | None:
+    point = axvalue_to_point(ax_get(element, kAXPositionAttribute))
+    size = axvalue_to_size(ax_get(element, kAXSizeAttribute))
+    if point is None or size is None:
+        return None
+    return point[0], point[1], size[0], size[1]
+
+
+def find_session_list(ax_app, row: Any = None):
+    """
+    The list containing the session rows: the nearest AXList ancestor of
+    `row`, or of the first session row found in the tree.
+    """
+    if row is None:
+        row = dfs(
+            ax_app,
+            lambda el, role, title, identifier: isinstance(identifier, str)
+            and identifier.startswith("session_item_"),
+        )
+    element = row
+    for _ in range(4):
+        if element is None:
+            return None
+        element = ax_get(element, kAXParentAttribute)
+        if ax_get(element, kAXRoleAttribute) == kAXListRole:
+            return element
     return None
 
 
-def send_key_with_modifiers(keycode: int, flags: int):
-    event_down = CGEventCreateKeyboardEvent(None, keycode, True)
-    CGEventSetFlags(event_down, flags)
-    event_up = CGEventCreateKeyboardEvent(None, keycode, False)
-    CGEventSetFlags(event_up, flags)
-    CGEventPost(kCGHIDEventTap, event_down)
-    CGEventPost(kCGHIDEventTap, event_up)
+def _row_in_view(row, list_frame: tuple[float, float, float, float]) -> bool:
+    frame = _element_frame(row)
+    if frame is None:
+        return False
+    _, top, _, height = list_frame
+    center_y = frame[1] + frame[3] / 2.0
+    return top <= center_y <= top + height
 
 
-def click_element_center(element) -> None:
+def _rows_in_view(session_list, list_frame) -> dict[str, tuple[Any, float]]:
     """
-    Synthesize a left mouse click at the visual center of the element.
+    Session rows whose center lies inside the list, by chat name, with
+    their top y. One batched attribute read per element.
     """
-    pos_ref = ax_get(element, kAXPositionAttribute)
-    size_ref = ax_get(element, kAXSizeAttribute)
-    point = axvalue_to_point(pos_ref)
-    size = axvalue_to_size(size_ref)
-    if point is None or size is None:
-        raise RuntimeError("Failed to get bounds for element to click")
+    backend = get_backend()
+    _, top, _, height = list_frame
+    rows: dict[str, tuple[Any, float]] = {}
 
-    x, y = point
-    w, h = size
-    cx = x + w / 2.0
-    cy = y + h / 2.0
+    def walk(element):
+        identifier, children, position, size = backend.get_attributes(
+            element,
+            [kAXIdentifierAttribute, kAXChildrenAttribute, kAXPositionAttribute, kAXSizeAttribute],
+        )
+        if isinstance(identifier, str) and identifier.startswith("session_item_"):
+            point, extent = axvalue_to_point(position), axvalue_to_size(size)
+            if point is not None and extent is not None:
+                if top <= point[1] + extent[1] / 2.0 <= top + height:
+                    rows[identifier[len("session_item_") :]] = (element, point[1])
+            return
+        for child in children or []:
+            walk(child)
 
-    event_down = CGEventCreateMouseEvent(
-        None, kCGEventLeftMouseDown, CGPoint(cx, cy), 0
-    )
-    event_up = CGEventCreateMouseEvent(None, kCGEventLeftMouseUp, CGPoint(cx, cy), 0)
-    CGEventPost(kCGHIDEventTap, event_down)
-    CGEventPost(kCGHIDEventTap, event_up)
+    for child in ax_get(session_list, kAXChildrenAttribute) or []:
+        walk(child)
+    return rows
+
+
+def _scroll_session_list_to_top(session_list, list_frame, center) -> dict[str, tuple[Any, float]]:
+    """
+    Scroll the sidebar back to its top, where recently active chats are,
+    and return the rows then in view.
+    """
+    rows = _rows_in_view(session_list, list_frame)
+    for _ in range(SESSION_SCROLL_PAGES):
+        post_scroll(center, 1000)
+        wait(0.05, "session_scroll_settle")
+        previous, rows = rows, _rows_in_view(session_list, list_frame)
+        if all(
+            name in rows and rows[name][1] == y0 for name, (_, y0) in previous.items()
+        ):
+            break
+    return rows
+
+
+def scroll_session_list_to_top(ax_app) -> None:
+    """
+    Undo a reveal_session_row() scroll once its row has been used, so
+    readers of the visible session list (list_unread_chats, the watcher)
+    see the most recently active chats again. Requires WeChat to be
+    frontmost.
+    """
+    session_list = find_session_list(ax_app)
+    list_frame = _element_frame(session_list) if session_list is not None else None
+    if list_frame is None:
+        return
+    with span("session_list_to_top"):
+        _scroll_session_list_to_top(session_list, list_frame, get_list_center(session_list))
+
+
+def reveal_session_row(ax_app, chat_name: str, element: Any = None) -> tuple[Any, bool]:
+    """
+    Return (row, scrolled): the session-list row for `chat_name` once it is
+    scrolled into view, or None if it is not in the session list, and
+    whether the sidebar was scrolled to show it.
+
+    A row that is in the tree but out of view (`element`) is first asked
+    to AXScrollToVisible. Otherwise the sidebar is scrolled from the top
+    a page at a time, for at most SESSION_SCROLL_PAGES pages: a short
+    first step measures how many pixels one scroll line moves the rows,
+    so the following steps advance by about a page without skipping rows.
+    If the row is not found the sidebar is left at its top again; after a
+    scrolled reveal, callers call scroll_session_list_to_top() once they
+    have pressed the row. Requires WeChat to be frontmost.
+    """
+    session_list = find_session_list(ax_app, element)
+    list_frame = _element_frame(session_list) if session_list is not None else None
+    if list_frame is None:
+        return None, False
+    if element is not None and _row_in_view(element, list_frame):
+        return element, False
+
+    with span("reveal_session_row") as attrs:
+        if element is not None:
+            if get_backend().perform_action(element, kAXScrollToVisibleAction) == 0:
+                wait(0.05, "session_scroll_settle")
+                if _row_in_view(element, list_frame):
+                    attrs["method"] = "scroll_to_visible"
+                    return element, True
+
+        attrs["method"] = "measured_scroll"
+        lowered = chat_name.lower()
+        center = get_list_center(session_list)
+        rows = _scroll_session_list_to_top(session_list, list_frame, center)
+
+        lines = SESSION_PROBE_LINES
+        pages = 0
+        while True:
+            for name, (row, _) in rows.items():
+                if name == chat_name or name.lower() == lowered:
+                    attrs["pages"] = pages
+                    return row, pages > 0
+            if pages >= SESSION_SCROLL_PAGES:
+                break
+
+            post_scroll(center, -lines)
+            wait(0.05, "session_scroll_settle")
+            pages += 1
+            previous, rows = rows, _rows_in_view(session_list, list_frame)
+            shifts = [y0 - rows[name][1] for name, (_, y0) in previous.items() if name in rows]
+            if rows.keys() == previous.keys() and not any(shifts):
+                break  # end of the list
+            if shifts and max(shifts) > 0:
+                pixels_per_line = max(shifts) / lines
+                lines = max(1, int(list_frame[3] * 0.8 / pixels_per_line))
+        attrs["pages"] = pages
+        if pages:
+            _scroll_session_list_to_top(session_list, list_frame, center)
+        return None, False
+
+
+def plan_chat_order(
+    ax_app, chat_names: list[str], snapshot: dict[str, Any] | None = None
+) -> list[tuple[str, str]]:
+    """
+    Order chats for a multi-chat operation so as few global searches and
+    list reshuffles as possible are needed.
+
+    The currently open chat comes first, then chats visible in the left
+    session list from top to bottom, then the rest (opened via global
+    search) in the order given. Visiting visible rows top to bottom keeps
+    the remaining rows in place even though WeChat moves a chat to the
+    top once a message is sent to it.
+
+    Returns (chat_name, route) pairs with route "current",
+    "session_list" or "search". Duplicate names are dropped. Pass a
+    collect_chat_elements() `snapshot` to plan against it instead of
+    walking the session list again.
+    """
+    with span("plan_chat_order", chats=len(chat_names)) as attrs:
+        elements = snapshot if snapshot is not None else collect_chat_elements(ax_app)
+        lowered = {name.lower(): el for name, el in elements.items()}
+        current = current_chat_state.name
+
+        first: list[tuple[str, str]] = []
+        visible: list[tuple[float, int, str]] = []
+        rest: list[tuple[str, str]] = []
+        for index, name in enumerate(dict.fromkeys(chat_names)):
+            if name == current:
+                first.append((name, "current"))
+                continue
+            element = elements.get(name) or lowered.get(name.lower())
+            point = (
+                axvalue_to_point(ax_get(element, kAXPositionAttribute))
+                if element is not None
+                else None
+            )
+            if point is None:
+                rest.append((name, "search"))
+            else:
+                visible.append((point[1], index, name))
+
+        visible.sort()
+        attrs["visible"] = len(visible)
+        return first + [(name, "session_list") for _, _, name in visible] + rest
+
+
+def send_key_with_modifiers(keycode: int, flags: int):
+    get_backend().post_key(keycode, flags)
 
 
 def long_press_element_center(element, hold_seconds: float = 2.2) -> None:
@@ -252,17 +745,12 @@ def long_press_element_center(element, hold_seconds: float = 2.2) -> None:
     cx = x + w / 2.0
     cy = y + h / 2.0
 
-    event_down = CGEventCreateMouseEvent(
-        None, kCGEventLeftMouseDown, CGPoint(cx, cy), 0
-    )
-    CGEventPost(kCGHIDEventTap, event_down)
+    backend = get_backend()
+    backend.post_mouse(cx, cy, down=True)
     try:
-        time.sleep(max(0.0, hold_seconds))
+        wait(max(0.0, hold_seconds), "long_press_hold")
     finally:
-        event_up = CGEventCreateMouseEvent(
-            None, kCGEventLeftMouseUp, CGPoint(cx, cy), 0
-        )
-        CGEventPost(kCGHIDEventTap, event_up)
+        backend.post_mouse(cx, cy, down=False)
 
 
 def find_search_field(ax_app):
@@ -277,39 +765,55 @@ def find_search_field(ax_app):
     return search
 
 
-def focus_and_type_search(ax_app, text: str):
+def search_started(ax_app, text: str) -> bool:
     """
-    Focus the WeChat sidebar search field and type the given text using
-    Command+A and Command+V
+    Whether the search results list shows a row mentioning `text`, waiting
+    up to SEARCH_START_TIMEOUT seconds. WeChat only searches for typed
+    input: a value set through AX reads back but leaves the session list
+    (or the previous query's results) on screen.
     """
-    search = find_search_field(ax_app)
+    query = text.strip().lower()
 
-    AXUIElementPerformAction(search, kAXRaiseAction)
+    def shown() -> bool:
+        try:
+            search_list = get_search_list(ax_app)
+        except RuntimeError:
+            return False
+        return any(query in entry.text.lower() for entry in _collect_search_entries(search_list))
 
-    # Clear any existing value via AX (best effort).
-    err = AXUIElementSetAttributeValue(search, kAXValueAttribute, "")
-    if err != 0:
-        logger.debug("Failed to clear search field via AX (err=%s)", err)
+    return bool(_wait_until(shown, SEARCH_START_TIMEOUT, "search_started"))
 
-    pb = AppKit.NSPasteboard.generalPasteboard()
-    pb.clearContents()
-    pb.setString_forType_(text, AppKit.NSPasteboardTypeString)
 
-    time.sleep(0.1)
+def type_search(ax_app, search: Any, text: str) -> None:
+    """
+    Replace the search field's contents with `text` through the shared
+    text-entry service, counting an entry path as working only once the
+    search has started (see search_started).
+    """
+    with span("search_enter_text"):
+        enter_text(
+            search, text, key="search_field", accept=lambda: search_started(ax_app, text)
+        )
 
-    keycode_a = 0  # US keyboard 'A'
-    keycode_v = 9  # US keyboard 'V'
-    send_key_with_modifiers(keycode_a, kCGEventFlagMaskCommand)
-    time.sleep(0.05)
-    send_key_with_modifiers(keycode_v, kCGEventFlagMaskCommand)
 
+def focus_and_type_search(ax_app, text: str):
+    """
+    Focus the WeChat sidebar search field and replace its contents with
+    the given text via the shared text-entry service, which leaves the
+    user's clipboard as it was.
+    """
+    type_search(ax_app, find_search_field(ax_app), text)
 
-def open_chat_for_contact(chat_name: str) -> dict[str, Any] | None:
+
+def open_chat_for_contact(
+    chat_name: str, ax_app: Any = None, snapshot: dict[str, Any] | None = None
+) -> dict[str, Any] | None:
     """
     Open a chat for a given name (contact or group).
 
-    First, search in the left sidebar session list. If found, click it.
-    If not, type the name into the global search field and inspect the
+    First, search in the left sidebar session list, scrolling the row into
+    view if it is out of sight (see reveal_session_row). If found, click
+    it. If not, type the name into the global search field and inspect the
     search results:
     - Prefer an exact match under the "Contacts" section.
     - Otherwise, prefer an exact match under the "Group Chats" section.
@@ -330,26 +834,35 @@ def open_chat_for_contact(chat_name: str) -> dict[str, Any] | None:
     }
 
     Callers can use this to ask the LLM to choose a more specific target.
+
+    Multi-chat callers can pass the `ax_app` returned by an earlier
+    activate_wechat() and a collect_chat_elements() `snapshot` to skip
+    re-activating WeChat and re-walking the session list for every chat.
     """
     logger.info("Opening chat for name: %s", chat_name)
-    ax_app = get_wechat_ax_app()
+    if ax_app is None:
+        ax_app = activate_wechat()
 
-    element = find_chat_element_by_name(ax_app, chat_name)
+    element, scrolled = reveal_session_row(
+        ax_app, chat_name, find_chat_element_by_name(ax_app, chat_name, snapshot)
+    )
     if element is not None:
-        logger.info("Found chat in session list, clicking center")
-        click_element_center(element)
-        time.sleep(0.3)
+        logger.info("Found chat in session list, pressing it")
+        press_element(element, settle=0.3, label="after_chat_click")
+        current_chat_state.note_opened(chat_name)
+        if scrolled:
+            scroll_session_list_to_top(ax_app)
         return
 
     logger.info("Chat not in session list, using global search")
     focus_and_type_search(ax_app, chat_name)
-    time.sleep(0.4)
+    wait(0.4, "search_results")
 
     try:
         found, candidates = _select_contact_from_search_results(ax_app, chat_name)
         if found:
             logger.info("Opened chat for %s via search results", chat_name)
-            time.sleep(0.4)
+            current_chat_state.note_opened(chat_name)
             return None
 
         logger.info(
@@ -437,17 +950,40 @@ def _collect_search_entries(search_list) -> list[SearchEntry]:
         for child in children:
             walk(child)
 
-    walk(search_list)
-    entries.sort(key=lambda e: e.y)
+    with span("collect_search_entries") as attrs:
+        walk(search_list)
+        entries.sort(key=lambda e: e.y)
+        attrs["entries"] = len(entries)
     return entries
 
 
-def _build_section_headers(entries: list[SearchEntry]) -> dict[str, float]:
+class SectionHeaders(dict):
+    """
+    Y coordinate of each section header, by title, with a band index
+    built on first use so entries are classified by binary search.
+    """
+
+    _bands: BandIndex | None = None
+
+    def section_at(self, y: float) -> str | None:
+        if self._bands is None:
+            self._bands = BandIndex(self)
+        return self._bands.label_at(y)
+
+
+def _build_section_headers(
+    entries: list[SearchEntry], section_above: str | None = None
+) -> SectionHeaders:
     """
     Map known section titles ("Contacts", "Group Chats", "Chat History", "Official Accounts", "Internet search results", "More")
     to their vertical Y coordinate within the search list.
+
+    `section_above` is the section that continues from above the visible
+    rows when its header has been scrolled out of view.
     """
-    headers: dict[str, float] = {}
+    headers = SectionHeaders()
+    if section_above is not None and entries:
+        headers[section_above] = entries[0].y - 1.0
     for entry in entries:
         if entry.text in (
             "Contacts",
@@ -461,21 +997,17 @@ def _build_section_headers(entries: list[SearchEntry]) -> dict[str, float]:
     return headers
 
 
-def _classify_section(entry: SearchEntry, headers: dict[str, float]) -> str | None:
+def _classify_section(entry: SearchEntry, headers: SectionHeaders) -> str | None:
     """
     Given an entry and the Y positions of section headers, determine which
     section this entry belongs to by picking the last header above it.
     """
-    section: str | None = None
-    best_y = float("-inf")
-    for title, header_y in headers.items():
-        if header_y <= entry.y and header_y > best_y:
-            section = title
-            best_y = header_y
-    return section
+    return headers.section_at(entry.y)
 
 
-def _find_exact_match_in_entries(entries: list[SearchEntry], contact_name: str):
+def _find_exact_match_in_entries(
+    entries: list[SearchEntry], contact_name: str, section_above: str | None = None
+):
     """
     Look for an exact match in the current snapshot of search results.
 
@@ -486,7 +1018,7 @@ def _find_exact_match_in_entries(entries: list[SearchEntry], contact_name: str):
     Entries classified as "Chat History", "Official Accounts", "Internet search results", or "More" are ignored.
     """
     target = contact_name.strip()
-    headers = _build_section_headers(entries)
+    headers = _build_section_headers(entries, section_above)
 
     contact_element = None
     group_element = None
@@ -508,7 +1040,7 @@ def _find_exact_match_in_entries(entries: list[SearchEntry], contact_name: str):
 
 
 def _summarize_search_candidates(
-    entries: list[SearchEntry],
+    entries: list[SearchEntry], section_above: str | None = None
 ) -> dict[str, list[str]]:
     """
     Summarize candidate names from search entries, grouped by section.
@@ -519,7 +1051,7 @@ def _summarize_search_candidates(
 
     Entries belonging to "Chat History", "Official Accounts", "Internet search results", or "More" are ignored.
     """
-    headers = _build_section_headers(entries)
+    headers = _build_section_headers(entries, section_above)
     contacts: list[str] = []
     group_chats: list[str] = []
 
@@ -549,15 +1081,18 @@ def _summarize_search_candidates(
     }
 
 
-def _expand_section_if_needed(search_list, section_title: str) -> None:
+def _expand_section_if_needed(search_list, section_title: str) -> int | None:
     """
     If a "View All(...)" row exists for the given section title
     ("Contacts" or "Group Chats"), click its center to expand that section.
+
+    Returns the number of results the row reports ("View All(N)"), or
+    None if the section has no such row.
     """
     entries = _collect_search_entries(search_list)
     headers = _build_section_headers(entries)
     if section_title not in headers:
-        return
+        return None
 
     for entry in entries:
         if not entry.text.startswith("View All"):
@@ -565,9 +1100,25 @@ def _expand_section_if_needed(search_list, section_title: str) -> None:
         section = _classify_section(entry, headers)
         if section == section_title:
             logger.info("Expanding %s section via %r", section_title, entry.text)
-            click_element_center(entry.element)
-            time.sleep(0.3)
-            return
+            press_element(entry.element, settle=0.3, label="after_view_all")
+            match = _VIEW_ALL_RE.search(entry.text)
+            return int(match.group(1)) if match else None
+    return None
+
+
+def _typical_row_height(entries: list[SearchEntry]) -> float:
+    gaps = sorted(b.y - a.y for a, b in zip(entries, entries[1:]) if b.y > a.y)
+    return gaps[len(gaps) // 2] if gaps else 40.0
+
+
+def _scroll_shift(before: list[SearchEntry], after: list[SearchEntry]) -> float | None:
+    """
+    How far the rows moved up between two snapshots, measured on rows
+    present in both (matched by text); None if no row is in both.
+    """
+    positions = {entry.text: entry.y for entry in before}
+    shifts = sorted(positions[e.text] - e.y for e in after if e.text in positions)
+    return shifts[len(shifts) // 2] if shifts else None
 
 
 def _select_contact_from_search_results(
@@ -577,101 +1128,154 @@ def _select_contact_from_search_results(
     Try to open a chat by selecting an exact match from the global
     search results list, preferring Contacts over Group Chats and
     ignoring the Chat History, Official Accounts, "Internet search results", and More sections.
+
+    The compact popover is checked first, since WeChat ranks close matches
+    at the top. Otherwise Contacts and Group Chats are expanded and the
+    list is scrolled in page-sized steps: a short first step measures how
+    far one scroll line moves the rows, so no row is skipped. The number
+    of steps is bounded by the result counts in the "View All(N)" rows.
+    If an earlier search for the same query found the match further down,
+    the scan jumps to about a page above that row (see SearchHints) and
+    only rescans from the top if the match is not there.
     """
     search_list = get_search_list(ax_app)
 
     aggregated_contacts: set[str] = set()
     aggregated_groups: set[str] = set()
 
-    def update_candidates(entries: list[SearchEntry]) -> None:
-        partial = _summarize_search_candidates(entries)
+    def update_candidates(
+        entries: list[SearchEntry], section_above: str | None = None
+    ) -> None:
+        partial = _summarize_search_candidates(entries, section_above)
         aggregated_contacts.update(partial["contacts"])
         aggregated_groups.update(partial["group_chats"])
 
+    def candidates() -> dict[str, list[str]]:
+        return {
+            "contacts": list(aggregated_contacts)[:15],
+            "group_chats": list(aggregated_groups)[:15],
+        }
+
     # First, inspect the initial compact search popover without scrolling.
     entries = _collect_search_entries(search_list)
     update_candidates(entries)
     element = _find_exact_match_in_entries(entries, contact_name)
     if element is not None:
         logger.info("Found exact match for %s in initial search results", contact_name)
-        click_element_center(element)
-        return True, {
-            "contacts": list(aggregated_contacts)[:15],
-            "group_chats": list(aggregated_groups)[:15],
-        }
+        press_element(element, settle=0.4, label="after_search_select")
+        return True, candidates()
 
     # No exact match visible yet; expand Contacts and Group Chats if possible.
-    _expand_section_if_needed(search_list, "Contacts")
-    _expand_section_if_needed(search_list, "Group Chats")
+    counts = [
+        count
+        for count in (
+            _expand_section_if_needed(search_list, "Contacts"),
+            _expand_section_if_needed(search_list, "Group Chats"),
+        )
+        if count
+    ]
+    total = sum(counts) if counts else None
 
     center = get_list_center(search_list)
-    last_bottom_text = None
-    stable = 0
-
-    # Scroll through the expanded search list, looking for an
-    # exact match under Contacts/Group Chats, while aggregating
-    # candidate names from Contacts and Group Chats.
-    for _ in range(80):
-        entries = _collect_search_entries(search_list)
-        update_candidates(entries)
+    list_top, height = _element_frame(search_list)[1], _element_frame(search_list)[3]
+    entries = _collect_search_entries(search_list)
+    row_height = _typical_row_height(entries)
+    budget = min(
+        MAX_SEARCH_SCROLL_STEPS,
+        math.ceil(((total or 0) + len(entries)) * row_height / (0.8 * height)) + 3,
+    )
 
-        element = _find_exact_match_in_entries(entries, contact_name)
-        if element is not None:
-            logger.info(
-                "Found exact match for %s while scrolling search results",
-                contact_name,
-            )
-            click_element_center(element)
-            return True, {
-                "contacts": list(aggregated_contacts)[:15],
-                "group_chats": list(aggregated_groups)[:15],
-            }
-
-        children = ax_get(search_list, kAXChildrenAttribute) or []
-        texts: list[str] = []
-        for child in children:
-            txt = ax_get(child, kAXValueAttribute) or ax_get(child, kAXTitleAttribute)
-            if isinstance(txt, str) and txt.strip():
-                texts.append(txt)
+    hint = search_hints.get(contact_name)
+    target_y = hint["rank"] * row_height if hint is not None else None
+    jumped = False
 
-        if not texts:
-            break
+    pixels_per_line: float | None = None
+    lines = SEARCH_PROBE_LINES
+    scrolled = 0.0
+    steps = 0
+    # Section whose header was last seen, for rows whose header has
+    # scrolled out of view.
+    section: str | None = None
+    with span("search_scan", budget=budget, hint=target_y is not None) as attrs:
+        while True:
+            update_candidates(entries, section)
+            # Only rows in view can be clicked; the list may expose one
+            # more row below its bottom edge.
+            in_view = [
+                e for e in entries if e.y + row_height / 2.0 <= list_top + height
+            ]
+            element = _find_exact_match_in_entries(in_view, contact_name, section)
+            headers = _build_section_headers(entries)
+            if headers:
+                section = max(headers, key=headers.__getitem__)
+            if element is not None:
+                found_y = next(e.y for e in entries if e.element is element)
+                rank = int(round((scrolled + found_y - list_top) / row_height))
+                logger.info(
+                    "Found exact match for %s while scrolling search results "
+                    "(row %d, %d steps)",
+                    contact_name,
+                    rank,
+                    steps,
+                )
+                search_hints.record(contact_name, rank, total)
+                attrs["steps"] = steps
+                press_element(element, settle=0.4, label="after_search_select")
+                return True, candidates()
 
-        new_last = texts[-1]
-        if new_last == last_bottom_text:
-            stable += 1
-            if stable >= 3:
+            if steps >= budget:
                 break
-        else:
-            last_bottom_text = new_last
-            stable = 0
 
-        # Negative delta scrolls downwards through the search results list.
-        post_scroll(center, -80)
-        time.sleep(0.1)
-
-    return False, {
-        "contacts": list(aggregated_contacts)[:15],
-        "group_chats": list(aggregated_groups)[:15],
-    }
+            delta = lines
+            if pixels_per_line is not None and target_y is not None and not jumped:
+                # Jump to about a page above the remembered row.
+                jumped = True
+                delta = max(lines, int((target_y - scrolled - height) / pixels_per_line))
+
+            # Negative delta scrolls downwards through the search results list.
+            with span("search_scroll_step", step=steps, delta=-delta):
+                post_scroll(center, -delta)
+                wait(0.1, "search_scroll_settle")
+                previous, entries = entries, _collect_search_entries(search_list)
+            steps += 1
+
+            shift = _scroll_shift(previous, entries)
+            if shift is None:
+                # A jump past everything on screen.
+                shift = delta * pixels_per_line if pixels_per_line else 0.0
+            if shift <= 0:
+                if jumped and target_y is not None and scrolled > 0:
+                    # The remembered row is gone; scan again from the top.
+                    logger.info("Search hint for %s is stale; rescanning", contact_name)
+                    search_hints.forget(contact_name)
+                    target_y = None
+                    post_scroll(center, int(scrolled / (pixels_per_line or 1.0)) + 10)
+                    wait(0.1, "search_scroll_settle")
+                    entries, scrolled, section = _collect_search_entries(search_list), 0.0, None
+                    continue
+                break  # end of the list
+            scrolled += shift
+            if pixels_per_line is None:
+                pixels_per_line = shift / delta
+                lines = max(1, int(0.8 * height / pixels_per_line))
+
+        attrs["steps"] = steps
+
+    if target_y is not None:
+        search_hints.forget(contact_name)
+    return False, candidates()
 
 
 def axvalue_to_point(ax_value):
-    if ax_value is None or AXValueGetType(ax_value) != kAXValueCGPointType:
-        return None
-    ok, cg_point = AXValueGetValue(ax_value, kAXValueCGPointType, None)
-    if not ok:
+    if ax_value is None:
         return None
-    return float(cg_point.x), float(cg_point.y)
+    return get_backend().point_value(ax_value)
 
 
 def axvalue_to_size(ax_value):
-    if ax_value is None or AXValueGetType(ax_value) != kAXValueCGSizeType:
-        return None
-    ok, cg_size = AXValueGetValue(ax_value, kAXValueCGSizeType, None)
-    if not ok:
+    if ax_value is None:
         return None
-    return float(cg_size.width), float(cg_size.height)
+    return get_backend().size_value(ax_value)
 
 
 def get_list_center(msg_list):
@@ -700,6 +1304,5 @@ def post_scroll(center, delta_lines: int) -> None:
     - Negative delta_lines scrolls towards newer content (downwards in history).
     """
     cx, cy = center
-    event = CGEventCreateScrollWheelEvent(None, kCGScrollEventUnitLine, 1, delta_lines)
-    CGEventSetLocation(event, CGPoint(cx, cy))
-    CGEventPost(kCGHIDEventTap, event)
+    with span("scroll", delta_lines=delta_lines):
+        get_backend().post_scroll(cx, cy, delta_lines)
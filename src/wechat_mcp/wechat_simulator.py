@@ -0,0 +1,1147 @@
+from __future__ import annotations
+
+import bisect
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from PIL import Image, ImageDraw
+
+from .ax_backend import (
+    AXBackend,
+    AXPoint,
+    AXSize,
+    kAXButtonRole,
+    kAXCheckBoxRole,
+    kAXChildrenAttribute,
+    kAXCloseButtonAttribute,
+    kAXIdentifierAttribute,
+    kAXListRole,
+    kAXNumberOfCharactersAttribute,
+    kAXParentAttribute,
+    kAXPositionAttribute,
+    kAXPressAction,
+    kAXRaiseAction,
+    kAXScrollToVisibleAction,
+    kAXRoleAttribute,
+    kAXScrollAreaRole,
+    kAXSelectedTextAttribute,
+    kAXSheetRole,
+    kAXSizeAttribute,
+    kAXStaticTextRole,
+    kAXTextAreaRole,
+    kAXTextFieldRole,
+    kAXTitleAttribute,
+    kAXValueAttribute,
+    kAXVerticalScrollBarAttribute,
+    kAXWindowRole,
+    kCGEventFlagMaskCommand,
+)
+from .logging_config import logger
+
+kAXApplicationRole = "AXApplication"
+kAXScrollBarRole = "AXScrollBar"
+
+# AXError codes returned for unsupported writes and actions.
+kAXErrorAttributeUnsupported = -25205
+kAXErrorActionUnsupported = -25206
+
+KEYCODE_A = 0
+KEYCODE_V = 9
+KEYCODE_RETURN = 36
+
+# Pixels moved per scroll-wheel line.
+SCROLL_PIXELS_PER_LINE = 10.0
+# Minimum hold time for a mouse press to count as a long press.
+LONG_PRESS_SECONDS = 1.0
+
+# Frames are (x, y, width, height) in screen coordinates.
+MAIN_WINDOW_FRAME = (0.0, 0.0, 1000.0, 700.0)
+MOMENTS_BUTTON_FRAME = (10.0, 200.0, 40.0, 40.0)
+SEARCH_FIELD_FRAME = (70.0, 30.0, 230.0, 28.0)
+SIDEBAR_FRAME = (60.0, 70.0, 250.0, 630.0)
+TITLE_FRAME = (320.0, 20.0, 400.0, 30.0)
+MESSAGES_FRAME = (320.0, 60.0, 680.0, 520.0)
+INPUT_FRAME = (320.0, 590.0, 680.0, 100.0)
+
+SESSION_ROW_HEIGHT = 64.0
+SEARCH_ROW_HEIGHT = 40.0
+# Results shown per section before a "View All(N)" row.
+SEARCH_COMPACT_LIMIT = 3
+
+BACKGROUND_COLOR = (17, 17, 17)
+OTHER_BUBBLE_COLOR = (44, 44, 44)
+ME_BUBBLE_COLOR = (38, 160, 80)
+AVATAR_COLOR = (120, 120, 200)
+FOREIGN_APP_COLOR = (236, 236, 236)
+
+Frame = tuple[float, float, float, float]
+
+
+def _contains(frame: Frame, x: float, y: float) -> bool:
+    fx, fy, fw, fh = frame
+    return fx <= x < fx + fw and fy <= y < fy + fh
+
+
+class SimElement:
+    """
+    One node of the simulated accessibility tree.
+
+    `value`, `frame` and `children` may be callables so that virtualised
+    lists can compute their visible rows from model state on every read.
+    """
+
+    def __init__(
+        self,
+        role: str,
+        title: str | None = None,
+        identifier: str | None = None,
+        value: Any = None,
+        frame: Frame | Callable[[], Frame] = (0.0, 0.0, 0.0, 0.0),
+        children: list[SimElement] | Callable[[], list[SimElement]] | None = None,
+        parent: SimElement | None = None,
+        on_click: Callable[[], None] | None = None,
+        on_long_press: Callable[[], None] | None = None,
+        on_set_value: Callable[[Any], None] | None = None,
+        settable: bool = False,
+    ) -> None:
+        self.role = role
+        self.title = title
+        self.identifier = identifier
+        self._value = value
+        self._frame = frame
+        self._children = children if children is not None else []
+        self.parent = parent
+        self.on_click = on_click
+        self.on_long_press = on_long_press
+        self.on_set_value = on_set_value
+        self.settable = settable or on_set_value is not None
+        self.scroll_bar: SimElement | None = None
+        self.close_button: SimElement | None = None
+        self.window_id: int | None = None
+        self.select_all = False
+
+    def __repr__(self) -> str:
+        label = self.identifier or self.title or ""
+        return f"SimElement({self.role}, {label!r})"
+
+    @property
+    def value(self) -> Any:
+        return self._value() if callable(self._value) else self._value
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        if self.on_set_value is not None:
+            self.on_set_value(value)
+        else:
+            self._value = value
+
+    def frame(self) -> Frame:
+        return self._frame() if callable(self._frame) else self._frame
+
+    def children(self) -> list[SimElement]:
+        children = self._children() if callable(self._children) else self._children
+        for child in children:
+            if child.parent is None:
+                child.parent = self
+        return children
+
+    def add(self, child: SimElement) -> SimElement:
+        child.parent = self
+        self._children.append(child)
+        return child
+
+
+@dataclass
+class SimMessage:
+    sender: str  # "ME", "OTHER" or "SYSTEM" (centered timestamps)
+    text: str
+
+
+@dataclass
+class SimChat:
+    name: str
+    members: int | None = None
+    history_length: int = 0
+    seed: int = 0
+    unread: int = 0
+    time_label: str = ""
+    _messages: list[SimMessage] | None = None
+    _tops: list[float] = field(default_factory=lambda: [0.0])
+
+    @property
+    def is_group(self) -> bool:
+        return self.members is not None
+
+    @property
+    def display_title(self) -> str:
+        return f"{self.name}({self.members})" if self.is_group else self.name
+
+    @property
+    def messages(self) -> list[SimMessage]:
+        if self._messages is None:
+            self._messages = _generate_history(self, self.history_length)
+        return self._messages
+
+    def append(self, message: SimMessage) -> None:
+        self.messages.append(message)
+        self.time_label = time.strftime("%H:%M")
+
+    @property
+    def preview(self) -> str:
+        messages = self.messages
+        return messages[-1].text[:40] if messages else ""
+
+    def row_tops(self) -> list[float]:
+        """
+        Cumulative row offsets; entry i is the top of message i and the
+        last entry is the content height.
+        """
+        messages = self.messages
+        tops = self._tops
+        for message in messages[len(tops) - 1 :]:
+            tops.append(tops[-1] + _message_height(message))
+        return tops
+
+
+_WORDS = (
+    "ok sure lunch tomorrow meeting see you later thanks sounds good "
+    "photo link please call me when free done running late on my way "
+    "great idea let us discuss weekend plan"
+).split()
+
+
+def _generate_history(chat: SimChat, length: int) -> list[SimMessage]:
+    rng = random.Random(f"{chat.seed}:{chat.name}")
+    messages: list[SimMessage] = []
+    for i in range(length):
+        if i % 25 == 0:
+            day, minute = divmod(i // 25, 24 * 60)
+            messages.append(
+                SimMessage("SYSTEM", f"Day {day + 1} {minute // 60:02d}:{minute % 60:02d}")
+            )
+            continue
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 30)))
+        sender = "ME" if rng.random() < 0.4 else "OTHER"
+        messages.append(SimMessage(sender, f"{words} #{i}"))
+    return messages
+
+
+def _message_height(message: SimMessage) -> float:
+    if message.sender == "SYSTEM":
+        return 24.0
+    return 36.0 + 18.0 * (len(message.text) // 50)
+
+
+def default_chat_name(index: int, group_every: int = 5) -> str:
+    """
+    Name of the `index`-th generated session-list chat.
+    """
+    if group_every and index % group_every == group_every - 1:
+        return f"Group {index:05d}"
+    return f"Friend {index:05d}"
+
+
+class SimulatedWeChatBackend(AXBackend):
+    """
+    An in-process stand-in for WeChat that answers the same accessibility
+    queries and reacts to the same synthetic input as the real app, so
+    every tool can run unchanged without macOS.
+
+    The model holds `chats` recent conversations (roughly one in
+    `group_every` is a group), of which only the rows that fit on screen
+    are exposed in the session list, plus `contacts` extra contacts that
+    are only reachable through global search. Histories hold `history`
+    messages per chat and are generated on first use. Lists are
+    virtualised like the real app: only visible rows exist in the tree,
+    and they move in response to scroll-wheel events and scroll-bar
+    writes.
+
+    Side effects are recorded for inspection: sent messages in each
+    chat's history, `friend_requests` and `moments`.
+    """
+
+    name = "sim"
+
+    def __init__(
+        self,
+        chats: int = 50,
+        history: int = 200,
+        contacts: int = 0,
+        group_every: int = 5,
+        seed: int = 0,
+        latency: float | dict[str, float] = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.seed = seed
+        self.default_history = history
+        self.pid = 4242
+        self.running = True
+        self.frontmost = False
+        self.pasteboard = ""
+        self.pasteboard_changes = 0
+        self.friend_requests: list[dict[str, Any]] = []
+        # WeChat ID the profile found for a search shows, or None for a
+        # profile showing no ID; other searches show the query itself.
+        self.profile_ids: dict[str, str | None] = {}
+        self.moments: list[str] = []
+        self.events: list[dict[str, Any]] = []
+        # Roles whose elements reject AXPress, so callers must click them.
+        self.unpressable_roles: set[str] = set()
+
+        self._lock = threading.RLock()
+        self.chats: dict[str, SimChat] = {}
+        self.sessions: list[str] = []
+        self._session_index: dict[str, int] = {}
+        self._session_rows: dict[str, SimElement] = {}
+        self._session_offset = 0.0
+        self.contacts: list[str] = []
+        self.groups: list[str] = []
+        self.current_chat: SimChat | None = None
+
+        self._search_query = ""
+        self._search_text = ""
+        self._search_rows: list[SimElement] = []
+        self._search_expanded: set[str] = set()
+        self._search_offset = 0.0
+
+        self._message_offset = 0.0
+        self._message_rows: dict[int, SimElement] = {}
+
+        self._focused: SimElement | None = None
+        self._observers: dict[int, tuple[list[str], Callable[[str], None]]] = {}
+        self._next_observer = 1
+        self._mouse_down: tuple[float, float, float] | None = None
+        self._next_window_id = 100
+
+        rng = random.Random(seed)
+        activity = random.Random(seed + 1)
+        for i in range(chats):
+            name = default_chat_name(i, group_every)
+            if name.startswith("Group "):
+                chat = self.add_chat(name, members=rng.randint(3, 500))
+            else:
+                chat = self.add_chat(name)
+            # Recent chats are more likely to have unread messages.
+            if activity.random() < 0.5 / (1 + i / 20):
+                chat.unread = activity.randint(1, 120)
+            chat.time_label = f"{activity.randint(0, 23):02d}:{activity.randint(0, 59):02d}"
+        for i in range(contacts):
+            self.add_chat(f"Contact {i:05d}", session=False)
+
+        self._build_ui()
+
+    # ------------------------------------------------------------------
+    # Model API
+
+    def add_chat(
+        self,
+        name: str,
+        members: int | None = None,
+        history: int | None = None,
+        session: bool = True,
+    ) -> SimChat:
+        """
+        Add a contact (or a group when `members` is given). With
+        `session=True` it is appended to the session list.
+        """
+        with self._lock:
+            chat = SimChat(
+                name=name,
+                members=members,
+                history_length=self.default_history if history is None else history,
+                seed=self.seed,
+            )
+            self.chats[name] = chat
+            (self.groups if chat.is_group else self.contacts).append(name)
+            if session:
+                self._session_index[name] = len(self.sessions)
+                self.sessions.append(name)
+            return chat
+
+    def receive(self, chat_name: str, text: str) -> None:
+        """
+        Deliver an incoming message, moving the chat to the top of the
+        session list and counting it as unread unless the chat is open.
+        """
+        with self._lock:
+            chat = self.chats[chat_name]
+            at_bottom = self._messages_at_bottom()
+            chat.append(SimMessage("OTHER", text))
+            if chat is self.current_chat:
+                if at_bottom:
+                    self._scroll_messages_to_bottom()
+            else:
+                chat.unread += 1
+            self._move_session_to_top(chat_name)
+            self._post_notification("AXCreated")
+
+    def sent_messages(self, chat_name: str) -> list[str]:
+        return [m.text for m in self.chats[chat_name].messages if m.sender == "ME"]
+
+    # ------------------------------------------------------------------
+    # UI construction
+
+    def _build_ui(self) -> None:
+        self.app_element = SimElement(
+            kAXApplicationRole, title="WeChat", children=lambda: list(self._windows)
+        )
+
+        main = SimElement(
+            kAXWindowRole,
+            title="WeChat",
+            frame=MAIN_WINDOW_FRAME,
+            children=self._main_window_children,
+        )
+        self.main_window = main
+        self._windows: list[SimElement] = []
+        self._open_window(main)
+
+        self.moments_button = SimElement(
+            kAXButtonRole,
+            title="Moments",
+            frame=MOMENTS_BUTTON_FRAME,
+            on_click=self._open_moments_window,
+        )
+        self.search_field = SimElement(
+            kAXTextAreaRole,
+            title="Search",
+            frame=SEARCH_FIELD_FRAME,
+            value=lambda: self._search_text,
+            on_set_value=self._set_search_query,
+        )
+        self.session_list = SimElement(
+            kAXListRole,
+            identifier="session_list",
+            frame=SIDEBAR_FRAME,
+            children=self._visible_session_rows,
+        )
+        self.search_list = SimElement(
+            kAXListRole,
+            identifier="search_list",
+            frame=SIDEBAR_FRAME,
+            children=self._visible_search_rows,
+        )
+        self.title_element = SimElement(
+            kAXStaticTextRole,
+            identifier="big_title_line_h_view",
+            frame=TITLE_FRAME,
+            value=lambda: self.current_chat.display_title if self.current_chat else "",
+        )
+        self.messages_area = SimElement(kAXScrollAreaRole, frame=MESSAGES_FRAME)
+        self.messages_list = self.messages_area.add(
+            SimElement(
+                kAXListRole,
+                title="Messages",
+                frame=MESSAGES_FRAME,
+                children=self._visible_message_rows,
+            )
+        )
+        self.messages_area.scroll_bar = SimElement(
+            kAXScrollBarRole,
+            parent=self.messages_area,
+            value=self._message_scroll_value,
+            on_set_value=self._set_message_scroll_value,
+        )
+        self.input_field = SimElement(
+            kAXTextAreaRole,
+            identifier="chat_input_field",
+            frame=INPUT_FRAME,
+            value="",
+            settable=True,
+        )
+
+        for element in (
+            self.moments_button,
+            self.search_field,
+            self.session_list,
+            self.search_list,
+            self.title_element,
+            self.messages_area,
+            self.input_field,
+        ):
+            element.parent = main
+
+    def _main_window_children(self) -> list[SimElement]:
+        children = [
+            self.moments_button,
+            self.search_field,
+            self.search_list if self._search_query else self.session_list,
+        ]
+        if self.current_chat is not None:
+            children += [self.title_element, self.messages_area, self.input_field]
+        return children
+
+    def _open_window(self, window: SimElement) -> SimElement:
+        for existing in self._windows:
+            if existing.title == window.title and existing is not window:
+                self._windows.remove(existing)
+                self._windows.append(existing)
+                return existing
+        window.parent = None
+        x, y, _, _ = window.frame()
+        window.close_button = SimElement(
+            kAXButtonRole,
+            frame=(x + 8.0, y + 4.0, 14.0, 14.0),
+            parent=window,
+            on_click=lambda: self._close_window(window.title),
+        )
+        window.window_id = self._next_window_id
+        self._next_window_id += 1
+        self._windows.append(window)
+        return window
+
+    def _close_window(self, title: str) -> None:
+        self._windows = [w for w in self._windows if w.title != title]
+
+    # ------------------------------------------------------------------
+    # Session list
+
+    def _move_session_to_top(self, chat_name: str) -> None:
+        if chat_name in self._session_index:
+            self.sessions.remove(chat_name)
+        self.sessions.insert(0, chat_name)
+        self._session_index = {name: i for i, name in enumerate(self.sessions)}
+
+    def _session_row(self, chat_name: str) -> SimElement:
+        row = self._session_rows.get(chat_name)
+        if row is None:
+
+            def frame() -> Frame:
+                index = self._session_index.get(chat_name, -1)
+                x, y, w, _ = SIDEBAR_FRAME
+                return (x, y + index * SESSION_ROW_HEIGHT - self._session_offset, w, SESSION_ROW_HEIGHT)
+
+            chat = self.chats[chat_name]
+
+            def part(value: Callable[[], str], dx: float, dy: float, width: float) -> SimElement:
+                return SimElement(
+                    kAXStaticTextRole,
+                    value=value,
+                    frame=lambda: (frame()[0] + dx, frame()[1] + dy, width, 20.0),
+                )
+
+            # Preview, time and (when unread) badge, laid out like WeChat's row.
+            preview = part(lambda: chat.preview, 56.0, 34.0, 150.0)
+            timestamp = part(lambda: chat.time_label, 200.0, 10.0, 44.0)
+            badge = part(lambda: str(chat.unread), 36.0, 4.0, 20.0)
+            row = SimElement(
+                kAXStaticTextRole,
+                identifier=f"session_item_{chat_name}",
+                value=chat_name,
+                frame=frame,
+                children=lambda: [preview, timestamp] + ([badge] if chat.unread else []),
+                parent=self.session_list,
+                on_click=lambda: self._open_chat(chat_name),
+            )
+            self._session_rows[chat_name] = row
+        return row
+
+    def _visible_session_rows(self) -> list[SimElement]:
+        _, _, _, height = SIDEBAR_FRAME
+        first = int(self._session_offset // SESSION_ROW_HEIGHT)
+        last = int((self._session_offset + height) // SESSION_ROW_HEIGHT) + 1
+        return [self._session_row(name) for name in self.sessions[first:last]]
+
+    def _scroll_session_row_to_visible(self, row: SimElement) -> int:
+        chat_name = (row.identifier or "")[len("session_item_") :]
+        index = self._session_index.get(chat_name)
+        if row.parent is not self.session_list or index is None:
+            return kAXErrorActionUnsupported
+        _, _, _, height = SIDEBAR_FRAME
+        top = index * SESSION_ROW_HEIGHT
+        if top < self._session_offset:
+            self._scroll_sessions(top - self._session_offset)
+        elif top + SESSION_ROW_HEIGHT > self._session_offset + height:
+            self._scroll_sessions(top + SESSION_ROW_HEIGHT - height - self._session_offset)
+        return 0
+
+    def _scroll_sessions(self, pixels: float) -> None:
+        _, _, _, height = SIDEBAR_FRAME
+        limit = max(0.0, len(self.sessions) * SESSION_ROW_HEIGHT - height)
+        self._session_offset = min(max(0.0, self._session_offset + pixels), limit)
+
+    # ------------------------------------------------------------------
+    # Global search
+
+    def _set_search_query(self, value: Any) -> None:
+        query = str(value or "")
+        self._search_text = query
+        if query == self._search_query:
+            return
+        self._search_query = query
+        self._search_expanded.clear()
+        self._search_offset = 0.0
+        self._rebuild_search_rows()
+
+    def _rebuild_search_rows(self) -> None:
+        query = self._search_query.strip()
+        rows: list[SimElement] = []
+        if not query:
+            self._search_rows = rows
+            return
+
+        def add(text: str, on_click: Callable[[], None] | None = None) -> None:
+            index = len(rows)
+
+            def frame() -> Frame:
+                x, y, w, _ = SIDEBAR_FRAME
+                top = y + index * SEARCH_ROW_HEIGHT - self._search_offset
+                return (x, top, w, SEARCH_ROW_HEIGHT)
+
+            rows.append(
+                SimElement(
+                    kAXStaticTextRole,
+                    title=text,
+                    value=text,
+                    frame=frame,
+                    parent=self.search_list,
+                    on_click=on_click,
+                )
+            )
+
+        lowered = query.lower()
+        for section, names in (("Contacts", self.contacts), ("Group Chats", self.groups)):
+            matches = [name for name in names if lowered in name.lower()]
+            if not matches:
+                continue
+            add(section)
+            expanded = section in self._search_expanded
+            shown = matches if expanded else matches[:SEARCH_COMPACT_LIMIT]
+            for name in shown:
+                add(name, lambda name=name: self._open_chat(name))
+            if not expanded and len(matches) > SEARCH_COMPACT_LIMIT:
+                add(
+                    f"View All({len(matches)})",
+                    lambda section=section: self._expand_search_section(section),
+                )
+
+        add("Chat History")
+        add(f"Search chat history for {query}")
+        add("More")
+        add(f"Search WeChat ID: {query}", lambda: self._open_add_contacts_window(query))
+        self._search_rows = rows
+
+    def _expand_search_section(self, section: str) -> None:
+        self._search_expanded.add(section)
+        self._rebuild_search_rows()
+
+    def _visible_search_rows(self) -> list[SimElement]:
+        _, _, _, height = SIDEBAR_FRAME
+        first = int(self._search_offset // SEARCH_ROW_HEIGHT)
+        last = int((self._search_offset + height) // SEARCH_ROW_HEIGHT) + 1
+        return self._search_rows[first:last]
+
+    def _scroll_search(self, pixels: float) -> None:
+        _, _, _, height = SIDEBAR_FRAME
+        limit = max(0.0, len(self._search_rows) * SEARCH_ROW_HEIGHT - height)
+        self._search_offset = min(max(0.0, self._search_offset + pixels), limit)
+
+    # ------------------------------------------------------------------
+    # Open chat and messages list
+
+    def _open_chat(self, chat_name: str) -> None:
+        chat = self.chats[chat_name]
+        if chat_name not in self._session_index:
+            self._move_session_to_top(chat_name)
+        if self.current_chat is not chat:
+            self.current_chat = chat
+            self.input_field._value = ""
+            self._message_rows.clear()
+            self._scroll_messages_to_bottom()
+        chat.unread = 0
+        self._set_search_query("")
+        self._focused = self.input_field
+        logger.debug("Simulator opened chat %r", chat_name)
+
+    def _message_limit(self) -> float:
+        if self.current_chat is None:
+            return 0.0
+        return max(0.0, self.current_chat.row_tops()[-1] - MESSAGES_FRAME[3])
+
+    def _messages_at_bottom(self) -> bool:
+        return self._message_offset >= self._message_limit() - 1.0
+
+    def _scroll_messages_to_bottom(self) -> None:
+        self._message_offset = self._message_limit()
+
+    def _scroll_messages(self, pixels: float) -> None:
+        self._message_offset = min(max(0.0, self._message_offset + pixels), self._message_limit())
+
+    def _message_scroll_value(self) -> float:
+        limit = self._message_limit()
+        return self._message_offset / limit if limit else 1.0
+
+    def _set_message_scroll_value(self, value: Any) -> None:
+        fraction = min(max(0.0, float(value)), 1.0)
+        self._message_offset = fraction * self._message_limit()
+
+    def _visible_message_range(self) -> range:
+        if self.current_chat is None:
+            return range(0)
+        tops = self.current_chat.row_tops()
+        top = self._message_offset
+        bottom = top + MESSAGES_FRAME[3]
+        first = max(0, bisect.bisect_right(tops, top) - 1)
+        last = bisect.bisect_left(tops, bottom)
+        return range(first, min(last, len(tops) - 1))
+
+    def _message_frame(self, index: int) -> Frame:
+        tops = self.current_chat.row_tops() if self.current_chat else [0.0, 0.0]
+        x, y, w, _ = MESSAGES_FRAME
+        top = tops[index] if index < len(tops) - 1 else tops[-1]
+        height = tops[index + 1] - top if index < len(tops) - 1 else 0.0
+        return (x, y + top - self._message_offset, w, height)
+
+    def _visible_message_rows(self) -> list[SimElement]:
+        chat = self.current_chat
+        rows = []
+        for index in self._visible_message_range():
+            row = self._message_rows.get(index)
+            if row is None:
+                row = SimElement(
+                    kAXStaticTextRole,
+                    value=chat.messages[index].text,
+                    frame=lambda index=index: self._message_frame(index),
+                    parent=self.messages_list,
+                )
+                self._message_rows[index] = row
+            rows.append(row)
+        return rows
+
+    def _send_input(self) -> None:
+        chat = self.current_chat
+        text = self.input_field._value or ""
+        if chat is None or not text.strip():
+            return
+        chat.append(SimMessage("ME", text))
+        self.input_field._value = ""
+        self._scroll_messages_to_bottom()
+        self._move_session_to_top(chat.name)
+        self._post_notification("AXCreated")
+
+    # ------------------------------------------------------------------
+    # Add Contacts / Send Friend Request
+
+    def _open_add_contacts_window(self, wechat_id: str) -> None:
+        self._set_search_query("")
+        x, y = 1050.0, 100.0
+        window = SimElement(kAXWindowRole, title="Add Contacts", frame=(x, y, 400.0, 500.0))
+        shown_id = self.profile_ids.get(wechat_id, wechat_id)
+        if shown_id:
+            window.add(
+                SimElement(
+                    kAXStaticTextRole,
+                    value=f"WeChat ID: {shown_id}",
+                    frame=(x + 20, y + 60, 360.0, 24.0),
+                )
+            )
+        window.add(
+            SimElement(
+                kAXButtonRole,
+                title="Add to Contacts",
+                identifier="add_friend_button",
+                frame=(x + 100, y + 300, 200.0, 36.0),
+                on_click=lambda: self._open_friend_request_window(wechat_id),
+            )
+        )
+        self._open_window(window)
+
+    def _open_friend_request_window(self, wechat_id: str) -> None:
+        x, y = 1050.0, 150.0
+        state: dict[str, Any] = {"privacy": "all"}
+        window = SimElement(
+            kAXWindowRole, title="Send Friend Request", frame=(x, y, 420.0, 560.0)
+        )
+        message = window.add(
+            SimElement(
+                kAXTextAreaRole,
+                title="Send Friend Request",
+                value="I'm Me",
+                frame=(x + 20, y + 50, 380.0, 80.0),
+                settable=True,
+            )
+        )
+        remark = window.add(
+            SimElement(
+                kAXTextFieldRole,
+                title="ModifyRemark",
+                value=wechat_id,
+                frame=(x + 20, y + 150, 380.0, 28.0),
+                settable=True,
+            )
+        )
+        for row, (label, mode) in enumerate(
+            (("Chats, Moments, WeRun, etc.", "all"), ("Chats Only", "chats_only"))
+        ):
+            row_y = y + 210 + row * 30
+            window.add(
+                SimElement(
+                    kAXButtonRole,
+                    frame=(x + 20, row_y, 20.0, 20.0),
+                    on_click=lambda mode=mode: state.update(privacy=mode),
+                )
+            )
+            window.add(SimElement(kAXStaticTextRole, value=label, frame=(x + 50, row_y, 250.0, 20.0)))
+        checkboxes = {}
+        for row, title in enumerate(("Hide My Posts", "Hide Their Posts")):
+            checkbox = SimElement(
+                kAXCheckBoxRole,
+                title=title,
+                value=0,
+                frame=(x + 20, y + 290 + row * 30, 200.0, 20.0),
+            )
+            checkbox.on_click = lambda checkbox=checkbox: setattr(
+                checkbox, "value", 0 if checkbox.value else 1
+            )
+            checkboxes[title] = window.add(checkbox)
+
+        def confirm() -> None:
+            self.friend_requests.append(
+                {
+                    "wechat_id": wechat_id,
+                    "message": message.value,
+                    "remark": remark.value,
+                    "privacy": state["privacy"],
+                    "hide_my_posts": bool(checkboxes["Hide My Posts"].value),
+                    "hide_their_posts": bool(checkboxes["Hide Their Posts"].value),
+                }
+            )
+            self._close_window("Send Friend Request")
+            self._close_window("Add Contacts")
+
+        def cancel() -> None:
+            self._close_window("Send Friend Request")
+
+        window.add(SimElement(kAXButtonRole, title="Cancel", frame=(x + 200, y + 500, 80.0, 30.0), on_click=cancel))
+        window.add(SimElement(kAXButtonRole, title="OK", frame=(x + 300, y + 500, 80.0, 30.0), on_click=confirm))
+        self._open_window(window)
+
+    # ------------------------------------------------------------------
+    # Moments
+
+    def _open_moments_window(self) -> None:
+        x, y = 1050.0, 100.0
+        window = SimElement(kAXWindowRole, title="Moments", frame=(x, y, 500.0, 700.0))
+        window.add(
+            SimElement(
+                kAXButtonRole,
+                title="Post",
+                frame=(x + 430, y + 10, 50.0, 30.0),
+                on_long_press=lambda: self._open_moment_sheet(window),
+            )
+        )
+        self._open_window(window)
+
+    def _open_moment_sheet(self, window: SimElement) -> None:
+        if any(child.role == kAXSheetRole for child in window.children()):
+            return
+        x, y = 1060.0, 150.0
+        sheet = window.add(SimElement(kAXSheetRole, frame=(x, y, 480.0, 400.0)))
+        text_area = sheet.add(
+            SimElement(kAXTextAreaRole, value="", frame=(x + 10, y + 50, 460.0, 200.0), settable=True)
+        )
+
+        def post() -> None:
+            text = text_area.value or ""
+            if text.strip():
+                self.moments.append(text)
+            window._children.remove(sheet)
+
+        sheet.add(SimElement(kAXButtonRole, title="Post", frame=(x + 400, y + 350, 60.0, 30.0), on_click=post))
+
+    # ------------------------------------------------------------------
+    # Hit testing and rendering
+
+    def _hit_test(self, x: float, y: float) -> SimElement | None:
+        for window in reversed(self._windows):
+            if not _contains(window.frame(), x, y):
+                continue
+            return self._hit_test_in(window, x, y)
+        return None
+
+    def _hit_test_in(self, element: SimElement, x: float, y: float) -> SimElement | None:
+        for child in reversed(element.children()):
+            found = self._hit_test_in(child, x, y)
+            if found is not None:
+                return found
+        if _contains(element.frame(), x, y) and (
+            element.on_click or element.on_long_press or element.settable
+        ):
+            return element
+        return None
+
+    def _render(self, rect: Frame, window: SimElement | None) -> Image.Image:
+        rx, ry, rw, rh = rect
+        size = (max(1, int(rw)), max(1, int(rh)))
+        if window is None:
+            return Image.new("RGB", size, FOREIGN_APP_COLOR)
+        image = Image.new("RGB", size, BACKGROUND_COLOR)
+        if window is not self.main_window or self.current_chat is None:
+            return image
+
+        draw = ImageDraw.Draw(image)
+        messages = self.current_chat.messages
+        mx, my, mw, mh = MESSAGES_FRAME
+        for index in self._visible_message_range():
+            message = messages[index]
+            if message.sender == "SYSTEM":
+                continue
+            x, top, w, h = self._message_frame(index)
+            top, bottom = max(top, my), min(top + h - 6, my + mh)
+            if bottom - top < 1.0:
+                continue
+            bubble_w = min(w * 0.6, 60.0 + 7.0 * len(message.text))
+            if message.sender == "ME":
+                avatar = (x + w - 45, top, x + w - 10, min(top + 35, bottom))
+                bubble = (x + w - 55 - bubble_w, top, x + w - 55, bottom)
+                color = ME_BUBBLE_COLOR
+            else:
+                avatar = (x + 10, top, x + 45, min(top + 35, bottom))
+                bubble = (x + 55, top, x + 55 + bubble_w, bottom)
+                color = OTHER_BUBBLE_COLOR
+            for box, fill in ((avatar, AVATAR_COLOR), (bubble, color)):
+                draw.rectangle(
+                    (box[0] - rx, box[1] - ry, box[2] - rx - 1, box[3] - ry - 1), fill=fill
+                )
+        return image
+
+    # ------------------------------------------------------------------
+    # AXBackend
+
+    def find_app_pid(self, bundle_id: str) -> int | None:
+        self._delay("find_app_pid")
+        return self.pid if self.running else None
+
+    def is_app_running(self, pid: int) -> bool:
+        return self.running and pid == self.pid
+
+    def activate_app(self, pid: int) -> None:
+        self._delay("activate_app")
+        self.frontmost = True
+
+    def create_app_element(self, pid: int) -> Any:
+        return self.app_element
+
+    def get_attribute(self, element: Any, attribute: str) -> Any:
+        self._delay("get_attribute")
+        return self._read_attribute(element, attribute)
+
+    def get_attributes(self, element: Any, attributes: list[str]) -> list[Any]:
+        self._delay("get_attributes")
+        return [self._read_attribute(element, attribute) for attribute in attributes]
+
+    def _read_attribute(self, element: Any, attribute: str) -> Any:
+        if not isinstance(element, SimElement):
+            return None
+        with self._lock:
+            if attribute == kAXRoleAttribute:
+                return element.role
+            if attribute == kAXTitleAttribute:
+                return element.title
+            if attribute == kAXIdentifierAttribute:
+                return element.identifier
+            if attribute == kAXValueAttribute:
+                return element.value
+            if attribute == kAXNumberOfCharactersAttribute and element.settable:
+                # Like AppKit, counted in UTF-16 code units.
+                return len(str(element.value or "").encode("utf-16-le")) // 2
+            if attribute == kAXChildrenAttribute:
+                return list(element.children())
+            if attribute == kAXParentAttribute:
+                return element.parent
+            if attribute == kAXVerticalScrollBarAttribute:
+                return element.scroll_bar
+            if attribute == kAXCloseButtonAttribute:
+                return element.close_button
+            if attribute == kAXPositionAttribute:
+                x, y, _, _ = element.frame()
+                return AXPoint(x, y)
+            if attribute == kAXSizeAttribute:
+                _, _, w, h = element.frame()
+                return AXSize(w, h)
+        return None
+
+    def set_attribute(self, element: Any, attribute: str, value: Any) -> int:
+        self._delay("set_attribute")
+        if not isinstance(element, SimElement):
+            return kAXErrorAttributeUnsupported
+        with self._lock:
+            if not element.settable or attribute not in (
+                kAXValueAttribute,
+                kAXSelectedTextAttribute,
+            ):
+                return kAXErrorAttributeUnsupported
+            if attribute == kAXValueAttribute and element is self.search_field:
+                # Like WeChat, only typed input starts a search.
+                self._search_text = str(value or "")
+                return 0
+            if attribute == kAXSelectedTextAttribute:
+                # Replaces the selection, or inserts at the end of the value.
+                current = "" if element.select_all else str(element.value or "")
+                value = current + str(value)
+            element.value = value
+            element.select_all = False
+        return 0
+
+    def perform_action(self, element: Any, action: str) -> int:
+        self._delay("perform_action")
+        if not isinstance(element, SimElement):
+            return kAXErrorActionUnsupported
+        with self._lock:
+            if action == kAXScrollToVisibleAction:
+                return self._scroll_session_row_to_visible(element)
+            if action == kAXPressAction:
+                # Unlike mouse events, actions work while WeChat is in the
+                # background.
+                if element.on_click is None or element.role in self.unpressable_roles:
+                    return kAXErrorActionUnsupported
+                self.events.append({"type": "action", "action": action, "role": element.role})
+                element.on_click()
+                return 0
+            if action != kAXRaiseAction:
+                return kAXErrorActionUnsupported
+            if element.settable:
+                self._focused = element
+        return 0
+
+    def is_element(self, value: Any) -> bool:
+        return isinstance(value, SimElement)
+
+    def point_value(self, value: Any) -> tuple[float, float] | None:
+        if isinstance(value, AXPoint):
+            return value.x, value.y
+        return None
+
+    def size_value(self, value: Any) -> tuple[float, float] | None:
+        if isinstance(value, AXSize):
+            return value.width, value.height
+        return None
+
+    def post_key(self, keycode: int, flags: int = 0) -> None:
+        self._delay("post_key")
+        self.events.append({"type": "key", "keycode": keycode, "flags": flags})
+        with self._lock:
+            focused = self._focused
+            if not self.frontmost or focused is None:
+                return
+            command = bool(flags & kCGEventFlagMaskCommand)
+            if command and keycode == KEYCODE_A:
+                focused.select_all = True
+            elif command and keycode == KEYCODE_V:
+                current = "" if focused.select_all else str(focused.value or "")
+                focused.value = current + self.pasteboard
+                focused.select_all = False
+            elif keycode == KEYCODE_RETURN and focused is self.input_field:
+                self._send_input()
+
+    def post_mouse(self, x: float, y: float, down: bool) -> None:
+        self._delay("post_mouse")
+        self.events.append({"type": "mouse", "x": x, "y": y, "down": down})
+        with self._lock:
+            if not self.frontmost:
+                return
+            if down:
+                self._mouse_down = (x, y, time.monotonic())
+                return
+            if self._mouse_down is None:
+                return
+            down_x, down_y, pressed_at = self._mouse_down
+            self._mouse_down = None
+            target = self._hit_test(down_x, down_y)
+            if target is None:
+                return
+            held = time.monotonic() - pressed_at
+            if held >= LONG_PRESS_SECONDS and target.on_long_press is not None:
+                target.on_long_press()
+            elif target.on_click is not None:
+                target.on_click()
+            elif target.settable:
+                self._focused = target
+
+    def post_scroll(self, x: float, y: float, delta_lines: int) -> None:
+        self._delay("post_scroll")
+        self.events.append({"type": "scroll", "x": x, "y": y, "delta": delta_lines})
+        with self._lock:
+            if not self.frontmost:
+                return
+            # Positive deltas reveal older content, i.e. move the view up.
+            pixels = -delta_lines * SCROLL_PIXELS_PER_LINE
+            if _contains(SIDEBAR_FRAME, x, y):
+                if self._search_query:
+                    self._scroll_search(pixels)
+                else:
+                    self._scroll_sessions(pixels)
+            elif _contains(MESSAGES_FRAME, x, y):
+                self._scroll_messages(pixels)
+
+    def save_pasteboard(self) -> Any:
+        return self.pasteboard
+
+    def set_pasteboard_text(self, text: str) -> None:
+        self.pasteboard = text
+        self.pasteboard_changes += 1
+
+    def restore_pasteboard(self, saved: Any) -> None:
+        self.pasteboard = saved or ""
+        self.pasteboard_changes += 1
+
+    def pasteboard_change_count(self) -> int:
+        return self.pasteboard_changes
+
+    def observe(
+        self, element: Any, notifications: list[str], callback: Callable[[str], None]
+    ) -> Any:
+        with self._lock:
+            handle = self._next_observer
+            self._next_observer += 1
+            self._observers[handle] = (list(notifications), callback)
+            return handle
+
+    def unobserve(self, handle: Any) -> None:
+        with self._lock:
+            self._observers.pop(handle, None)
+
+    def _post_notification(self, notification: str) -> None:
+        for notifications, callback in list(self._observers.values()):
+            if notification in notifications:
+                callback(notification)
+
+    def list_windows(self) -> list[dict[str, Any]]:
+        self._delay("list_windows")
+        with self._lock:
+            return [
+                {
+                    "id": window.window_id,
+                    "pid": self.pid,
+                    "layer": 0,
+                    "bounds": window.frame(),
+                }
+                for window in reversed(self._windows)
+            ]
+
+    def capture_screen(self, bbox: tuple[int, int, int, int]) -> Image.Image:
+        self._delay("capture_screen")
+        left, top, right, bottom = bbox
+        rect = (float(left), float(top), float(right - left), float(bottom - top))
+        with self._lock:
+            window = self._hit_window(left, top) if self.frontmost else None
+            return self._render(rect, window)
+
+    def capture_window(
+        self, window_id: int, rect: tuple[float, float, float, float]
+    ) -> Image.Image | None:
+        self._delay("capture_window")
+        with self._lock:
+            for window in self._windows:
+                if window.window_id == window_id:
+                    return self._render(rect, window)
+        return None
+
+    def _hit_window(self, x: float, y: float) -> SimElement | None:
+        for window in reversed(self._windows):
+            if _contains(window.frame(), x, y):
+                return window
+        return None
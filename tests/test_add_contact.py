@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+
 from wechat_mcp.mcp_server import add_contact_by_wechat_id
 
 
 def main() -> None:
-    print(add_contact_by_wechat_id("wew123"))
+    print(asyncio.run(add_contact_by_wechat_id("wew123")))
 
 
 if __name__ == "__main__":
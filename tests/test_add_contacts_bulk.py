@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+
+from wechat_mcp.ax_backend import set_backend
+from wechat_mcp.mcp_server import AddContactItem, add_contacts_bulk
+from wechat_mcp.wechat_simulator import SimulatedWeChatBackend
+
+
+def run(contacts: list[AddContactItem]) -> None:
+    result = asyncio.run(add_contacts_bulk(contacts))
+    for item in result["results"]:
+        print(item["wechat_id"], item["stage"], item.get("error"))
+    print(
+        f"batch={result['batch_id']} sent={result['sent']} failed={result['failed']} "
+        f"skipped={result['skipped_already_sent']} completed={result['completed']}"
+    )
+
+
+def main() -> None:
+    sim = SimulatedWeChatBackend(chats=10, history=20)
+    # Profiles found by a phone number, with a hidden ID, with the ID in
+    # another case, and one showing another person's ID.
+    sim.profile_ids.update(
+        {
+            "+8613800000000": "wxid_dave",
+            "wxid_frank": None,
+            "WXID_Erin": "wxid_erin",
+            "wxid_gina": "wxid_other",
+        }
+    )
+    set_backend(sim)
+
+    contacts = [
+        AddContactItem(wechat_id="wxid_alice", friending_msg="Hi Alice", remark="Alice"),
+        AddContactItem(wechat_id="wxid_bob", privacy="chats_only"),
+        AddContactItem(wechat_id="wxid_carol", hide_my_posts=True),
+        AddContactItem(wechat_id="+8613800000000"),
+        AddContactItem(wechat_id="WXID_Erin"),
+        AddContactItem(wechat_id="wxid_frank"),
+        AddContactItem(wechat_id="wxid_gina"),
+    ]
+    run(contacts)
+    # Resuming sends only the failed ID; the completed batch is cleared.
+    sim.profile_ids.pop("wxid_gina")
+    run(contacts)
+    print([request["wechat_id"] for request in sim.friend_requests])
+
+
+if __name__ == "__main__":
+    main()
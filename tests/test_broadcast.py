@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import asyncio
+
+from wechat_mcp.mcp_server import broadcast_message
+
+
+def main() -> None:
+    print(
+        asyncio.run(
+            broadcast_message(
+                ["家", "文件传输助手", "不存在的群"],
+                "周末聚餐改到周日晚上",
+            )
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
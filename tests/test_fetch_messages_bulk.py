@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import asyncio
+
+from wechat_mcp.ax_backend import set_backend
+from wechat_mcp.wechat_simulator import SimulatedWeChatBackend
+
+
+def main() -> None:
+    set_backend(SimulatedWeChatBackend(chats=100, history=200))
+
+    from wechat_mcp.mcp_server import BulkFetchItem, fetch_messages_bulk
+
+    chats = [
+        BulkFetchItem(chat_name="Friend 00001", last_n=20),
+        BulkFetchItem(chat_name="Friend 00003", last_n=5),
+        BulkFetchItem(chat_name="Friend 00040", last_n=10),
+    ]
+    result = asyncio.run(fetch_messages_bulk(chats))
+    for chat in result["chats"]:
+        print(chat["chat_name"], chat["route"], len(chat.get("messages", [])), chat.get("error"))
+    print(f"fetched={result['fetched']} failed={result['failed']}")
+
+
+if __name__ == "__main__":
+    main()
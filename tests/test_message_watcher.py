@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from wechat_mcp.ax_backend import set_backend
+from wechat_mcp.wechat_simulator import SimulatedWeChatBackend
+
+CHAT_NAME = "Friend 00001"
+OTHER_CHAT = "Friend 00003"
+
+
+async def watch(sim: SimulatedWeChatBackend, seconds: float) -> None:
+    from wechat_mcp.mcp_server import chat_messages_uri, mcp
+
+    async def on_message(message) -> None:
+        print("notification:", message)
+
+    async with create_connected_server_and_client_session(
+        mcp._mcp_server, message_handler=on_message
+    ) as client:
+        await client.call_tool("fetch_messages_by_chat", {"chat_name": CHAT_NAME, "last_n": 5})
+        uri = chat_messages_uri(CHAT_NAME)
+        other_uri = chat_messages_uri(OTHER_CHAT)
+        await client.subscribe_resource(uri)
+        await client.subscribe_resource(other_uri)
+        print(f"Subscribed to {uri}; waiting {seconds:.0f}s for new messages")
+        for delay, text in ((1.0, "ok"), (2.0, "ok"), (3.0, "see you at 7")):
+            threading.Timer(delay, sim.receive, (CHAT_NAME, text)).start()
+        # A closed chat is picked up from the cached session list.
+        threading.Timer(2.5, sim.receive, (OTHER_CHAT, "are you coming?")).start()
+        await asyncio.sleep(1.5)
+        await client.call_tool(
+            "reply_to_messages_by_chat", {"chat_name": CHAT_NAME, "reply_message": "on my way"}
+        )
+        await asyncio.sleep(seconds - 1.5)
+        for resource in (uri, other_uri):
+            result = await client.read_resource(resource)
+            print(result.contents[0].text)
+
+
+def main() -> None:
+    sim = SimulatedWeChatBackend(chats=10, history=50)
+    set_backend(sim)
+    asyncio.run(watch(sim, 5.0))
+
+
+if __name__ == "__main__":
+    main()
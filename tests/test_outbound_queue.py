@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import asyncio
+
+from wechat_mcp.mcp_server import get_outbound_message_status, reply_to_messages_by_chat
+
+
+async def run() -> None:
+    ticket = await reply_to_messages_by_chat("文件传输助手", "queued test", enqueue=True)
+    print(ticket)
+    while True:
+        status = await get_outbound_message_status([ticket["ticket_id"]])
+        if status["tickets"][0]["state"] in ("sent", "failed"):
+            break
+        await asyncio.sleep(0.5)
+    print(status)
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
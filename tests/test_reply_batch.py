@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import asyncio
+
+from wechat_mcp.mcp_server import ReplyBatchItem, reply_to_messages_batch
+
+
+def main() -> None:
+    print(
+        asyncio.run(
+            reply_to_messages_batch(
+                [
+                    ReplyBatchItem(chat_name="家", messages=["第一条", "第二条"]),
+                    ReplyBatchItem(chat_name="文件传输助手", messages=["test"]),
+                ]
+            )
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import asyncio
+
+from wechat_mcp.mcp_server import reply_to_messages_by_chat
+
+
+def main() -> None:
+    paragraphs = [f"第{i}段：" + "这是一段用于测试分段发送的长文本。" * 20 for i in range(1, 6)]
+    print(
+        asyncio.run(
+            reply_to_messages_by_chat(
+                "文件传输助手", "\n\n".join(paragraphs), chunk_size=500
+            )
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
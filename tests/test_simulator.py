@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import asyncio
+
+from wechat_mcp.actions import working_methods
+from wechat_mcp.ax_backend import set_backend
+from wechat_mcp.text_entry import working_paths
+from wechat_mcp.wechat_simulator import SimulatedWeChatBackend
+
+
+def main() -> None:
+    sim = SimulatedWeChatBackend(chats=10000, history=500, contacts=2000)
+    for i in range(5000):
+        sim.add_chat(f"Team member {i}", session=False)
+    sim.add_chat("Long history", history=100000, session=False)
+    set_backend(sim)
+
+    from wechat_mcp.mcp_server import (
+        add_contact_by_wechat_id,
+        fetch_messages_by_chat,
+        publish_moment_without_media,
+        reply_to_messages_by_chat,
+    )
+
+    print(asyncio.run(fetch_messages_by_chat("Friend 00001", last_n=30)))
+    print(asyncio.run(fetch_messages_by_chat("Team member 4321", last_n=10)))
+    print(asyncio.run(fetch_messages_by_chat("Long history", last_n=60, background=True)))
+    print(asyncio.run(reply_to_messages_by_chat("Group 09999", "Hello from the simulator")))
+    print(sim.sent_messages("Group 09999")[-1:])
+    print(asyncio.run(add_contact_by_wechat_id("wxid_example", friending_msg="Hi")))
+    print(sim.friend_requests)
+    print(asyncio.run(publish_moment_without_media("Simulated moment")))
+    print(sim.moments)
+    print(working_methods())
+    # The AX value path fills the search field without starting a search,
+    # so the search field must have settled on a typed path.
+    print(working_paths())
+
+
+if __name__ == "__main__":
+    main()
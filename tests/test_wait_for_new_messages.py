@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+
+from wechat_mcp.ax_backend import set_backend
+from wechat_mcp.wechat_simulator import SimulatedWeChatBackend
+
+CHAT_NAME = "Friend 00001"
+
+
+async def follow(sim: SimulatedWeChatBackend, rounds: int) -> None:
+    from wechat_mcp.mcp_server import (
+        fetch_messages_by_chat,
+        reply_to_messages_by_chat,
+        wait_for_new_messages,
+    )
+
+    await fetch_messages_by_chat(CHAT_NAME, last_n=5)
+    cursor = None
+    for i in range(rounds):
+        # Our own reply is skipped; the wait ends on the incoming message.
+        await reply_to_messages_by_chat(CHAT_NAME, f"question {i}")
+        threading.Timer(1.0, sim.receive, (CHAT_NAME, f"answer {i}")).start()
+        result = await wait_for_new_messages(CHAT_NAME, after_cursor=cursor, timeout=10)
+        print(result)
+        cursor = result["cursor"]
+
+    # A cursor from an earlier server process is ahead of this one's.
+    threading.Timer(1.0, sim.receive, (CHAT_NAME, "after restart")).start()
+    print(await wait_for_new_messages(CHAT_NAME, after_cursor=cursor + 1000, timeout=10))
+
+
+async def concurrent(sim: SimulatedWeChatBackend) -> None:
+    """
+    More simultaneous long-polls than the default executor has threads
+    must all be woken by one message, well before their timeout.
+    """
+    from wechat_mcp.mcp_server import wait_for_new_messages
+
+    waiters = min(32, (os.cpu_count() or 1) + 4) + 16
+    threading.Timer(1.0, sim.receive, (CHAT_NAME, "hello everyone")).start()
+    start = time.monotonic()
+    results = await asyncio.gather(
+        *(wait_for_new_messages(CHAT_NAME, timeout=20) for _ in range(waiters))
+    )
+    elapsed = time.monotonic() - start
+    woken = sum(1 for result in results if not result["timed_out"])
+    print(f"{woken}/{waiters} concurrent waiters woken in {elapsed:.1f}s")
+
+
+def main() -> None:
+    sim = SimulatedWeChatBackend(chats=10, history=50)
+    set_backend(sim)
+    asyncio.run(follow(sim, 3))
+    asyncio.run(concurrent(sim))
+
+
+if __name__ == "__main__":
+    main()